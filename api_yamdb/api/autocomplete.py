@@ -0,0 +1,266 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from api import constants
+from api.utils import get_title_ratings
+from reviews.models import Title
+
+WORD_PATTERN = re.compile(r'\w+')
+MAX_CACHED_RESULTS = 10000
+
+IndexedTitle = namedtuple('IndexedTitle', ('name', 'rating', 'normalized'))
+
+
+def normalize(value):
+    """Нижний регистр, ё -> е, только слова через один пробел."""
+    return ' '.join(WORD_PATTERN.findall(value.casefold().replace('ё', 'е')))
+
+
+def get_suffixes(name):
+    """Части названия, начинающиеся с каждого слова."""
+    words = name.split(' ')
+    return {' '.join(words[position:]) for position in range(len(words))}
+
+
+def get_prefixes(name, length=None):
+    """Префиксы окончаний названия не длиннее length, по ним оно ищется."""
+    starts, position = [0], name.find(' ')
+    while position != -1:
+        starts.append(position + 1)
+        position = name.find(' ', position + 1)
+    return {
+        name[start:start + end]
+        for start in starts
+        for end in range(1, (length or len(name) - start) + 1)
+    }
+
+
+class TitlePrefixIndex:
+    """
+    Индекс подсказок по названиям произведений в памяти процесса.
+    Ключи (нормализованное окончание названия, id) хранятся в
+    отсортированном списке, подходящие под префикс ищутся bisect.
+    Лучшие по рейтингу id префикса выбираются при первом запросе
+    и хранятся до перестроения: короткие префиксы, под которые
+    подходит большая часть названий, — в top, чтобы поток длинных
+    запросов не вытеснял их, остальные — в results. Изменение
+    произведения правит только списки его префиксов.
+    Индекс строится при первом обращении, обновляется сигналами
+    Title и Review и перестраивается целиком раз в AUTOCOMPLETE_TTL,
+    чтобы подхватить изменения из других процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.keys = None
+            self.titles = {}
+            self.top = {}
+            self.results = {}
+            self.built_at = None
+            self.pending = threading.local()
+
+    @property
+    def is_built(self):
+        return self.keys is not None
+
+    def build(self):
+        titles = Title.objects.order_by().values_list('id', 'name')
+        ratings = get_title_ratings()
+        with self.lock:
+            self.titles = {}
+            keys = []
+            for title_id, name in titles.iterator():
+                normalized = normalize(name)
+                self.titles[title_id] = IndexedTitle(
+                    name, ratings.get(title_id), normalized
+                )
+                keys.extend(
+                    (suffix, title_id) for suffix in get_suffixes(normalized)
+                )
+            keys.sort()
+            self.keys = keys
+            self.top = {}
+            self.results = {}
+            self.built_at = time.monotonic()
+
+    def ensure_built(self):
+        if (
+            not self.is_built
+            or time.monotonic() - self.built_at > constants.AUTOCOMPLETE_TTL
+        ):
+            self.build()
+
+    def remove_keys(self, title_id, indexed):
+        for suffix in get_suffixes(indexed.normalized):
+            position = bisect.bisect_left(self.keys, (suffix, title_id))
+            if self.keys[position:position + 1] == [(suffix, title_id)]:
+                del self.keys[position]
+
+    def remove(self, title_id):
+        with self.lock:
+            if not self.is_built or title_id not in self.titles:
+                return
+            indexed = self.titles.pop(title_id)
+            self.remove_keys(title_id, indexed)
+            self.refresh_results(title_id, indexed)
+
+    def update(self, title, rating=None):
+        with self.lock:
+            if not self.is_built:
+                return
+            previous = self.titles.get(title.pk)
+            if previous is not None:
+                rating = previous.rating
+                self.remove_keys(title.pk, previous)
+            normalized = normalize(title.name)
+            self.titles[title.pk] = IndexedTitle(
+                title.name, rating, normalized
+            )
+            for suffix in get_suffixes(normalized):
+                bisect.insort(self.keys, (suffix, title.pk))
+            self.refresh_results(title.pk, previous)
+
+    def update_rating(self, title_id, rating):
+        with self.lock:
+            if not self.is_built or title_id not in self.titles:
+                return
+            previous = self.titles[title_id]
+            self.titles[title_id] = previous._replace(rating=rating)
+            self.refresh_results(title_id, previous)
+
+    def refresh_results(self, title_id, previous):
+        """
+        Правка подсказок префиксов, под которые произведение подходило
+        до изменения (previous) или подходит после него. Списки, которые
+        не восстановить без поиска, сбрасываются до следующего запроса.
+        """
+        current = self.titles.get(title_id)
+        matching = get_prefixes(current.normalized) if current else set()
+        affected = set(matching)
+        if previous is not None:
+            affected |= get_prefixes(previous.normalized)
+        for cache in (self.top, self.results):
+            for prefix in affected & cache.keys():
+                if not self.refresh_prefix(
+                    cache[prefix], title_id, prefix in matching
+                ):
+                    del cache[prefix]
+
+    def refresh_prefix(self, results, title_id, matches):
+        """
+        Перестановка title_id в списке подсказок префикса. False,
+        если из полного списка выбыл id, а замену знает только поиск.
+        """
+        full = len(results) >= constants.AUTOCOMPLETE_MAX_LIMIT
+        removed = title_id in results
+        if removed:
+            results.remove(title_id)
+        if matches:
+            position = bisect.bisect_left(
+                [self.get_sort_key(other) for other in results],
+                self.get_sort_key(title_id)
+            )
+            if position < len(results) or not full:
+                results.insert(position, title_id)
+                del results[constants.AUTOCOMPLETE_MAX_LIMIT:]
+                return True
+        return not (full and removed)
+
+    def get_pending_ratings(self, using):
+        """
+        Произведения, отзывы которых изменились в текущей транзакции
+        потока на БД using.
+        """
+        pending = getattr(self.pending, 'ratings', None)
+        if pending is None:
+            pending = self.pending.ratings = {}
+        return pending.setdefault(using, set())
+
+    def schedule_rating_update(self, title_id, using=None):
+        """
+        Пересчет рейтинга после фиксации транзакции, один запрос
+        на все произведения, отзывы которых изменились в ней.
+        Обработчик регистрируется при каждом изменении: после отката
+        обработчики транзакции отбрасываются, а первый обработчик
+        зафиксированной транзакции забирает все накопленные id.
+        """
+        if not self.is_built:
+            return
+        using = using or DEFAULT_DB_ALIAS
+        self.get_pending_ratings(using).add(title_id)
+        transaction.on_commit(
+            lambda: self.update_pending_ratings(using), using=using
+        )
+
+    def update_pending_ratings(self, using=DEFAULT_DB_ALIAS):
+        pending = self.get_pending_ratings(using)
+        with self.lock:
+            title_ids = pending & self.titles.keys()
+        pending.clear()
+        if not title_ids:
+            return
+        ratings = get_title_ratings(title_ids)
+        for title_id in title_ids:
+            self.update_rating(title_id, ratings.get(title_id))
+
+    def get_matches(self, prefix):
+        """Id произведений, где слово названия начинается с prefix."""
+        keys = self.keys
+        position = bisect.bisect_left(keys, (prefix,))
+        matches = set()
+        while position < len(keys) and keys[position][0].startswith(prefix):
+            matches.add(keys[position][1])
+            position += 1
+        return matches
+
+    def get_sort_key(self, title_id):
+        """Сначала с большим рейтингом, без оценок в конце."""
+        indexed = self.titles[title_id]
+        return (
+            indexed.rating is None, -(indexed.rating or 0),
+            indexed.normalized, title_id
+        )
+
+    def search(self, query, limit=constants.AUTOCOMPLETE_LIMIT):
+        """Подсказки с наибольшим рейтингом для префикса query."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.ensure_built()
+        with self.lock:
+            cache = self.results
+            if len(prefix) <= constants.AUTOCOMPLETE_TOP_PREFIX_LENGTH:
+                cache = self.top
+            results = cache.get(prefix)
+            if results is None:
+                results = heapq.nsmallest(
+                    constants.AUTOCOMPLETE_MAX_LIMIT,
+                    self.get_matches(prefix), key=self.get_sort_key
+                )
+                if len(cache) >= MAX_CACHED_RESULTS:
+                    cache.clear()
+                cache[prefix] = results
+            return [
+                {
+                    'id': title_id,
+                    'name': self.titles[title_id].name,
+                    'rating': (
+                        None if self.titles[title_id].rating is None
+                        else int(self.titles[title_id].rating)
+                    ),
+                }
+                for title_id in results[:limit]
+            ]
+
+
+title_prefix_index = TitlePrefixIndex()
@@ -9,3 +9,17 @@ NAME_MAX_LENGTH = 256
 SLUG_MAX_LENGTH = 50
 TEXT_LENGTH = 20
 ROLE_MAX_LENGTH = 16
+SEARCH_CONFIG = 'russian'  # Конфигурация полнотекстового поиска PostgreSQL
+AUTOCOMPLETE_LIMIT = 10  # Количество подсказок по умолчанию
+AUTOCOMPLETE_MAX_LIMIT = 50  # Наибольшее количество подсказок
+AUTOCOMPLETE_TTL = 60 * 10  # Время жизни индекса подсказок, в секундах
+AUTOCOMPLETE_TOP_PREFIX_LENGTH = 2  # Длина префиксов с отдельным кэшем
+GENRE_INDEX_TTL = 60 * 10  # Время жизни индекса жанров, в секундах
+GENRE_INDEX_MAX_IDS = 500  # Наибольшее число id для фильтра pk IN (...)
+PURGE_BATCH_SIZE = 1000  # Строк зависимых объектов за одну транзакцию
+IMPORT_BATCH_SIZE = 1000  # Строк файла в одной транзакции импорта
+IMPORT_LOOKUP_SIZE = 500  # Значений в одном запросе IN при импорте
+IMPORT_PROGRESS_INTERVAL = 2  # Период вывода прогресса импорта, в секундах
+IMPORT_VALIDATE_CACHE_SIZE = 100000  # Проверенных значений колонки в кэше
+EXPORT_BATCH_SIZE = 2000  # Строк, читаемых из БД за раз при экспорте
+RECOUNT_BATCH_SIZE = 1000  # Объектов в пачке пересчета счетчиков
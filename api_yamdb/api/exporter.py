@@ -0,0 +1,265 @@
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+from api import constants
+from api.importer import MODELS, run_in_worker
+from api.sharding import SHARDED_MODELS
+from reviews.models import Category, Title
+
+User = get_user_model()
+
+# Файлы и колонки в формате static/data, который читает importcsv
+EXPORT_FILES = {
+    'User': (
+        'User.csv',
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+    ),
+    'Category': ('category.csv', ('id', 'name', 'slug')),
+    'Genre': ('genre.csv', ('id', 'name', 'slug')),
+    'Title': (
+        'Title.csv', ('id', 'name', 'year', 'category', 'description')
+    ),
+    'GenreTitle': ('GenreTitle.csv', ('id', 'title_id', 'genre_id')),
+    'Review': (
+        'review.csv',
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    ),
+    'Comments': (
+        'comments.csv', ('id', 'review_id', 'text', 'author', 'pub_date')
+    ),
+}
+# Ссылки на мягко удаляемые модели. Строки, зависящие от помеченных
+# объектов, не выгружаются, а необязательная ссылка очищается —
+# так же, как их обработает purgedeleted
+REFERENCES = {
+    'Title': (('category_id', Category),),
+    'GenreTitle': (('title_id', Title),),
+    'Review': (('title_id', Title), ('author_id', User)),
+    'Comments': (
+        ('author_id', User),
+        ('review__title_id', Title),
+        ('review__author_id', User),
+    ),
+}
+SNAPSHOT_SQL = 'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY'
+
+
+def get_databases():
+    return [DEFAULT_DB_ALIAS, *settings.REVIEW_SHARDS]
+
+
+def supports_shared_snapshots():
+    """
+    Потоки читают один снимок БД, только если СУБД умеет его
+    передавать: pg_export_snapshot на PostgreSQL.
+    """
+    return all(
+        connections[alias].vendor == 'postgresql'
+        for alias in get_databases()
+    )
+
+
+def format_datetime(value):
+    """Дата в UTC в формате static/data: 2019-09-24T21:08:21.567Z."""
+    if value is None:
+        return None
+    return value.astimezone(dt_timezone.utc).replace(
+        tzinfo=None
+    ).isoformat() + 'Z'
+
+
+class ExportStats:
+    """Итоги экспорта файла."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        self.seconds = 0
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started
+        return self
+
+    def __str__(self):
+        text = f'{self.path}: выгружено строк {self.rows}'
+        if self.skipped:
+            text += f', пропущено помеченных на удаление {self.skipped}'
+        return f'{text} за {self.seconds:.1f} с.'
+
+
+class Exporter:
+    """
+    Выгрузка моделей в файлы формата static/data для importcsv.
+    Таблицы читаются по pk пачками через iterator(), строки сразу
+    пишутся в файл, поэтому память не зависит от размера таблиц.
+    Все файлы читаются в транзакциях, открытых до начала выгрузки:
+    на PostgreSQL это REPEATABLE READ, и потоки с workers > 1
+    присоединяются к тому же снимку через pg_export_snapshot.
+    Снимки разных БД (шардов) независимы.
+    Помеченные на удаление объекты и зависящие от них строки
+    не выгружаются, см. REFERENCES.
+    """
+
+    def __init__(self, batch_size=constants.EXPORT_BATCH_SIZE, workers=1):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.deleted = {}
+
+    def get_deleted(self):
+        """id помеченных на удаление объектов по моделям."""
+        return {
+            model: set(
+                model.all_objects.filter(
+                    deleted_at__isnull=False
+                ).values_list('pk', flat=True)
+            )
+            for model in (User, Category, Title)
+        }
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Транзакции чтения на всех БД. Отдает id снимков PostgreSQL,
+        к которым присоединяются потоки.
+        """
+        snapshots = {}
+        with ExitStack() as stack:
+            for alias in get_databases():
+                stack.enter_context(transaction.atomic(using=alias))
+                connection = connections[alias]
+                if connection.vendor != 'postgresql':
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute(SNAPSHOT_SQL)
+                    cursor.execute('SELECT pg_export_snapshot()')
+                    snapshots[alias] = cursor.fetchone()[0]
+            yield snapshots
+
+    def export_in_snapshot(self, name, directory, snapshots):
+        """Выгрузка файла в потоке, в снимке транзакции команды."""
+        with ExitStack() as stack:
+            for alias, snapshot in snapshots.items():
+                stack.enter_context(transaction.atomic(using=alias))
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(SNAPSHOT_SQL)
+                    cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot])
+            return self.export_file(name, directory)
+
+    def export(self, directory, names=EXPORT_FILES):
+        """
+        Выгрузка файлов names в directory, отдает пары
+        (name, ExportStats). С workers > 1 файлы выгружаются
+        одновременно, если СУБД позволяет разделить снимок.
+        """
+        with self.snapshot() as snapshots:
+            self.deleted = self.get_deleted()
+            if self.workers == 1 or not supports_shared_snapshots():
+                for name in names:
+                    yield name, self.export_file(name, directory)
+                return
+            with ThreadPoolExecutor(
+                self.workers, thread_name_prefix='export'
+            ) as pool:
+                futures = {
+                    name: pool.submit(
+                        run_in_worker, self.export_in_snapshot, name,
+                        directory, snapshots
+                    )
+                    for name in names
+                }
+                for name, future in futures.items():
+                    yield name, future.result()
+
+    def get_checks(self, name, lookups):
+        """
+        Проверки ссылок строки: индекс значения, id помеченных
+        объектов и можно ли очистить ссылку вместо пропуска строки.
+        """
+        model = MODELS[name]
+        checks = []
+        for lookup, related in REFERENCES.get(name, ()):
+            deleted = self.deleted.get(related)
+            if not deleted:
+                continue
+            nullable = '__' not in lookup and model._meta.get_field(
+                lookup
+            ).null
+            checks.append((lookups.index(lookup), deleted, nullable))
+        return checks
+
+    def read_rows(self, name, columns, using, stats):
+        """Строки модели из БД using в порядке pk, пачками."""
+        model = MODELS[name]
+        lookups = list(columns)
+        lookups.extend(
+            lookup for lookup, _ in REFERENCES.get(name, ())
+            if lookup not in lookups
+        )
+        checks = self.get_checks(name, lookups)
+        dates = [
+            index for index, column in enumerate(columns)
+            if isinstance(model._meta.get_field(column), models.DateTimeField)
+        ]
+        rows = model.objects.using(using).order_by('pk').values_list(
+            *lookups
+        ).iterator(chunk_size=self.batch_size)
+        for row in rows:
+            if checks or dates:
+                row = self.prepare_row(row, checks, dates, len(columns))
+                if row is None:
+                    stats.skipped += 1
+                    continue
+            stats.rows += 1
+            yield row
+
+    def prepare_row(self, row, checks, dates, width):
+        """Строка для файла, None если она зависит от помеченного объекта."""
+        row = list(row)
+        for index, deleted, nullable in checks:
+            if row[index] in deleted:
+                if not nullable:
+                    return None
+                row[index] = None
+        for index in dates:
+            row[index] = format_datetime(row[index])
+        return row[:width]
+
+    def export_file(self, name, directory):
+        """
+        Выгрузка модели в файл. Файл пишется под временным именем
+        и заменяет прежний только после успешной выгрузки.
+        """
+        filename, header = EXPORT_FILES[name]
+        model = MODELS[name]
+        path = os.path.join(directory, filename)
+        stats = ExportStats(path)
+        columns = [model._meta.get_field(column).attname for column in header]
+        databases = [DEFAULT_DB_ALIAS]
+        if model._meta.label_lower in SHARDED_MODELS:
+            databases = list(settings.REVIEW_SHARDS) or databases
+        temporary = f'{path}.tmp'
+        try:
+            with open(temporary, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file, lineterminator='\n')
+                writer.writerow(header)
+                for using in databases:
+                    writer.writerows(
+                        self.read_rows(name, columns, using, stats)
+                    )
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return stats.finish()
@@ -0,0 +1,47 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from api.utils import get_slug_ids
+
+
+class BatchSlugManyRelatedField(serializers.ManyRelatedField):
+    """Список slug, который проверяется одним запросом, а не по одному."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.to_internal_value_many(data)
+
+
+class BatchSlugRelatedField(serializers.SlugRelatedField):
+    """
+    Поле связи по полю slug модели: список проверяется одним запросом.
+    Возвращает объекты модели, в которых заполнены только id и slug:
+    этого достаточно для записи внешних ключей без загрузки строк.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in MANY_RELATION_KWARGS:
+            if key in kwargs:
+                list_kwargs[key] = kwargs[key]
+        return BatchSlugManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        return self.to_internal_value_many((data,))[0]
+
+    def to_internal_value_many(self, data):
+        for value in data:
+            if not isinstance(value, str):
+                self.fail('invalid')
+        model = self.get_queryset().model
+        slug_ids = get_slug_ids(model, data)
+        for value in data:
+            if value not in slug_ids:
+                self.fail(
+                    'does_not_exist', slug_name=self.slug_field, value=value
+                )
+        return [model(pk=slug_ids[value], slug=value) for value in data]
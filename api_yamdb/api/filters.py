@@ -1,13 +1,213 @@
-from django_filters.rest_framework import CharFilter, FilterSet
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Exists, OuterRef
+from django_filters.rest_framework import (
+    BaseInFilter, CharFilter, ChoiceFilter, DateTimeFilter, FilterSet,
+    NumberFilter,
+)
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
-from reviews.models import Title
+from api.genre_index import genre_bitset_index
+from api.utils import get_slug_ids
+from reviews.models import (
+    Category, Comments, Genre, GenreTitle, Review, Title,
+)
+
+User = get_user_model()
+
+MAX_CHAR = chr(0x10ffff)
+GENRE_MODE_ANY = 'any'
+GENRE_MODE_ALL = 'all'
+GENRE_MODES = (
+    (GENRE_MODE_ANY, 'Любой из жанров'),
+    (GENRE_MODE_ALL, 'Все жанры'),
+)
+INDEXED_FILTERS = ('genre', 'genre_mode', 'category')
+
+
+class CharInFilter(BaseInFilter, CharFilter):
+    """Список значений через запятую."""
 
 
 class FilterTitle(FilterSet):
+    """
+    Фильтры произведений.
+    genre и category принимают точные slug через запятую.
+    Жанры проверяются подзапросами EXISTS по GenreTitle, поэтому
+    основной запрос не соединяется с жанрами и не дублирует строки.
+    genre_mode=all оставляет произведения со всеми указанными жанрами.
+    При включенном GENRE_BITSET_INDEX жанры и категории сначала
+    пересекаются в памяти, а в БД уходит только pk IN (...).
+    """
+
     name = CharFilter(field_name='name', lookup_expr='icontains')
-    genre = CharFilter(field_name='genre__slug', lookup_expr='icontains')
-    category = CharFilter(field_name='category__slug', lookup_expr='icontains')
+    year_min = NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = NumberFilter(field_name='year', lookup_expr='lte')
+    genre = CharInFilter(method='filter_genre')
+    genre_mode = ChoiceFilter(choices=GENRE_MODES, method='filter_nothing')
+    category = CharInFilter(method='filter_category')
 
     class Meta:
         model = Title
-        fields = ('name', 'genre', 'category', 'year',)
+        fields = (
+            'name', 'genre', 'category', 'year', 'year_min', 'year_max',
+        )
+
+    def filter_queryset(self, queryset):
+        title_ids = self.get_indexed_title_ids()
+        if title_ids is None:
+            return super().filter_queryset(queryset)
+        queryset = queryset.filter(pk__in=title_ids)
+        for name, value in self.form.cleaned_data.items():
+            if name not in INDEXED_FILTERS:
+                queryset = self.filters[name].filter(queryset, value)
+        return queryset
+
+    def get_indexed_title_ids(self):
+        """Id произведений из индекса жанров или None без индекса."""
+        genres = self.form.cleaned_data.get('genre')
+        categories = self.form.cleaned_data.get('category')
+        if not genre_bitset_index.enabled or not (genres or categories):
+            return None
+        genre_ids = category_ids = None
+        match_all = self.form.cleaned_data.get('genre_mode') == GENRE_MODE_ALL
+        if genres:
+            genre_ids = get_slug_ids(Genre, genres)
+            if match_all and len(genre_ids) < len(set(genres)):
+                return []
+            genre_ids = set(genre_ids.values())
+        if categories:
+            category_ids = get_slug_ids(Category, categories).values()
+        return genre_bitset_index.get_title_ids(
+            genre_ids, match_all, category_ids
+        )
+
+    def filter_nothing(self, queryset, name, value):
+        return queryset
+
+    def filter_genre(self, queryset, name, value):
+        genre_ids = get_slug_ids(Genre, value)
+        genre_titles = GenreTitle.objects.filter(title_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('genre_mode') == GENRE_MODE_ALL:
+            if len(genre_ids) < len(set(value)):
+                return queryset.none()
+            for genre_id in set(genre_ids.values()):
+                queryset = queryset.filter(
+                    Exists(genre_titles.filter(genre_id=genre_id))
+                )
+            return queryset
+        return queryset.filter(
+            Exists(genre_titles.filter(genre_id__in=list(genre_ids.values())))
+        )
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(
+            category_id__in=list(get_slug_ids(Category, value).values())
+        )
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    Сортировка с pk в конце: без уникального ключа строки с равными
+    значениями на соседних страницах повторяются или теряются.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'pk', '-pk', 'id', '-id'} & set(ordering):
+            ordering = [*ordering, 'pk']
+        return ordering
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по индексу view.search_index.
+    Если у представления order_by_search_rank = True и не передан
+    параметр ordering, результаты сортируются по релевантности.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = view.search_index.search(queryset, query)
+        if (
+            getattr(view, 'order_by_search_rank', False)
+            and OrderingFilter.ordering_param not in request.query_params
+        ):
+            queryset = queryset.order_by('search_rank', 'pk')
+        return queryset
+
+
+class UserPrefixFilter(BaseFilterBackend):
+    """
+    Поиск пользователей по началу username и email без учета регистра
+    по колонкам в нижнем регистре. Условие LIKE 'префикс%' на PostgreSQL
+    использует индекс varchar_pattern_ops, который Django создает
+    для индексируемых CharField: обычный btree-индекс при сортировке
+    не в локали C префиксы не обслуживает. LIKE в SQLite не учитывает
+    регистр и индекс не использует, там префикс переводится
+    в диапазон по кодам символов, совпадающий с порядком BINARY.
+    """
+
+    prefix_fields = {
+        'username': 'username_lower',
+        'email': 'email_lower',
+    }
+
+    @classmethod
+    def get_prefixes(cls, request):
+        """Колонка -> префикс для переданных параметров поиска."""
+        return {
+            field: request.query_params[param].lower()
+            for param, field in cls.prefix_fields.items()
+            if request.query_params.get(param)
+        }
+
+    def filter_queryset(self, request, queryset, view):
+        use_range = connections[queryset.db].vendor == 'sqlite'
+        for field, prefix in self.get_prefixes(request).items():
+            if use_range:
+                queryset = queryset.filter(**{
+                    f'{field}__gte': prefix,
+                    f'{field}__lt': prefix + MAX_CHAR,
+                })
+            else:
+                queryset = queryset.filter(**{f'{field}__startswith': prefix})
+        return queryset
+
+
+class FilterModeration(FilterSet):
+    """
+    Фильтры отзывов и комментариев для модераторов.
+    Автор ищется отдельным запросом к основной БД: при шардировании
+    таблицы пользователей рядом с отзывами нет.
+    """
+
+    author = CharFilter(method='filter_author')
+    date_from = DateTimeFilter(field_name='pub_date', lookup_expr='gte')
+    date_to = DateTimeFilter(field_name='pub_date', lookup_expr='lte')
+
+    def filter_author(self, queryset, name, value):
+        return queryset.filter(author_id__in=list(
+            User.objects.filter(username=value).values_list('pk', flat=True)
+        ))
+
+
+class FilterModerationReview(FilterModeration):
+    title = NumberFilter(field_name='title_id')
+
+    class Meta:
+        model = Review
+        fields = ('author', 'title', 'date_from', 'date_to')
+
+
+class FilterModerationComment(FilterModeration):
+    title = NumberFilter(field_name='review__title_id')
+    review = NumberFilter(field_name='review_id')
+
+    class Meta:
+        model = Comments
+        fields = ('author', 'title', 'review', 'date_from', 'date_to')
@@ -0,0 +1,169 @@
+import threading
+import time
+
+from django.conf import settings
+
+from api import constants
+from reviews.models import GenreTitle, Title
+
+
+class GenreBitsetIndex:
+    """
+    Инвертированный индекс жанр -> битовое множество произведений
+    в памяти процесса. Множества хранятся как int: бит с номером
+    позиции произведения установлен, если у него есть жанр.
+    Позиции выдаются подряд, поэтому разреженные id не раздувают int.
+    Так же хранятся множества произведений по категориям.
+    Включается настройкой GENRE_BITSET_INDEX.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.title_ids = []
+            self.positions = {}
+            self.title_genres = {}
+            self.title_category = {}
+            self.genre_bits = {}
+            self.category_bits = {}
+            self.built_at = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'GENRE_BITSET_INDEX', False)
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    def build(self):
+        titles = Title.objects.order_by('pk').values_list('pk', 'category_id')
+        genre_titles = GenreTitle.objects.order_by().values_list(
+            'title_id', 'genre_id'
+        )
+        with self.lock:
+            self.reset()
+            for title_id, category_id in titles.iterator():
+                self.add_title(title_id, category_id)
+            genres = {}
+            for title_id, genre_id in genre_titles.iterator():
+                if title_id in self.positions:
+                    genres.setdefault(genre_id, []).append(title_id)
+                    self.title_genres[title_id].add(genre_id)
+            for genre_id, title_ids in genres.items():
+                self.genre_bits[genre_id] = self.get_bits(title_ids)
+            self.built_at = time.monotonic()
+
+    def ensure_built(self):
+        if (
+            not self.is_built
+            or time.monotonic() - self.built_at > constants.GENRE_INDEX_TTL
+        ):
+            self.build()
+
+    def get_bits(self, title_ids):
+        bits = 0
+        for title_id in title_ids:
+            bits |= 1 << self.positions[title_id]
+        return bits
+
+    def add_title(self, title_id, category_id):
+        position = len(self.title_ids)
+        self.title_ids.append(title_id)
+        self.positions[title_id] = position
+        self.title_genres[title_id] = set()
+        self.title_category[title_id] = category_id
+        if category_id is not None:
+            self.category_bits[category_id] = (
+                self.category_bits.get(category_id, 0) | 1 << position
+            )
+
+    def remove_title(self, title_id):
+        with self.lock:
+            if title_id not in self.positions:
+                return
+            position = self.positions.pop(title_id)
+            mask = ~(1 << position)
+            for genre_id in self.title_genres.pop(title_id):
+                self.genre_bits[genre_id] &= mask
+            category_id = self.title_category.pop(title_id)
+            if category_id is not None:
+                self.category_bits[category_id] &= mask
+            self.title_ids[position] = None
+
+    def update_title(self, title_id, category_id, genre_ids=None):
+        """
+        Замена категории и жанров произведения после записи.
+        Если genre_ids не передан, жанры остаются прежними.
+        """
+        with self.lock:
+            if not self.is_built:
+                return
+            if genre_ids is None:
+                genre_ids = self.title_genres.get(title_id, ())
+            genre_ids = set(genre_ids)
+            self.remove_title(title_id)
+            self.add_title(title_id, category_id)
+            bit = 1 << self.positions[title_id]
+            for genre_id in genre_ids:
+                self.genre_bits[genre_id] = (
+                    self.genre_bits.get(genre_id, 0) | bit
+                )
+            self.title_genres[title_id] = genre_ids
+
+    def remove_genre(self, genre_id):
+        with self.lock:
+            self.genre_bits.pop(genre_id, None)
+            for genres in self.title_genres.values():
+                genres.discard(genre_id)
+
+    def remove_category(self, category_id):
+        with self.lock:
+            self.category_bits.pop(category_id, None)
+            for title_id, title_category in self.title_category.items():
+                if title_category == category_id:
+                    self.title_category[title_id] = None
+
+    def get_title_ids(self, genre_ids=None, match_all=False,
+                      category_ids=None):
+        """
+        Id произведений по жанрам и категориям.
+        None, если подходящих больше GENRE_INDEX_MAX_IDS:
+        такой фильтр выгоднее выполнить в БД.
+        """
+        self.ensure_built()
+        with self.lock:
+            bits = -1
+            if genre_ids is not None:
+                genre_bits = [
+                    self.genre_bits.get(genre_id, 0) for genre_id in genre_ids
+                ]
+                if not genre_bits:
+                    return []
+                if match_all:
+                    for value in genre_bits:
+                        bits &= value
+                else:
+                    bits = 0
+                    for value in genre_bits:
+                        bits |= value
+            if category_ids is not None:
+                category_bits = 0
+                for category_id in category_ids:
+                    category_bits |= self.category_bits.get(category_id, 0)
+                bits &= category_bits
+            if bits < 0 or bin(bits).count('1') > (
+                constants.GENRE_INDEX_MAX_IDS
+            ):
+                return None
+            return [
+                self.title_ids[position]
+                for position, bit in enumerate(reversed(bin(bits)[2:]))
+                if bit == '1'
+            ]
+
+
+genre_bitset_index = GenreBitsetIndex()
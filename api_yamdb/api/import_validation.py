@@ -0,0 +1,342 @@
+import csv
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.core.validators import (
+    MaxLengthValidator, MaxValueValidator, MinValueValidator,
+    ProhibitNullCharactersValidator,
+)
+from django.db import models
+
+from api import constants
+from api.importer import (
+    MODELS, BulkImporter, RowError, clean_value, get_unique_sets, read_chunks,
+)
+
+RANGE_VALIDATORS = (MinValueValidator, MaxValueValidator)
+TEXT_VALIDATORS = (MaxLengthValidator, ProhibitNullCharactersValidator)
+
+
+class ColumnCheck:
+    """
+    Проверка множества значений колонки, как clean_value при импорте.
+    Возвращает id для id и внешних ключей и причины для ошибочных
+    значений. Для целых чисел, текста и дат значения проверяются
+    всей колонкой сразу, остальные — по одному с кэшем между пачками.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.check = lru_cache(constants.IMPORT_VALIDATE_CACHE_SIZE)(
+            self.check_value
+        )
+        validators = field.validators
+        if field.choices:
+            self.kind = None
+        elif field.many_to_one or (
+            isinstance(field, models.IntegerField)
+            and all(isinstance(item, RANGE_VALIDATORS) for item in validators)
+        ):
+            self.kind = 'int'
+        elif isinstance(field, (models.CharField, models.TextField)) and all(
+            isinstance(item, TEXT_VALIDATORS) for item in validators
+        ):
+            self.kind = 'text'
+        elif isinstance(field, models.DateTimeField) and not validators:
+            self.kind = 'datetime'
+        else:
+            self.kind = None
+
+    def check_value(self, value):
+        try:
+            return clean_value(self.field, value), None
+        except RowError as error:
+            return None, str(error)
+
+    def check_values(self, values):
+        """Проверка значений по одному, с кэшем."""
+        cleaned = {}
+        errors = {}
+        for value in values:
+            result, error = self.check(value)
+            if error is None:
+                cleaned[value] = result
+            else:
+                errors[value] = error
+        return cleaned, errors
+
+    def check_ints(self, values):
+        cleaned = {}
+        if self.field.null and '' in values:
+            cleaned[''] = None
+            values = values - {''}
+        try:
+            ints = dict(zip(values, map(int, values)))
+        except ValueError:
+            return self.check_values(values)
+        if ints and not self.field.many_to_one:
+            try:
+                # Диапазон проверяется по наименьшему и наибольшему
+                for value in (min(ints.values()), max(ints.values())):
+                    self.field.run_validators(value)
+            except ValidationError:
+                return self.check_values(values)
+        cleaned.update(ints)
+        return cleaned, {}
+
+    def check_texts(self, values):
+        limit = self.field.max_length or float('inf')
+        suspicious = [
+            value for value in values
+            if len(value) > limit or '\x00' in value
+        ]
+        if '' in values and not self.field.blank:
+            suspicious.append('')
+        return {}, self.check_values(suspicious)[1]
+
+    def check_datetimes(self, values):
+        suspicious = []
+        for value in values:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                suspicious.append(value)
+                continue
+            if value[4:5] != '-':
+                suspicious.append(value)
+        return {}, self.check_values(suspicious)[1]
+
+    def __call__(self, values):
+        """
+        Пары (id, причины) для множества значений колонки.
+        id возвращаются только для целочисленных колонок.
+        """
+        if self.kind == 'int':
+            return self.check_ints(values)
+        if self.kind == 'text':
+            return self.check_texts(values)
+        if self.kind == 'datetime':
+            return self.check_datetimes(values)
+        return self.check_values(values)
+
+
+class FileReport:
+    """Итоги проверки файла: ошибки по причинам с примерами строк."""
+
+    EXAMPLES = 5
+    REASONS = 10
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.existing = 0
+        self.invalid = set()
+        self.counts = Counter()
+        self.examples = {}
+
+    def add(self, reason, numbers):
+        """Ошибка reason в строках numbers (номера без заголовка)."""
+        self.counts[reason] += len(numbers)
+        examples = self.examples.setdefault(reason, [])
+        examples.extend(numbers[:self.EXAMPLES - len(examples)])
+        self.invalid.update(numbers)
+
+    def lines(self):
+        yield (
+            f'{self.path}: строк {self.rows}, с ошибками '
+            f'{len(self.invalid)}, уже в БД {self.existing}.'
+        )
+        for reason, count in self.counts.most_common(self.REASONS):
+            examples = ', '.join(map(str, self.examples[reason]))
+            yield f'  {reason} — {count} (строки {examples})'
+        if len(self.counts) > self.REASONS:
+            yield f'  Других причин: {len(self.counts) - self.REASONS}.'
+
+
+def find_duplicates(numbers, keys, seen):
+    """Номера строк, чей ключ уже встречался в файле."""
+    unique = set(keys)
+    unique.discard(None)
+    if len(unique) == len(keys) and seen.isdisjoint(unique):
+        seen |= unique
+        return []
+    duplicates = []
+    for number, key in zip(numbers, keys):
+        if key is None:
+            continue
+        if key in seen:
+            duplicates.append(number)
+        seen.add(key)
+    return duplicates
+
+
+class ImportValidator:
+    """
+    Проверка файлов импорта без записи в БД. Файл читается пачками
+    и проверяется по колонкам: каждое различное значение колонки
+    проверяется как при импорте (типы, диапазон оценок,
+    validate_title_year, формат slug, правила имен пользователей),
+    см. ColumnCheck. Внешние ключи проверяются разностью множеств id
+    файлов и БД, повторы id и уникальных полей — по множествам.
+    Файлы проверяются в порядке зависимостей: строки с ошибками
+    не считаются загруженными для зависимых файлов.
+    Небольшие пачки быстрее больших: строки пачки не доживают
+    до старшего поколения сборщика мусора.
+    """
+
+    def __init__(self, batch_size=constants.IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.importer = BulkImporter()
+        self.file_ids = {}
+
+    def find_missing(self, model, ids):
+        """id, которых нет ни в БД, ни в проверенных строках файлов."""
+        missing = ids - self.file_ids.get(model, set())
+        existing = self.importer.get_ids(model)
+        return {pk for pk in missing if pk not in existing}
+
+    def check_columns(self, fields, checks, numbers, columns, report):
+        """Проверка колонок, id для колонок id и внешних ключей."""
+        cleaned_columns = []
+        for field, check, column in zip(fields, checks, columns):
+            cleaned, errors = check(set(column))
+            if field.many_to_one:
+                missing = self.find_missing(
+                    field.related_model, set(cleaned.values()) - {None}
+                )
+                errors.update(
+                    (value, f'{field.name}: объект не найден.')
+                    for value, pk in cleaned.items() if pk in missing
+                )
+            self.add_errors(errors, numbers, column, report)
+            cleaned_columns.append(cleaned)
+        return cleaned_columns
+
+    def add_errors(self, errors, numbers, column, report):
+        if not errors:
+            return
+        rows = {}
+        for number, value in zip(numbers, column):
+            if value in errors:
+                rows.setdefault(errors[value], []).append(number)
+        for reason, numbers in rows.items():
+            report.add(reason, numbers)
+
+    def get_unique(self, model, header, fields):
+        """
+        Ограничения уникальности из колонок файла: индексы колонок,
+        название, значения в БД для ограничений из одного поля
+        и множество значений, встреченных в файле.
+        """
+        unique = []
+        for names in get_unique_sets(model):
+            try:
+                indexes = [
+                    fields.index(model._meta.get_field(name))
+                    for name in names
+                ]
+            except ValueError:
+                continue
+            values = None
+            if len(names) == 1:
+                values = set(
+                    model._base_manager.values_list(
+                        names[0], flat=True
+                    ).iterator()
+                )
+            label = ', '.join(header[index] for index in indexes)
+            unique.append((indexes, label, values, set()))
+        return unique
+
+    def check_unique(self, model, unique, numbers, columns, ids, report):
+        """Повторы в файле и значения, занятые другими объектами в БД."""
+        existing = self.importer.get_ids(model)
+        for indexes, label, values, seen in unique:
+            # Составной ключ — строка, а не кортеж: множества строк
+            # не обходит сборщик мусора
+            keys = list(map(
+                '\x1f'.join, zip(*(columns[index] for index in indexes))
+            ))
+            duplicates = find_duplicates(numbers, keys, seen)
+            if duplicates:
+                report.add(f'{label}: повтор в файле.', duplicates)
+            column = columns[indexes[0]]
+            if values is None or values.isdisjoint(column):
+                continue
+            taken = [
+                number for number, value, pk in zip(numbers, column, ids)
+                if value in values and pk not in existing
+            ]
+            if taken:
+                report.add(f'{label}: значение уже есть в БД.', taken)
+
+    def check_ids(self, model, numbers, column, cleaned, seen, report):
+        """Повторы id в файле, подсчет id, уже загруженных в БД."""
+        ids = list(map(cleaned.get, column))
+        existing = self.importer.get_ids(model)
+        report.existing += sum(pk in existing for pk in set(ids))
+        duplicates = find_duplicates(numbers, ids, seen)
+        if duplicates:
+            report.add('id: повтор в файле.', duplicates)
+        return ids
+
+    def split_rows(self, chunk, header, report):
+        """Номера и строки с верным числом колонок."""
+        start = report.rows + 1
+        report.rows += len(chunk)
+        if set(map(len, chunk)) == {len(header)}:
+            return range(start, report.rows + 1), chunk
+        numbers = []
+        rows = []
+        for number, row in enumerate(chunk, start):
+            if len(row) == len(header):
+                numbers.append(number)
+                rows.append(row)
+            else:
+                report.add('Неверное число колонок.', [number])
+        return numbers, rows
+
+    def validate_file(self, name, path):
+        model = MODELS[name]
+        report = FileReport(path)
+        file_ids = self.file_ids[model] = set()
+        with open(path, newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, [])
+            try:
+                fields = self.importer.get_fields(model, header)
+            except RowError as error:
+                report.add(f'Заголовок: {error}', [0])
+                return report
+            checks = [ColumnCheck(field) for field in fields]
+            pk = model._meta.pk
+            unique = self.get_unique(model, header, fields)
+            seen = set()
+            for chunk in read_chunks(reader, self.batch_size):
+                invalid = len(report.invalid)
+                numbers, rows = self.split_rows(chunk, header, report)
+                columns = list(zip(*rows)) or [()] * len(fields)
+                cleaned = self.check_columns(
+                    fields, checks, numbers, columns, report
+                )
+                ids = [None] * len(numbers)
+                if pk in fields:
+                    index = fields.index(pk)
+                    ids = self.check_ids(
+                        model, numbers, columns[index], cleaned[index], seen,
+                        report
+                    )
+                self.check_unique(
+                    model, unique, numbers, columns, ids, report
+                )
+                if len(report.invalid) == invalid:
+                    file_ids.update(ids)
+                else:
+                    file_ids.update(
+                        pk for number, pk in zip(numbers, ids)
+                        if number not in report.invalid
+                    )
+        file_ids.discard(None)
+        return report
@@ -0,0 +1,1138 @@
+import csv
+import hashlib
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from decimal import Decimal
+from io import StringIO
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX, UNUSABLE_PASSWORD_SUFFIX_LENGTH,
+)
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.color import no_style
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, connections, models, transaction,
+)
+from django.utils import timezone
+
+from api import constants
+from api.purge import PURGE_STEPS, soft_delete
+from api.sharding import get_title_shard, is_sharded
+from reviews.models import (
+    Category, Comments, Genre, GenreTitle, ImportedFile, ImportedRow, Review,
+    Title,
+)
+
+User = get_user_model()
+
+MODELS = {
+    'User': User,
+    'Category': Category,
+    'Genre': Genre,
+    'Title': Title,
+    'GenreTitle': GenreTitle,
+    'Review': Review,
+    'Comments': Comments,
+}
+PROCEDURE = [
+    'User',
+    'Category',
+    'Genre',
+    'Title',
+    'GenreTitle',
+    'Review',
+    'Comments'
+]
+# Обозначение NULL в COPY временной таблицы импорта
+COPY_NULL = r'\N'
+
+
+def get_model_files(directory):
+    """Файлы импорта по имени модели, без учета регистра: review.csv."""
+    files = {
+        os.path.splitext(name)[0].lower(): os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith('.csv')
+    }
+    return {
+        name: files[name.lower()]
+        for name in PROCEDURE
+        if name.lower() in files
+    }
+
+
+def get_dependencies(names):
+    """
+    Этапы импорта, от которых зависит каждый файл: модели,
+    на которые он ссылается внешними ключами, среди импортируемых.
+    """
+    models = {MODELS[name]: name for name in names}
+    return {
+        name: {
+            models[field.related_model]
+            for field in MODELS[name]._meta.concrete_fields
+            if field.many_to_one and field.related_model in models
+            and field.related_model is not MODELS[name]
+        }
+        for name in names
+    }
+
+
+def supports_parallel_writes():
+    """
+    Параллельная запись ускоряет импорт, только если СУБД допускает
+    несколько писателей. SQLite пишет по одному, остальные ждут.
+    """
+    return all(
+        connections[alias].vendor != 'sqlite'
+        for alias in (DEFAULT_DB_ALIAS, *settings.REVIEW_SHARDS)
+    )
+
+
+def run_in_worker(func, *args):
+    """Вызов в потоке пула, соединения потока закрываются после него."""
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def run_stages(names, func, workers=1):
+    """
+    Вызов func(name) для файлов в пуле из workers потоков.
+    Этап запускается, когда завершены этапы, от которых он зависит,
+    поэтому User, Category и Genre импортируются одновременно.
+    Отдает пары (name, результат) по мере завершения этапов.
+    """
+    if workers == 1:
+        for name in names:
+            yield name, func(name)
+        return
+    dependencies = get_dependencies(names)
+    pending = list(names)
+    done = set()
+    futures = {}
+    with ThreadPoolExecutor(workers, thread_name_prefix='import') as pool:
+        while pending or futures:
+            for name in [
+                name for name in pending if dependencies[name] <= done
+            ]:
+                pending.remove(name)
+                futures[pool.submit(run_in_worker, func, name)] = name
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = futures.pop(future)
+                done.add(name)
+                yield name, future.result()
+
+
+class ParallelWriter:
+    """
+    Запись пачек одного файла в workers потоков. В очереди не больше
+    2 * workers пачек, поэтому память не растет при медленной БД.
+    С workers=1 пачки пишутся в вызывающем потоке.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.pool = None
+        if workers > 1:
+            self.pool = ThreadPoolExecutor(
+                workers, thread_name_prefix='import-chunk'
+            )
+        self.futures = set()
+
+    def submit(self, func, *args):
+        if self.pool is None:
+            return func(*args)
+        if len(self.futures) >= 2 * self.workers:
+            finished, self.futures = wait(
+                self.futures, return_when=FIRST_COMPLETED
+            )
+            for future in finished:
+                future.result()
+        self.futures.add(self.pool.submit(run_in_worker, func, *args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool is not None:
+            self.pool.shutdown()
+            for future in self.futures:
+                future.result()
+
+
+def get_rejected_path(path):
+    """Файл отклоненных строк рядом с исходным: review.rejected.csv."""
+    return f'{os.path.splitext(path)[0]}.rejected.csv'
+
+
+class SourceFile:
+    """
+    Строки CSV-файла по одной, с подсчетом прочитанных байт
+    для оценки оставшегося времени. Файл не читается целиком.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.position = 0
+        self.file = open(path, 'rb')
+
+    def __iter__(self):
+        for line in self.file:
+            self.position += len(line)
+            yield line.decode('utf-8')
+
+    def close(self):
+        self.file.close()
+
+
+class RejectedRows:
+    """
+    Отклоненные строки с номером и причиной в CSV-файле.
+    Файл создается при первой отклоненной строке, старый удаляется.
+    """
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = [*fieldnames, 'row', 'reason']
+        self.file = None
+        self.writer = None
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, number, row, reason):
+        if self.file is None:
+            self.file = open(self.path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(
+                self.file, self.fieldnames, extrasaction='ignore'
+            )
+            self.writer.writeheader()
+        self.writer.writerow({**row, 'row': number, 'reason': reason})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+@contextmanager
+def open_csv(path):
+    """
+    Чтение CSV построчно: возвращает DictReader, исходный файл
+    с прогрессом и запись отклоненных строк.
+    """
+    source = SourceFile(path)
+    reader = csv.DictReader(source)
+    rejected = RejectedRows(get_rejected_path(path), reader.fieldnames or ())
+    try:
+        yield reader, source, rejected
+    finally:
+        source.close()
+        rejected.close()
+
+
+def get_file_checksum(path):
+    """SHA-256 содержимого файла, файл читается блоками."""
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def get_row_checksum(row):
+    """Контрольная сумма строки файла: 8 байт BLAKE2b как целое."""
+    data = '\x1f'.join(f'{column}={value}' for column, value in row.items())
+    return int.from_bytes(
+        hashlib.blake2b(data.encode(), digest_size=8).digest(),
+        'big', signed=True
+    )
+
+
+def read_chunks(reader, size):
+    """Строки CSV пачками по size без чтения всего файла."""
+    while True:
+        chunk = list(islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def file_dates(models):
+    """
+    Даты pub_date берутся из файла, как при loaddata:
+    на время импорта auto_now_add у полей моделей отключается.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class RowError(ValueError):
+    """Строка файла отклонена, текст ошибки — причина."""
+
+
+def clean_value(field, value):
+    """
+    Значение поля из файла или RowError с причиной. Внешний ключ
+    только приводится к id, его наличие проверяет вызывающий.
+    """
+    if value == '' and field.null:
+        value = None
+    try:
+        if field.many_to_one:
+            return None if value is None else int(value)
+        return field.clean(value, None)
+    except ValidationError as error:
+        raise RowError(f'{field.name}: {" ".join(error.messages)}')
+    except (TypeError, ValueError) as error:
+        raise RowError(f'{field.name}: {error}')
+
+
+def get_unusable_passwords(count):
+    """
+    Непригодные пароли для count пользователей, как make_password(None),
+    из одного обращения к генератору случайных чисел.
+    """
+    length = UNUSABLE_PASSWORD_SUFFIX_LENGTH
+    suffixes = secrets.token_hex(length * count // 2 + 1)
+    return [
+        UNUSABLE_PASSWORD_PREFIX + suffixes[start:start + length]
+        for start in range(0, length * count, length)
+    ]
+
+
+def get_model_databases(model):
+    """БД, в которых хранятся строки модели: шарды для отзывов."""
+    if model in (Review, Comments) and is_sharded():
+        return list(settings.REVIEW_SHARDS)
+    return [DEFAULT_DB_ALIAS]
+
+
+def reset_sequences(model, using=DEFAULT_DB_ALIAS):
+    """
+    Счетчик id таблицы модели после вставки строк с явными id.
+    Иначе на PostgreSQL последовательность выдаст следующей записи
+    через API уже занятый id. На SQLite счетчик AUTOINCREMENT
+    сдвигается при вставке сам, и запросов нет.
+    """
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class ImportStats:
+    """Итоги и прогресс импорта одного файла."""
+
+    def __init__(self, name, source, rejected_rows):
+        self.name = name
+        self.source = source
+        self.rejected_rows = rejected_rows
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.unchanged = False
+        self.started = time.monotonic()
+        self.seconds = 0
+        self.lock = threading.Lock()
+
+    def reject(self, number, row, reason):
+        """Отклонение строки файла с номером number (без заголовка)."""
+        with self.lock:
+            self.rejected += 1
+            self.rejected_rows.write(number, row, reason)
+
+    def add_created(self, count):
+        with self.lock:
+            self.created += count
+
+    def add_updated(self, count):
+        with self.lock:
+            self.updated += count
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started
+        return self
+
+    @property
+    def elapsed(self):
+        return self.seconds or time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0
+
+    @property
+    def eta(self):
+        """Оставшееся время по доле прочитанных байт файла."""
+        if not self.source.position:
+            return None
+        left = self.source.size - self.source.position
+        return self.elapsed * left / self.source.position
+
+    def progress(self):
+        eta = self.eta
+        eta = '?' if eta is None else f'{eta:.0f} с'
+        return (
+            f'{self.name}: {self.rows} строк, {self.rate:.0f} строк/с, '
+            f'осталось {eta}'
+        )
+
+    def __str__(self):
+        if self.unchanged:
+            return f'{self.name}: файл не изменился с прошлого импорта.'
+        text = (
+            f'{self.name}: {self.rows} строк за {self.seconds:.1f} с '
+            f'({self.rate:.0f} строк/с), создано {self.created}, '
+            f'пропущено существующих {self.skipped}, '
+            f'отклонено {self.rejected}.'
+        )
+        if self.updated or self.deleted:
+            text += f' Обновлено {self.updated}, удалено {self.deleted}.'
+        return text
+
+
+class Progress:
+    """
+    Строка прогресса импорта не чаще раза в interval секунд.
+    В терминале строка перезаписывается на месте.
+    """
+
+    def __init__(self, stream, interval=constants.IMPORT_PROGRESS_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self.shown = time.monotonic()
+
+    def __call__(self, stats):
+        now = time.monotonic()
+        if now - self.shown < self.interval:
+            return
+        self.shown = now
+        ending = '\r' if self.stream.isatty() else '\n'
+        self.stream.write(stats.progress(), ending=ending)
+
+
+class BulkImporter:
+    """
+    Массовый импорт файлов static/data. Файл читается пачками,
+    внешние ключи проверяются по заранее загруженным множествам id,
+    строки пачки записываются bulk_create в одной транзакции.
+    Строки с id, который уже есть в БД, пропускаются. Если пачка
+    нарушает ограничение БД, она повторяется построчно, чтобы
+    отклонить только ошибочные строки.
+    Сигналы моделей не вызываются: после импорта нужны
+    rebuildsearch и recountcounters.
+    С file_workers > 1 пачки файла пишутся параллельно.
+    """
+
+    def __init__(self, batch_size=constants.IMPORT_BATCH_SIZE,
+                 file_workers=1):
+        self.batch_size = batch_size
+        self.file_workers = file_workers
+        self.ids = {}
+        self.review_shards = None
+        self.lock = threading.Lock()
+
+    def get_ids(self, model):
+        """Множество id объектов модели, загружается один раз."""
+        ids = self.ids.get(model)
+        if ids is None:
+            with self.lock:
+                ids = self.load_ids(model)
+        return ids
+
+    def load_ids(self, model):
+        if model not in self.ids:
+            if model is Review and is_sharded():
+                self.review_shards = {}
+                for alias in settings.REVIEW_SHARDS:
+                    self.review_shards.update(dict.fromkeys(
+                        Review.objects.using(alias).values_list(
+                            'pk', flat=True
+                        ).iterator(),
+                        alias
+                    ))
+                self.ids[model] = self.review_shards.keys()
+            else:
+                self.ids[model] = set(
+                    model._base_manager.values_list(
+                        'pk', flat=True
+                    ).iterator()
+                )
+        return self.ids[model]
+
+    def get_fields(self, model, header):
+        fields = []
+        for column in header:
+            try:
+                fields.append(model._meta.get_field(column))
+            except FieldDoesNotExist:
+                raise RowError(
+                    f'Колонка {column} не найдена в модели '
+                    f'{model._meta.object_name}.'
+                )
+        return fields
+
+    def clean(self, fields, row):
+        """Значения полей из строки файла или RowError с причиной."""
+        return {
+            field: clean_value(field, value)
+            for field, value in zip(fields, row.values())
+        }
+
+    def convert(self, model, fields, row):
+        """Объект модели из строки файла или RowError с причиной."""
+        values = self.clean(fields, row)
+        for field, value in values.items():
+            if field.many_to_one and value is not None and (
+                value not in self.get_ids(field.related_model)
+            ):
+                raise RowError(f'{field.name}: объект {value} не найден.')
+        return model(**{
+            field.attname: value for field, value in values.items()
+        })
+
+    def get_database(self, obj):
+        """БД объекта: шард для отзывов и комментариев."""
+        if isinstance(obj, Review):
+            return get_title_shard(obj.title_id) or DEFAULT_DB_ALIAS
+        if isinstance(obj, Comments) and self.review_shards is not None:
+            return self.review_shards[obj.review_id]
+        return DEFAULT_DB_ALIAS
+
+    def insert(self, model, objs, using):
+        if model is User:
+            # bulk_create не вызывает User.save и хэширование пароля
+            for obj, password in zip(
+                objs, get_unusable_passwords(len(objs))
+            ):
+                obj.password = password
+                obj.fill_lower_fields()
+        model._base_manager.using(using).bulk_create(
+            objs, batch_size=self.batch_size
+        )
+
+    def write(self, model, items, using):
+        """Запись строк (номер, строка, объект) в БД using."""
+        self.insert(model, [obj for *_, obj in items], using)
+
+    def count(self, model, saved, stats):
+        """Учет записанных строк пачки в итогах файла."""
+        stats.add_created(len(saved))
+
+    def save_chunk(self, model, rows, stats):
+        """Запись пачки, при ошибке БД — построчно в точках сохранения."""
+        databases = {}
+        for number, row, obj in rows:
+            databases.setdefault(self.get_database(obj), []).append(
+                (number, row, obj)
+            )
+        for using, items in databases.items():
+            try:
+                with transaction.atomic(using=using):
+                    self.write(model, items, using)
+                saved = items
+            except IntegrityError:
+                saved = []
+                with transaction.atomic(using=using):
+                    for number, row, obj in items:
+                        try:
+                            with transaction.atomic(using=using):
+                                self.write(model, [(number, row, obj)], using)
+                        except IntegrityError as error:
+                            stats.reject(number, row, str(error))
+                        else:
+                            saved.append((number, row, obj))
+            self.count(model, saved, stats)
+            if model is Review and self.review_shards is not None:
+                self.review_shards.update(
+                    (obj.pk, using) for *_, obj in saved
+                )
+            else:
+                self.ids[model].update(obj.pk for *_, obj in saved)
+
+    def import_file(self, name, path, progress=None):
+        """
+        Импорт файла пачками. Память не зависит от размера файла,
+        кроме множеств id для проверки внешних ключей.
+        После каждой пачки вызывается progress(stats).
+        """
+        model = MODELS[name]
+        existing = self.get_ids(model)
+        with open_csv(path) as (reader, source, rejected_rows):
+            fields = self.get_fields(model, reader.fieldnames or ())
+            stats = ImportStats(name, source, rejected_rows)
+            with ParallelWriter(self.file_workers) as writer:
+                self.read_file(model, reader, fields, existing, stats,
+                               writer, progress)
+        if stats.created:
+            for using in get_model_databases(model):
+                reset_sequences(model, using)
+        return stats.finish()
+
+    def read_file(self, model, reader, fields, existing, stats, writer,
+                  progress):
+        """Чтение и проверка строк в вызывающем потоке, запись — в writer."""
+        unique = {
+            model._meta.get_field(names[0]): set()
+            for names in get_unique_sets(model) if len(names) == 1
+        }
+        for chunk in read_chunks(reader, self.batch_size):
+            rows = []
+            for row in chunk:
+                stats.rows += 1
+                obj = self.check_row(model, fields, row, existing, stats)
+                if obj is not None:
+                    rows.append((stats.rows, row, obj))
+            for field, seen in unique.items():
+                rows = self.reject_taken(model, field, seen, rows, stats)
+            writer.submit(self.save_chunk, model, rows, stats)
+            if progress is not None:
+                progress(stats)
+
+    def reject_taken(self, model, field, seen, rows, stats):
+        """
+        Отклонение строк пачки, чье значение уникального поля (имя
+        и почта пользователя, slug) уже встречалось в файле или занято
+        другим объектом в БД. Занятые значения ищутся запросами
+        по всей пачке, а не ошибкой БД на каждой строке.
+        """
+        values = {
+            getattr(obj, field.attname) for *_, obj in rows
+        } - {None}
+        taken = {}
+        for batch in read_chunks(iter(values), constants.IMPORT_LOOKUP_SIZE):
+            taken.update(
+                model._base_manager.filter(
+                    **{f'{field.attname}__in': batch}
+                ).values_list(field.attname, 'pk')
+            )
+        kept = []
+        for number, row, obj in rows:
+            value = getattr(obj, field.attname)
+            if value is not None and (
+                value in seen or taken.get(value, obj.pk) != obj.pk
+            ):
+                stats.reject(number, row, f'{field.name}: значение занято.')
+                continue
+            seen.add(value)
+            kept.append((number, row, obj))
+        return kept
+
+    def check_row(self, model, fields, row, existing, stats):
+        """Объект из строки или None, если строка отклонена или пропущена."""
+        try:
+            obj = self.convert(model, fields, row)
+        except RowError as error:
+            stats.reject(stats.rows, row, str(error))
+            return None
+        if obj.pk in existing:
+            stats.skipped += 1
+            return None
+        return obj
+
+
+def get_unique_sets(model):
+    """Имена полей ограничений уникальности модели, кроме id."""
+    opts = model._meta
+    return [
+        (field.name,) for field in opts.concrete_fields
+        if field.unique and not field.primary_key
+    ] + [tuple(names) for names in opts.unique_together] + [
+        tuple(constraint.fields)
+        for constraint in opts.total_unique_constraints
+    ]
+
+
+def format_copy_value(value):
+    """
+    Значение для COPY ... WITH (FORMAT csv, NULL '\\N'). NULL пишется
+    без кавычек: значение в кавычках COPY считает строкой, поэтому
+    пустая строка и строка \\N в кавычках остаются строками.
+    """
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, (bool, int, float, Decimal)):
+        return str(value)
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def get_copy_buffer(rows):
+    """Строки в формате CSV для COPY FROM STDIN."""
+    buffer = StringIO()
+    for row in rows:
+        buffer.write(','.join(map(format_copy_value, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+class StagingTable:
+    """
+    Временная таблица с колонками таблицы модели и номером строки
+    файла. Строки проверяются в ней запросами над всей таблицей
+    и переносятся в таблицу модели одним INSERT ... SELECT.
+    """
+
+    ROW = 'import_row'
+
+    def __init__(self, cursor, model, header, fields):
+        self.cursor = cursor
+        self.connection = cursor.db
+        self.model = model
+        self.quote = self.connection.ops.quote_name
+        self.table = self.quote(model._meta.db_table)
+        self.name = self.quote(f'import_{model._meta.db_table}')
+        self.fields = model._meta.concrete_fields
+        self.header = dict(zip(fields, header))
+        self.columns = ', '.join(
+            self.quote(field.column) for field in self.fields
+        )
+
+    def column(self, field, table=None):
+        return f'{table or self.name}.{self.quote(field.column)}'
+
+    def create(self):
+        self.cursor.execute(f'DROP TABLE IF EXISTS {self.name}')
+        self.cursor.execute(
+            f'CREATE TEMPORARY TABLE {self.name} AS '
+            f'SELECT {self.columns} FROM {self.table} WHERE 1 = 0'
+        )
+        self.cursor.execute(
+            f'ALTER TABLE {self.name} ADD COLUMN {self.ROW} integer'
+        )
+
+    def load(self, rows):
+        """
+        Запись пачки строк: на PostgreSQL через COPY FROM STDIN,
+        на остальных СУБД через executemany.
+        """
+        if not rows:
+            return
+        columns = f'{self.columns}, {self.ROW}'
+        if self.connection.vendor == 'postgresql':
+            self.cursor.copy_expert(
+                f'COPY {self.name} ({columns}) FROM STDIN '
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                get_copy_buffer(rows)
+            )
+            return
+        placeholders = ', '.join(['%s'] * (len(self.fields) + 1))
+        self.cursor.executemany(
+            f'INSERT INTO {self.name} ({columns}) VALUES ({placeholders})',
+            rows
+        )
+
+    def index(self, *column_sets):
+        """Индексы временной таблицы строятся после загрузки строк."""
+        for number, fields in enumerate(column_sets):
+            name = self.quote(
+                f'import_{self.model._meta.db_table}_{number}'
+            )
+            columns = ', '.join(self.quote(field.column) for field in fields)
+            self.cursor.execute(
+                f'CREATE INDEX {name} ON {self.name} ({columns})'
+            )
+        if self.connection.vendor == 'postgresql':
+            self.cursor.execute(f'ANALYZE {self.name}')
+
+    def remove(self, condition):
+        """Удаление строк по условию, количество удаленных строк."""
+        self.cursor.execute(f'DELETE FROM {self.name} WHERE {condition}')
+        return self.cursor.rowcount
+
+    def select(self, condition):
+        """Номера и значения колонок файла строк, отвечающих условию."""
+        columns = ', '.join(self.column(field) for field in self.header)
+        self.cursor.execute(
+            f'SELECT {self.ROW}, {columns} FROM {self.name} '
+            f'WHERE {condition} ORDER BY {self.ROW}'
+        )
+        while True:
+            rows = self.cursor.fetchmany(constants.IMPORT_BATCH_SIZE)
+            if not rows:
+                return
+            for number, *values in rows:
+                yield number, dict(zip(self.header.values(), values))
+
+    @contextmanager
+    def deferred_indexes(self):
+        """
+        На SQLite неуникальные индексы таблицы модели удаляются
+        на время переноса строк и строятся заново одним проходом.
+        Уникальные индексы остаются: они проверяют данные.
+        """
+        if self.connection.vendor != 'sqlite':
+            yield
+            return
+        self.cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = %s AND sql IS NOT NULL",
+            [self.model._meta.db_table]
+        )
+        indexes = [
+            (name, sql) for name, sql in self.cursor.fetchall()
+            if not sql.upper().startswith('CREATE UNIQUE')
+        ]
+        for name, _ in indexes:
+            self.cursor.execute(f'DROP INDEX {self.quote(name)}')
+        yield
+        for _, sql in indexes:
+            self.cursor.execute(sql)
+
+    def transfer(self):
+        """Перенос оставшихся строк в таблицу модели."""
+        with self.deferred_indexes():
+            self.cursor.execute(
+                f'INSERT INTO {self.table} ({self.columns}) '
+                f'SELECT {self.columns} FROM {self.name} '
+                f'ORDER BY {self.ROW}'
+            )
+            created = self.cursor.rowcount
+        reset_sequences(self.model, self.connection.alias)
+        self.cursor.execute(f'DROP TABLE {self.name}')
+        return created
+
+
+class NativeImporter(BulkImporter):
+    """
+    Начальная загрузка средствами СУБД, без объектов моделей и ORM.
+    Строки файла проверяются по типам полей и пишутся во временную
+    таблицу: на PostgreSQL через COPY FROM STDIN, на SQLite через
+    executemany. Существующие id, повторы id, внешние ключи
+    и уникальность проверяются запросами над всей таблицей,
+    затем строки переносятся одним INSERT ... SELECT.
+    Файл импортируется в одной транзакции. Отзывы и комментарии
+    на шардах так не загрузить: внешние ключи в другой БД.
+    """
+
+    def __init__(self, batch_size=constants.IMPORT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.passwords = []
+
+    def get_defaults(self, model, header_fields):
+        """Значения полей, которых нет в файле."""
+        now = timezone.now()
+        defaults = {}
+        for field in model._meta.concrete_fields:
+            if field in header_fields:
+                continue
+            if isinstance(field, models.DateField) and not (
+                field.null or field.has_default()
+            ):
+                defaults[field.attname] = now
+            else:
+                defaults[field.attname] = field.get_default()
+        return defaults
+
+    def complete(self, model, values):
+        """Поля, которые модель заполняет в save()."""
+        if model is User:
+            if not self.passwords:
+                self.passwords = get_unusable_passwords(self.batch_size)
+            values['password'] = self.passwords.pop()
+            values['username_lower'] = values.get('username', '').lower()
+            values['email_lower'] = values.get('email', '').lower()
+
+    def prepare(self, model, connection, defaults, number, values):
+        """Строка временной таблицы из значений полей."""
+        values = {
+            **defaults,
+            **{field.attname: value for field, value in values.items()}
+        }
+        self.complete(model, values)
+        return [
+            field.get_db_prep_save(values[field.attname], connection)
+            for field in model._meta.concrete_fields
+        ] + [number]
+
+    def check(self, staging, stats):
+        """
+        Проверки над всей временной таблицей. Строки с id, который
+        уже есть в БД, пропускаются, остальные ошибочные отклоняются.
+        """
+        pk = staging.model._meta.pk
+        stats.skipped += staging.remove(
+            f'EXISTS (SELECT 1 FROM {staging.table} WHERE '
+            f'{staging.column(pk, staging.table)} = {staging.column(pk)})'
+        )
+        unique_sets = [(pk,)] + [
+            tuple(staging.model._meta.get_field(name) for name in names)
+            for names in get_unique_sets(staging.model)
+        ]
+        staging.index(*unique_sets)
+        for field in staging.header:
+            if not field.many_to_one:
+                continue
+            related = field.related_model._meta
+            parent = staging.quote(related.db_table)
+            self.reject(staging, stats, (
+                f'{staging.column(field)} IS NOT NULL AND NOT EXISTS ('
+                f'SELECT 1 FROM {parent} WHERE '
+                f'{staging.column(related.pk, parent)} = '
+                f'{staging.column(field)})'
+            ), lambda row, field=field: (
+                f'{field.name}: объект {row[staging.header[field]]} '
+                f'не найден.'
+            ))
+        for fields in unique_sets:
+            self.reject(staging, stats, self.conflict(staging, fields), (
+                lambda row, fields=fields: (
+                    f'{", ".join(field.name for field in fields)}: '
+                    f'значение уже существует.'
+                )
+            ))
+
+    def conflict(self, staging, fields):
+        """Условие: такие значения уже в таблице или в строке выше."""
+        duplicate = staging.quote('duplicate')
+
+        def same(table):
+            return ' AND '.join(
+                f'{staging.column(field, table)} = {staging.column(field)}'
+                for field in fields
+            )
+
+        condition = (
+            f'EXISTS (SELECT 1 FROM {staging.name} AS {duplicate} '
+            f'WHERE {same(duplicate)} AND '
+            f'{duplicate}.{staging.ROW} < {staging.name}.{staging.ROW})'
+        )
+        if fields == (staging.model._meta.pk,):
+            return condition
+        return (
+            f'{condition} OR EXISTS (SELECT 1 FROM {staging.table} '
+            f'WHERE {same(staging.table)})'
+        )
+
+    def reject(self, staging, stats, condition, reason):
+        for number, row in staging.select(condition):
+            stats.reject(number, row, reason(row))
+        staging.remove(condition)
+
+    def import_file(self, name, path, progress=None):
+        model = MODELS[name]
+        connection = connections[DEFAULT_DB_ALIAS]
+        with open_csv(path) as (reader, source, rejected_rows):
+            fields = self.get_fields(model, reader.fieldnames or ())
+            if model._meta.pk not in fields:
+                raise RowError(
+                    f'Колонка {model._meta.pk.name} обязательна '
+                    f'для загрузки средствами СУБД.'
+                )
+            defaults = self.get_defaults(model, fields)
+            stats = ImportStats(name, source, rejected_rows)
+            with transaction.atomic(), connection.cursor() as cursor:
+                staging = StagingTable(
+                    cursor, model, reader.fieldnames, fields
+                )
+                staging.create()
+                for chunk in read_chunks(reader, self.batch_size):
+                    rows = []
+                    for row in chunk:
+                        stats.rows += 1
+                        try:
+                            values = self.clean(fields, row)
+                        except RowError as error:
+                            stats.reject(stats.rows, row, str(error))
+                            continue
+                        rows.append(self.prepare(
+                            model, connection, defaults, stats.rows, values
+                        ))
+                    staging.load(rows)
+                    if progress is not None:
+                        progress(stats)
+                self.check(staging, stats)
+                try:
+                    stats.add_created(staging.transfer())
+                except IntegrityError as error:
+                    raise RowError(str(error))
+        return stats.finish()
+
+
+class UpsertImporter(BulkImporter):
+    """
+    Повторный импорт выгрузок по id. Для файла хранится SHA-256
+    (ImportedFile), для строки — контрольная сумма значений
+    (ImportedRow). Неизмененный файл пропускается целиком,
+    неизмененная строка — без разбора значений. Новые строки
+    создаются bulk_create, измененные обновляются bulk_update пачками.
+    С delete_missing удаляются объекты, загруженные прошлыми
+    импортами и пропавшие из файла. Объекты, созданные через API,
+    не трогаются. Произведения, категории и пользователи удаляются
+    мягко, их зависимые удалит purgedeleted.
+    """
+
+    def __init__(self, batch_size=constants.IMPORT_BATCH_SIZE,
+                 file_workers=1, delete_missing=False):
+        super().__init__(batch_size, file_workers)
+        self.delete_missing = delete_missing
+        self.checksums = {}
+        self.seen = {}
+        self.pk_columns = {}
+        self.update_fields = {}
+
+    def load_checksums(self, model):
+        self.checksums[model] = dict(
+            ImportedRow.objects.filter(
+                model=model._meta.object_name
+            ).values_list('object_id', 'checksum').iterator()
+        )
+        self.seen[model] = set()
+        return self.checksums[model]
+
+    def get_update_fields(self, model, fields):
+        names = [field.name for field in fields if not field.primary_key]
+        if model is User:
+            names.extend(
+                f'{name}_lower' for name in ('username', 'email')
+                if name in names
+            )
+        return names
+
+    def write(self, model, items, using):
+        existing = self.get_ids(model)
+        new = [item for item in items if item[2].pk not in existing]
+        changed = [obj for *_, obj in items if obj.pk in existing]
+        if new:
+            super().write(model, new, using)
+        if changed:
+            if model is User:
+                for obj in changed:
+                    obj.fill_lower_fields()
+            model._base_manager.using(using).bulk_update(
+                changed, self.update_fields[model],
+                batch_size=self.batch_size
+            )
+        name = model._meta.object_name
+        ImportedRow.objects.filter(
+            model=name, object_id__in=[obj.pk for *_, obj in items]
+        ).delete()
+        ImportedRow.objects.bulk_create([
+            ImportedRow(
+                model=name, object_id=obj.pk,
+                checksum=get_row_checksum(row)
+            )
+            for _, row, obj in items
+        ])
+
+    def check_row(self, model, fields, row, existing, stats):
+        """Неизмененная строка пропускается до разбора значений."""
+        column = self.pk_columns[model]
+        try:
+            pk = int(row[column])
+        except (TypeError, ValueError):
+            stats.reject(stats.rows, row, f'{column}: неверный id.')
+            return None
+        self.seen[model].add(pk)
+        if pk in existing and (
+            self.checksums[model].get(pk) == get_row_checksum(row)
+        ):
+            stats.skipped += 1
+            return None
+        try:
+            return self.convert(model, fields, row)
+        except RowError as error:
+            stats.reject(stats.rows, row, str(error))
+            return None
+
+    def count(self, model, saved, stats):
+        existing = self.get_ids(model)
+        updated = sum(obj.pk in existing for *_, obj in saved)
+        stats.add_updated(updated)
+        stats.add_created(len(saved) - updated)
+
+    def import_file(self, name, path, progress=None):
+        model = MODELS[name]
+        checksum = get_file_checksum(path)
+        if ImportedFile.objects.filter(
+            model=name, checksum=checksum
+        ).exists():
+            with open_csv(path) as (_, source, rejected_rows):
+                stats = ImportStats(name, source, rejected_rows)
+                stats.unchanged = True
+            return stats.finish()
+        existing = self.get_ids(model)
+        checksums = self.load_checksums(model)
+        with open_csv(path) as (reader, source, rejected_rows):
+            header = reader.fieldnames or ()
+            fields = self.get_fields(model, header)
+            if model._meta.pk not in fields:
+                raise RowError(
+                    f'Колонка {model._meta.pk.name} обязательна для --upsert.'
+                )
+            self.pk_columns[model] = header[fields.index(model._meta.pk)]
+            self.update_fields[model] = self.get_update_fields(model, fields)
+            stats = ImportStats(name, source, rejected_rows)
+            with ParallelWriter(self.file_workers) as writer:
+                self.read_file(model, reader, fields, existing, stats,
+                               writer, progress)
+        if stats.created:
+            for using in get_model_databases(model):
+                reset_sequences(model, using)
+        if self.delete_missing:
+            stats.deleted = self.delete(
+                model, checksums.keys() - self.seen[model]
+            )
+        if not stats.rejected:
+            # Файл с отклоненными строками импортируется снова
+            ImportedFile.objects.update_or_create(
+                model=name, defaults={'checksum': checksum}
+            )
+        return stats.finish()
+
+    def delete(self, model, ids):
+        """Удаление объектов пачками, количество удаленных."""
+        ids = sorted(ids)
+        deleted = 0
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            if model._meta.label_lower in PURGE_STEPS:
+                for obj in model.objects.filter(pk__in=batch):
+                    soft_delete(obj)
+                    deleted += 1
+            else:
+                databases = [DEFAULT_DB_ALIAS]
+                if model in (Review, Comments) and is_sharded():
+                    databases = settings.REVIEW_SHARDS
+                for using in databases:
+                    _, counts = model._base_manager.using(using).filter(
+                        pk__in=batch
+                    ).delete()
+                    deleted += counts.get(model._meta.label, 0)
+            ImportedRow.objects.filter(
+                model=model._meta.object_name, object_id__in=batch
+            ).delete()
+            if model is Review and self.review_shards is not None:
+                for pk in batch:
+                    self.review_shards.pop(pk, None)
+            else:
+                self.ids[model].difference_update(batch)
+        return deleted
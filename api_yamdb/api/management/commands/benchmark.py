@@ -0,0 +1,407 @@
+import csv
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (
+    DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction,
+)
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.importer import MODELS, PROCEDURE, supports_parallel_writes
+from reviews.models import Category, Review, Title
+from users.models import User
+
+BATCH_SIZE = 5000
+REPEAT = 5
+TITLES_URL = '/api/v1/titles/'
+# id синтетических строк импорта, чтобы не пересекаться с данными БД
+IMPORT_ID_OFFSET = 10 ** 9
+IMPORT_GENRES = 20
+# Умолчания SQLite и модуля sqlite3 (busy timeout 5 с задает сам модуль)
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'default',
+}
+
+
+class Rollback(Exception):
+    """Отмена транзакции с синтетическими данными."""
+
+
+class Command(BaseCommand):
+    """
+    Замеры производительности на синтетических данных.
+    Данные создаются в транзакции, которая откатывается после замеров
+    (или удаляются в конце сценария), поэтому запускать команду стоит
+    на копии БД, а не на рабочей.
+    """
+
+    help = 'Замеры производительности, benchmark <сценарий> [--size N].'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenario', type=str,
+            help=f'Сценарий: {", ".join(self.get_scenarios())}'
+        )
+        parser.add_argument(
+            '--size', type=int, default=100000,
+            help='Количество синтетических объектов'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Число параллельных клиентов (sqlite-concurrency) '
+                 'или потоков импорта (import)'
+        )
+        parser.add_argument(
+            '--operations', type=int, default=100,
+            help='Запросов на клиента (sqlite-concurrency)'
+        )
+        parser.add_argument(
+            '--writes', type=float, default=0.2,
+            help='Доля POST-запросов отзывов (sqlite-concurrency)'
+        )
+
+    def get_scenarios(self):
+        return {
+            'title-years': self.bench_title_years,
+            'sqlite-concurrency': self.bench_sqlite_concurrency,
+            'import': self.bench_import,
+        }
+
+    def handle(self, *args, **kwargs):
+        scenario = self.get_scenarios().get(kwargs['scenario'])
+        if scenario is None:
+            raise CommandError(f'Неизвестный сценарий {kwargs["scenario"]}.')
+        scenario(kwargs)
+
+    def measure(self, queryset):
+        """Лучшее время выборки id из REPEAT запусков, в миллисекундах."""
+        timings = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            list(queryset.values_list('pk', flat=True))
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    def explain(self, queryset, label):
+        """
+        План запроса. Метка в комментарии делает текст запроса уникальным:
+        SQLite кэширует подготовленный EXPLAIN и не видит удаленный индекс.
+        """
+        sql, params = queryset.order_by().query.sql_with_params()
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} /* {label} */ {sql}', params)
+            return '\n'.join(
+                ' '.join(str(value) for value in row)
+                for row in cursor.fetchall()
+            )
+
+    def report(self, title, queries):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, queryset in queries.items():
+            self.stdout.write(f'{name}: {self.measure(queryset):.2f} мс')
+            self.stdout.write(self.explain(queryset, f'{title}: {name}'))
+
+    def create_titles(self, size):
+        Category.objects.bulk_create(
+            Category(name=f'Категория {number}', slug=f'bench-{number}')
+            for number in range(10)
+        )
+        category_ids = list(
+            Category.objects.filter(
+                slug__startswith='bench-'
+            ).values_list('pk', flat=True)
+        )
+        random.seed(size)
+        for start in range(0, size, BATCH_SIZE):
+            Title.objects.bulk_create(
+                Title(
+                    name=f'Произведение {number}',
+                    year=random.randint(1900, 2020),
+                    category_id=random.choice(category_ids),
+                )
+                for number in range(start, min(start + BATCH_SIZE, size))
+            )
+        return category_ids
+
+    def bench_title_years(self, options):
+        """Фильтры year_min/year_max с индексами по году и без них."""
+        try:
+            with transaction.atomic():
+                category_ids = self.create_titles(options['size'])
+                queries = {
+                    'year 1995': Title.objects.filter(
+                        year__gte=1995, year__lte=1995
+                    ),
+                    'year 1990-1999': Title.objects.filter(
+                        year__gte=1990, year__lte=1999
+                    ),
+                    'category + year 1990-1999': Title.objects.filter(
+                        category_id=category_ids[0],
+                        year__gte=1990, year__lte=1999
+                    ),
+                }
+                self.report('С индексами', queries)
+                with connection.cursor() as cursor:
+                    for index in Title._meta.indexes:
+                        cursor.execute(f'DROP INDEX {index.name}')
+                self.report('Без индексов', queries)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run_client(self, user, title_ids, options, seed, results):
+        """
+        Клиент вперемешку отправляет отзывы и читает список произведений.
+        Каждый отзыв пишется на свое произведение, поэтому повторов нет,
+        пока --operations не больше --size.
+        """
+        client = APIClient()
+        client.force_authenticate(user)
+        rng = random.Random(seed)
+        targets = rng.sample(title_ids, len(title_ids))
+        try:
+            for number in range(options['operations']):
+                method = 'POST' if rng.random() < options['writes'] else 'GET'
+                start = time.perf_counter()
+                try:
+                    if method == 'POST':
+                        response = client.post(
+                            f'{TITLES_URL}{targets[number]}/reviews/',
+                            {'text': 'Отзыв', 'score': rng.randint(1, 10)}
+                        )
+                    else:
+                        response = client.get(
+                            TITLES_URL,
+                            {'offset': rng.randrange(len(title_ids))}
+                        )
+                    failed = response.status_code >= 400
+                except OperationalError:
+                    failed = True
+                results.append(
+                    (method, time.perf_counter() - start, failed)
+                )
+        finally:
+            connection.close()
+
+    def report_concurrency(self, title, results, elapsed):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        self.stdout.write(f'{len(results) / elapsed:.0f} запросов/с')
+        for method in ('GET', 'POST'):
+            timings = sorted(
+                duration * 1000 for name, duration, _ in results
+                if name == method
+            )
+            if not timings:
+                continue
+            errors = sum(
+                failed for name, _, failed in results if name == method
+            )
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{method}: {len(timings)} запросов, ошибок {errors}, '
+                f'медиана {statistics.median(timings):.2f} мс, '
+                f'p95 {p95:.2f} мс'
+            )
+
+    def bench_sqlite_concurrency(self, options):
+        """
+        Параллельные POST отзывов и GET произведений с умолчаниями SQLite
+        и с SQLITE_PRAGMAS. Нужна файловая БД: потоки работают через свои
+        соединения, поэтому данные фиксируются и удаляются в конце.
+        """
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('Сценарий работает только с файлом SQLite.')
+        if options['operations'] > options['size']:
+            raise CommandError('--operations не может быть больше --size.')
+        try:
+            with transaction.atomic():
+                self.create_titles(options['size'])
+                users = [
+                    User.objects.create(
+                        username=f'bench-user-{number}',
+                        email=f'bench-user-{number}@yamdb.fake',
+                    )
+                    for number in range(options['threads'])
+                ]
+            title_ids = list(
+                Title.objects.filter(
+                    category__slug__startswith='bench-'
+                ).values_list('pk', flat=True)
+            )
+            modes = (
+                ('Умолчания SQLite', DEFAULT_SQLITE_PRAGMAS),
+                ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+            )
+            for title, pragmas in modes:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    connections.close_all()
+                    Review.objects.filter(author__in=users).delete()
+                    results = []
+                    clients = [
+                        threading.Thread(
+                            target=self.run_client,
+                            args=(user, title_ids, options, seed, results)
+                        )
+                        for seed, user in enumerate(users)
+                    ]
+                    start = time.perf_counter()
+                    for client in clients:
+                        client.start()
+                    for client in clients:
+                        client.join()
+                    self.report_concurrency(
+                        title, results, time.perf_counter() - start
+                    )
+        finally:
+            Title.objects.filter(category__slug__startswith='bench-').delete()
+            Category.objects.filter(slug__startswith='bench-').delete()
+            User.objects.filter(username__startswith='bench-').delete()
+
+    def write_csv(self, directory, name, header, rows):
+        with open(os.path.join(directory, f'{name}.csv'), 'w', newline='',
+                  encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def generate_import_files(self, directory, size):
+        """
+        Файлы в формате static/data: size отзывов, size // 10
+        произведений, по два жанра у каждого и size // 2 комментариев.
+        """
+        offset = IMPORT_ID_OFFSET
+        titles = max(size // 10, 1)
+        users = size // titles + 1
+        random.seed(size)
+        self.write_csv(
+            directory, 'User',
+            ('id', 'username', 'email', 'role', 'bio', 'first_name',
+             'last_name'),
+            (
+                (offset + number, f'bench-import-{number}',
+                 f'bench-import-{number}@yamdb.fake', 'user', '', '', '')
+                for number in range(users)
+            )
+        )
+        self.write_csv(
+            directory, 'category', ('id', 'name', 'slug'),
+            (
+                (offset + number, f'Категория {number}',
+                 f'bench-import-{number}')
+                for number in range(10)
+            )
+        )
+        self.write_csv(
+            directory, 'genre', ('id', 'name', 'slug'),
+            (
+                (offset + number, f'Жанр {number}', f'bench-import-{number}')
+                for number in range(IMPORT_GENRES)
+            )
+        )
+        self.write_csv(
+            directory, 'Title', ('id', 'name', 'year', 'category'),
+            (
+                (offset + number, f'Произведение {number}',
+                 random.randint(1900, 2020), offset + number % 10)
+                for number in range(titles)
+            )
+        )
+        self.write_csv(
+            directory, 'GenreTitle', ('id', 'title_id', 'genre_id'),
+            (
+                (offset + number, offset + number // 2,
+                 offset + (number // 2 + number % 2 * 7) % IMPORT_GENRES)
+                for number in range(titles * 2)
+            )
+        )
+        self.write_csv(
+            directory, 'review',
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (
+                (offset + number, offset + number % titles,
+                 f'Отзыв {number}', offset + number // titles,
+                 random.randint(1, 10), '2020-01-01T00:00:00Z')
+                for number in range(size)
+            )
+        )
+        self.write_csv(
+            directory, 'comments',
+            ('id', 'review_id', 'text', 'author', 'pub_date'),
+            (
+                (offset + number, offset + random.randrange(size),
+                 f'Комментарий {number}', offset + random.randrange(users),
+                 '2020-01-01T00:00:00Z')
+                for number in range(size // 2)
+            )
+        )
+
+    def delete_imported(self):
+        """Удаление синтетических строк импорта в обратном порядке."""
+        aliases = (DEFAULT_DB_ALIAS, *settings.REVIEW_SHARDS)
+        for name in reversed(PROCEDURE):
+            table = MODELS[name]._meta.db_table
+            for alias in aliases:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {table} WHERE id >= %s',
+                        (IMPORT_ID_OFFSET,)
+                    )
+
+    def bench_import(self, options):
+        """
+        importcsv --bulk последовательно и с --workers/--file-workers,
+        importcsv --native на сгенерированных файлах. Строки фиксируются
+        и удаляются после каждого запуска.
+        """
+        threads = options['threads']
+        if not supports_parallel_writes():
+            self.stdout.write(
+                self.style.WARNING(
+                    'SQLite допускает одного писателя: запуски --bulk '
+                    'последовательные, ускорение видно на PostgreSQL.'
+                )
+            )
+        modes = (
+            ('Последовательно', '--bulk', 1, 1),
+            (f'Параллельно, {threads} потоков', '--bulk', threads, threads),
+            ('Средствами СУБД', '--native', 1, 1),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            self.generate_import_files(directory, options['size'])
+            rows = 0
+            for name in os.listdir(directory):
+                with open(os.path.join(directory, name),
+                          encoding='utf-8') as csvfile:
+                    rows += sum(1 for _ in csvfile) - 1
+            try:
+                for title, mode, workers, file_workers in modes:
+                    self.delete_imported()
+                    start = time.perf_counter()
+                    call_command(
+                        'importcsv', directory, mode, '--quiet',
+                        '--batch-size', str(BATCH_SIZE),
+                        '--workers', str(workers),
+                        '--file-workers', str(file_workers),
+                        stdout=self.stdout
+                    )
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(self.style.MIGRATE_HEADING(title))
+                    self.stdout.write(
+                        f'{rows} строк за {elapsed:.1f} с, '
+                        f'{rows / elapsed:.0f} строк/с'
+                    )
+            finally:
+                self.delete_imported()
@@ -0,0 +1,67 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import constants
+from api.exporter import Exporter, supports_shared_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Экспорт данных из БД в файлы *.csv в формате static/data:
+    те же имена файлов и заголовки, что читает importcsv.
+    Таблицы читаются пачками в одной транзакции чтения,
+    см. api.exporter.Exporter. С --workers на PostgreSQL таблицы
+    выгружаются одновременно в разные файлы из одного снимка БД.
+    Пароли, права и помеченные на удаление объекты не выгружаются.
+    """
+
+    help = 'Экспорт данных в директорию, exportcsv <путь к директории>.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dir', type=str,
+            help='Папка для файлов экспорта, создается при необходимости'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.EXPORT_BATCH_SIZE,
+            help='Количество строк, читаемых из БД за раз'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Таблиц, выгружаемых одновременно'
+        )
+        parser.add_argument(
+            '--quiet', action='store_true',
+            help='Без итогов по файлам; для cron'
+        )
+
+    def get_workers(self, workers):
+        if workers < 1:
+            raise CommandError('Число потоков должно быть положительным.')
+        if workers > 1 and not supports_shared_snapshots():
+            if not self.quiet:
+                self.stdout.write(
+                    self.style.WARNING(
+                        'Потоки могут читать один снимок только '
+                        'на PostgreSQL, экспорт выполняется '
+                        'последовательно.'
+                    )
+                )
+            return 1
+        return workers
+
+    def handle(self, *args, **kwargs):
+        self.quiet = kwargs['quiet']
+        if kwargs['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        exporter = Exporter(
+            kwargs['batch_size'], self.get_workers(kwargs['workers'])
+        )
+        try:
+            os.makedirs(kwargs['dir'], exist_ok=True)
+            for name, stats in exporter.export(kwargs['dir']):
+                if not self.quiet:
+                    self.stdout.write(self.style.SUCCESS(str(stats)))
+        except OSError as error:
+            raise CommandError(error)
@@ -1,31 +1,22 @@
 import csv
-import os
 
 from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from reviews.models import Category, Comments, Genre, Review, Title, GenreTitle
+from api import constants
+from api.importer import (
+    MODELS, BulkImporter, ImportStats, NativeImporter, Progress, RowError,
+    UpsertImporter, file_dates, get_model_databases, get_model_files,
+    get_rejected_path, open_csv, reset_sequences, run_stages,
+    supports_parallel_writes,
+)
+from api.import_validation import ImportValidator
+from api.sharding import get_title_shard, is_sharded
+from api.utils import scatter
+from reviews.models import Review
 
 User = get_user_model()
 
-MODELS = {
-    'User': User,
-    'Category': Category,
-    'Genre': Genre,
-    'Title': Title,
-    'GenreTitle': GenreTitle,
-    'Review': Review,
-    'Comments': Comments,
-}
-PROCEDURE = [
-    'User',
-    'Category',
-    'Genre',
-    'Title',
-    'GenreTitle',
-    'Review',
-    'Comments'
-]
 HEADERS = [
     'genre',
     'category',
@@ -42,6 +33,19 @@ class Command(BaseCommand):
     в которую импортируются данные.
     Константа PROCEDURE определяет порядок импорта.
     Константа HEADERS определяет поля БД с внешним ключем.
+    С --bulk файлы читаются пачками и записываются bulk_create,
+    см. api.importer.BulkImporter.
+    Отклоненные строки с причинами записываются в <файл>.rejected.csv.
+    С --workers независимые файлы (User, Category, Genre) импортируются
+    одновременно, с --file-workers пачки одного файла пишутся
+    параллельно. На SQLite, где писатель один, импорт последовательный.
+    С --native файлы загружаются средствами СУБД через временные
+    таблицы, см. api.importer.NativeImporter.
+    С --upsert строки сопоставляются по id: новые создаются, измененные
+    обновляются, неизмененные файлы и строки пропускаются,
+    см. api.importer.UpsertImporter.
+    С --validate-only файлы только проверяются, без записи в БД,
+    см. api.import_validation.ImportValidator.
     """
 
     help = 'Импорт данных из директории, importcsv <путь к директории>.'
@@ -51,16 +55,47 @@ class Command(BaseCommand):
             'dir', type=str,
             help='Папка с файлами для импорта данных'
         )
-
-    def get_model_file(self, dir):
-        """Чтение директории и составление словаря Модель - Файл."""
-        list_dir = os.listdir(dir)
-        model_file = {}
-        for file in list_dir:
-            name = file.split('.')
-            model = name[0]
-            model_file[model] = file
-        return model_file
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Массовый импорт пачками через bulk_create'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.IMPORT_BATCH_SIZE,
+            help='Количество строк в одной транзакции для --bulk '
+                 'и в пачке проверки --validate-only'
+        )
+        parser.add_argument(
+            '--native', action='store_true',
+            help='Начальная загрузка средствами СУБД: COPY на PostgreSQL, '
+                 'executemany на SQLite'
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Повторный импорт по id: создание новых и обновление '
+                 'измененных строк'
+        )
+        parser.add_argument(
+            '--delete-missing', action='store_true',
+            help='Для --upsert: удалить объекты прошлых импортов, '
+                 'которых нет в файле'
+        )
+        parser.add_argument(
+            '--validate-only', action='store_true',
+            help='Проверить файлы без записи в БД и вывести отчет'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Файлов, импортируемых одновременно, для --bulk'
+        )
+        parser.add_argument(
+            '--file-workers', type=int, default=1,
+            help='Потоков записи пачек одного файла для --bulk'
+        )
+        parser.add_argument(
+            '--quiet', action='store_true',
+            help='Без прогресса и итогов, только отклоненные строки; '
+                 'для cron'
+        )
 
     def prepare_row(self, data):
         """Подготовка данных для создания объекта."""
@@ -68,58 +103,166 @@ class Command(BaseCommand):
             try:
                 if header == 'author':
                     data[header] = User.objects.get(id=value)
+                elif header == 'review':
+                    data[header] = scatter(Review.objects.all()).get(id=value)
                 elif header in HEADERS:
                     data[header] = MODELS[
                         header.capitalize()
                     ].objects.get(id=value)
             except Exception as e:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f'Объект {data[header]}={value} не '
-                        f'существует. Ошибка: {e}.\n'
-                    )
+                raise RowError(
+                    f'Объект {header}={value} не существует. Ошибка: {e}.'
                 )
-                continue
         return data
 
+    def get_database(self, model, data):
+        """Шард для отзывов и комментариев по произведению или отзыву."""
+        if not is_sharded():
+            return None
+        if model == 'Review':
+            return get_title_shard(data.get('title_id') or data['title'].pk)
+        if model == 'Comments':
+            review = data.get('review') or scatter(
+                Review.objects.all()
+            ).get(id=data['review_id'])
+            return review._state.db
+        return None
+
     def create_models_object(self, model, data):
-        """Создание объекта модели."""
+        """Создание объекта модели, True если он создан."""
         if model == 'User':
-            obj = User.objects.create_user(**data)
-        else:
-            obj, st = MODELS[
-                model
-            ].objects.get_or_create(**data)
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Объект {obj} создан.'
+            User.objects.create_user(**data)
+            return True
+        obj, created = MODELS[model].objects.db_manager(
+            self.get_database(model, data)
+        ).get_or_create(**data)
+        return created
+
+    def import_rows(self, name, path, progress):
+        """Построчный импорт файла через get_or_create."""
+        with open_csv(path) as (reader, source, rejected_rows):
+            stats = ImportStats(name, source, rejected_rows)
+            for row in reader:
+                stats.rows += 1
+                try:
+                    created = self.create_models_object(
+                        name, self.prepare_row(dict(row))
+                    )
+                except Exception as e:
+                    stats.reject(stats.rows, row, str(e))
+                else:
+                    if created:
+                        stats.created += 1
+                    else:
+                        stats.skipped += 1
+                if progress is not None:
+                    progress(stats)
+        if stats.created:
+            # Строки создаются с id из файла
+            for using in get_model_databases(MODELS[name]):
+                reset_sequences(MODELS[name], using)
+        return stats.finish()
+
+    def report(self, stats, path):
+        if stats.rejected:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{path}: отклонено строк {stats.rejected}, '
+                    f'причины в {get_rejected_path(path)}.'
+                )
             )
-        )
+        if not self.quiet:
+            self.stdout.write(self.style.SUCCESS(str(stats)))
+
+    def get_workers(self, kwargs):
+        workers = kwargs['workers'], kwargs['file_workers']
+        if workers == (1, 1):
+            return workers
+        if not self.bulk:
+            raise CommandError('--workers и --file-workers только с --bulk.')
+        if min(workers) < 1:
+            raise CommandError('Число потоков должно быть положительным.')
+        if not supports_parallel_writes():
+            if not self.quiet:
+                self.stdout.write(
+                    self.style.WARNING(
+                        'SQLite допускает одного писателя, '
+                        'импорт выполняется последовательно.'
+                    )
+                )
+            return 1, 1
+        return workers
+
+    def get_importer(self, kwargs, file_workers):
+        if kwargs['upsert']:
+            if kwargs['native']:
+                raise CommandError('--upsert и --native несовместимы.')
+            return UpsertImporter(
+                kwargs['batch_size'], file_workers, kwargs['delete_missing']
+            )
+        if not kwargs['native']:
+            return BulkImporter(kwargs['batch_size'], file_workers)
+        if is_sharded():
+            if not self.quiet:
+                self.stdout.write(
+                    self.style.WARNING(
+                        'Отзывы на шардах ссылаются на произведения '
+                        'в другой БД, импорт выполняется через bulk_create.'
+                    )
+                )
+            return BulkImporter(kwargs['batch_size'], file_workers)
+        return NativeImporter(kwargs['batch_size'])
+
+    def validate(self, model_files, batch_size):
+        """Проверка файлов без импорта, ошибка команды при ошибках."""
+        validator = ImportValidator(batch_size)
+        invalid = 0
+        for name, path in model_files.items():
+            try:
+                report = validator.validate_file(name, path)
+            except (OSError, UnicodeDecodeError, csv.Error) as error:
+                raise CommandError(f'{path}: {error}')
+            invalid += len(report.invalid)
+            if report.invalid or not self.quiet:
+                for line in report.lines():
+                    self.stdout.write(line)
+        if invalid:
+            raise CommandError(
+                f'Строк с ошибками: {invalid}, импорт не выполнялся.'
+            )
+        if not self.quiet:
+            self.stdout.write(self.style.SUCCESS('Ошибок не найдено.'))
 
     def handle(self, *args, **kwargs):
-        dir = kwargs['dir']
-        model_file = self.get_model_file(dir)
-        try:
-            for operation in PROCEDURE:
-                file = model_file[operation]
-                with open(dir + file, newline='', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    for row in reader:
-                        row = self.prepare_row(row)
-                        try:
-                            self.create_models_object(operation, row)
-                        except Exception as e:
-                            self.stdout.write(
-                                self.style.WARNING(
-                                    f'При импорте в модели {operation} '
-                                    f'произошла ошибка: {e}.\n'
-                                    f'Проверьте данные {file}: {row}'
-                                )
-                            )
-                            continue
-        except Exception as e:
+        self.quiet = kwargs['quiet']
+        if kwargs['delete_missing'] and not kwargs['upsert']:
+            raise CommandError('--delete-missing только с --upsert.')
+        self.bulk = any(
+            kwargs[mode] for mode in ('bulk', 'native', 'upsert')
+        )
+        progress = None if self.quiet else Progress(self.stdout)
+        model_files = get_model_files(kwargs['dir'])
+        if kwargs['validate_only']:
+            return self.validate(model_files, kwargs['batch_size'])
+        workers, file_workers = self.get_workers(kwargs)
+        if self.bulk:
+            import_file = self.get_importer(kwargs, file_workers).import_file
+        else:
+            import_file = self.import_rows
+
+        def import_stage(name):
+            path = model_files[name]
+            try:
+                return import_file(name, path, progress)
+            except (OSError, UnicodeDecodeError, csv.Error,
+                    RowError) as error:
+                raise CommandError(f'{path}: {error}')
+
+        with file_dates(MODELS.values() if self.bulk else ()):
+            for name, stats in run_stages(model_files, import_stage, workers):
+                self.report(stats, model_files[name])
+        if self.bulk and not self.quiet:
             self.stdout.write(
-                self.style.ERROR(
-                    f'При импорте в модели {operation} произошла ошибка {e}.'
-                )
-            )
\ No newline at end of file
+                'Обновите индексы и счетчики: '
+                'rebuildsearch и recountcounters.'
+            )
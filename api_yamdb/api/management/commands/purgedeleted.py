@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import constants
+from api.purge import purge
+from reviews.models import PurgeJob
+
+
+class Command(BaseCommand):
+    """
+    Фоновое удаление объектов, помеченных через API.
+    Зависимые строки удаляются пачками в коротких транзакциях,
+    прогресс сохраняется в PurgeJob, поэтому прерванный запуск
+    продолжается с того же места.
+    """
+
+    help = 'Удаление помеченных объектов и зависимых от них строк.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.PURGE_BATCH_SIZE,
+            help='Количество строк в одной транзакции'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза между пачками в секундах, снижает нагрузку на БД'
+        )
+        parser.add_argument(
+            '--watch', type=float, default=None, metavar='SECONDS',
+            help='Не завершаться, проверять новые задания с этим интервалом'
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            self.purge_pending(kwargs['batch_size'], kwargs['sleep'])
+            if kwargs['watch'] is None:
+                return
+            time.sleep(kwargs['watch'])
+
+    def purge_pending(self, batch_size, sleep):
+        for job in PurgeJob.objects.filter(finished_at__isnull=True):
+            for job in purge(job, batch_size, sleep):
+                if job.finished_at is None:
+                    self.stdout.write(
+                        f'{job}: обработано строк {job.processed}.'
+                    )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{job} удален, обработано строк {job.processed}.'
+                )
+            )
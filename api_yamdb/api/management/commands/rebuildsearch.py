@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from reviews.search import comment_search, review_search, title_search
+
+INDEXES = {
+    'title': title_search,
+    'review': review_search,
+    'comment': comment_search,
+}
+
+
+class Command(BaseCommand):
+    """
+    Перестроение полнотекстовых индексов.
+    Нужно после массового импорта, который не вызывает сигналы моделей.
+    """
+
+    help = 'Перестроение поисковых индексов, rebuildsearch [индекс ...].'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes', nargs='*',
+            help=f'Индексы для перестроения: {", ".join(INDEXES)}. '
+                 'По умолчанию все'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных, в которой перестраиваются индексы'
+        )
+
+    def handle(self, *args, **kwargs):
+        using = kwargs['database']
+        unknown = set(kwargs['indexes']) - INDEXES.keys()
+        if unknown:
+            raise CommandError(f'Неизвестные индексы: {", ".join(unknown)}.')
+        for name in kwargs['indexes'] or INDEXES:
+            with transaction.atomic(using=using):
+                count = INDEXES[name].rebuild(using=using)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Индекс {name} перестроен, записей: {count}.'
+                )
+            )
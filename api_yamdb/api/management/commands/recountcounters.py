@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+
+from api import constants
+from api.utils import scatter
+from reviews.models import Comments, Review, Title
+
+
+def count_by(queryset, field):
+    """Количество строк queryset по значениям field одним GROUP BY."""
+    return queryset.order_by().values(field).annotate(
+        count=Count('pk')
+    ).values_list(field, 'count')
+
+
+def recount(objects, counter, count_children, batch_size):
+    """
+    Пересчет counter у objects пачками по pk.
+    Записываются только расходящиеся значения, возвращается их число.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', counter
+            )[:batch_size]
+        )
+        if not rows:
+            return fixed
+        last_pk = rows[-1][0]
+        counts = count_children([pk for pk, _ in rows])
+        changed = [
+            objects.model(pk=pk, **{counter: counts.get(pk, 0)})
+            for pk, value in rows
+            if value != counts.get(pk, 0)
+        ]
+        with transaction.atomic(using=objects.db):
+            objects.bulk_update(changed, (counter,))
+        fixed += len(changed)
+
+
+class Command(BaseCommand):
+    """
+    Пересчет счетчиков reviews_count и comments_count.
+    Счетчики обновляются сигналами, пересчет нужен после импорта
+    без сигналов, ручных правок БД или миграции шардов.
+    Запускайте при малой нагрузке: отзывы, добавленные во время
+    пересчета пачки, могут быть не учтены до следующего запуска.
+    """
+
+    help = 'Пересчет количества отзывов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.RECOUNT_BATCH_SIZE,
+            help='Количество объектов в одной пачке'
+        )
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        fixed = recount(
+            Title.all_objects.all(), 'reviews_count',
+            lambda title_ids: dict(scatter(count_by(
+                Review.objects.filter(title_id__in=title_ids), 'title_id'
+            ))),
+            batch_size
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счетчиков отзывов: {fixed}.')
+        )
+        fixed = 0
+        for using in settings.REVIEW_SHARDS or (DEFAULT_DB_ALIAS,):
+            fixed += recount(
+                Review.objects.using(using), 'comments_count',
+                lambda review_ids: dict(count_by(
+                    Comments.objects.using(using).filter(
+                        review_id__in=review_ids
+                    ),
+                    'review_id'
+                )),
+                batch_size
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счетчиков комментариев: {fixed}.')
+        )
@@ -0,0 +1,18 @@
+from django.contrib.auth.models import UserManager
+from django.db import models
+
+
+class AliveManager(models.Manager):
+    """
+    Менеджер без объектов, помеченных на удаление.
+    Такие объекты скрыты сразу, а удаляются позже командой purgedeleted.
+    """
+
+    use_in_migrations = False
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class AliveUserManager(AliveManager, UserManager):
+    """Менеджер пользователей без помеченных на удаление."""
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from api.routers import (
+    choose_replica, is_pinned_to_primary, pin_to_primary, replica_alias
+)
+
+
+def get_request_user_id(request):
+    """Id пользователя из JWT или сессии без запроса к таблице users."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is not None:
+        # Middleware работает вне обработки исключений DRF: неверный
+        # заголовок или токен отклонит аутентификация представления
+        try:
+            raw_token = authentication.get_raw_token(header)
+            if raw_token is None:
+                return None
+            token = authentication.get_validated_token(raw_token)
+        except AuthenticationFailed:
+            return None
+        return token.get(api_settings.USER_ID_CLAIM)
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы читают с реплики. После успешной записи
+    пользователь REPLICA_STICKY_SECONDS читает с основной БД, чтобы
+    не потерять свои изменения из-за отставания реплики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        user_id = get_request_user_id(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if user_id is not None and response.status_code < 400:
+                pin_to_primary(user_id)
+            return response
+        if user_id is not None and is_pinned_to_primary(user_id):
+            return self.get_response(request)
+        token = replica_alias.set(choose_replica())
+        try:
+            return self.get_response(request)
+        finally:
+            replica_alias.reset(token)
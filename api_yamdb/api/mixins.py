@@ -1,10 +1,19 @@
+from django.db.models.signals import post_save
+from django.http import Http404
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.mixins import (
     CreateModelMixin, DestroyModelMixin, ListModelMixin,
 )
-from rest_framework import filters
+from rest_framework import filters, status
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from api.permissions import IsAdminUserOrReadOnly
+from api.sharding import (
+    ShardedQuerySet, get_title_shard, is_sharded, review_shard,
+)
+from api.utils import scatter
+from reviews.models import Title
 
 
 class ModelMixinSet(CreateModelMixin, ListModelMixin,
@@ -13,3 +22,128 @@ class ModelMixinSet(CreateModelMixin, ListModelMixin,
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+
+
+class AuthorWriteMixin:
+    """
+    Изменение и удаление объектов автором без предварительной загрузки.
+    Для обычных пользователей право на запись проверяется в самом запросе
+    UPDATE/DELETE ... WHERE id=? AND author_id=?.
+    Если ни одна строка не затронута, одним EXISTS определяется,
+    нужно ли вернуть 403 или 404. После UPDATE отправляется post_save,
+    чтобы индексы и счетчики видели изменение как при save().
+    Модераторы и администраторы проходят стандартный путь
+    с проверкой has_object_permission.
+    """
+
+    title_lookup = None
+
+    def get_write_queryset(self):
+        """
+        Объекты, доступные по URL, без обращения к родителям:
+        фильтр по аргументам URL, совпадающим с полями модели
+        сериализатора, например title_id для отзывов.
+        """
+        model = self.get_serializer_class().Meta.model
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        fields = {field.attname for field in model._meta.concrete_fields}
+        queryset = model._default_manager.filter(**{
+            name: value for name, value in self.kwargs.items()
+            if name != lookup and name in fields
+        })
+        return self.filter_alive_title(queryset)
+
+    def filter_alive_title(self, queryset):
+        """
+        Записи под помеченным на удаление произведением недоступны,
+        как и при чтении. Путь к произведению задает title_lookup.
+        """
+        if self.title_lookup is None:
+            return queryset
+        if is_sharded():
+            # Произведения в основной БД, на шарде их не соединить
+            if Title.objects.filter(pk=self.kwargs.get('title_id')).exists():
+                return queryset
+            return queryset.none()
+        return queryset.filter(
+            **{f'{self.title_lookup}__deleted_at__isnull': True}
+        )
+
+    def is_author_write(self):
+        user = self.request.user
+        return not (user.is_moderator or user.is_admin)
+
+    def get_target_queryset(self):
+        return self.get_write_queryset().filter(
+            pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        )
+
+    def raise_not_found_or_denied(self, queryset):
+        if queryset.exists():
+            raise PermissionDenied
+        raise Http404
+
+    def update(self, request, *args, **kwargs):
+        if not self.is_author_write():
+            return super().update(request, *args, **kwargs)
+        partial = kwargs.pop('partial', False)
+        queryset = self.get_target_queryset()
+        own_queryset = queryset.filter(author=request.user)
+        serializer = self.get_serializer(data=request.data, partial=partial)
+        if not serializer.is_valid():
+            if not own_queryset.exists():
+                self.raise_not_found_or_denied(queryset)
+            raise ValidationError(serializer.errors)
+        if serializer.validated_data:
+            updated = own_queryset.update(**serializer.validated_data)
+        else:
+            updated = own_queryset.exists()
+        if not updated:
+            self.raise_not_found_or_denied(queryset)
+        if not is_sharded():
+            queryset = queryset.select_related('author')
+        instance = queryset.get()
+        post_save.send(
+            sender=type(instance), instance=instance, created=False,
+            update_fields=frozenset(serializer.validated_data),
+            raw=False, using=queryset.db
+        )
+        return Response(self.get_serializer(instance).data)
+
+    def destroy(self, request, *args, **kwargs):
+        if not self.is_author_write():
+            return super().destroy(request, *args, **kwargs)
+        queryset = self.get_target_queryset()
+        deleted, _ = queryset.filter(author=request.user).delete()
+        if not deleted:
+            self.raise_not_found_or_denied(queryset)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TitleShardMixin:
+    """
+    Запросы вложенных маршрутов titles/{title_id}/... к отзывам
+    и комментариям идут на шард произведения.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = review_shard.set(get_title_shard(kwargs.get('title_id')))
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            review_shard.reset(token)
+
+
+class ScatterGatherMixin:
+    """
+    Чтение отзывов или комментариев со всех шардов. Фильтры применяются
+    к запросу каждого шарда, пагинация — к объединенному результату.
+    """
+
+    def get_queryset(self):
+        return scatter(super().get_queryset())
+
+    def filter_queryset(self, queryset):
+        if isinstance(queryset, ShardedQuerySet):
+            return queryset.map(super().filter_queryset)
+        return super().filter_queryset(queryset)
@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PrefixCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация для поиска по префиксу.
+    Страницы выбираются условием по той же нормализованной колонке,
+    что и фильтр, без OFFSET и подсчета общего количества.
+    """
+
+    ordering = 'username_lower'
+
+    def get_ordering(self, request, queryset, view):
+        return (view.get_prefix_ordering(),)
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Keyset-пагинация от новых записей к старым."""
+
+    ordering = '-pub_date'
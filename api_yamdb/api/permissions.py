@@ -11,6 +11,16 @@ class IsAdminOrStaff(permissions.BasePermission):
         )
 
 
+class IsAdminOrModerator(permissions.BasePermission):
+    """Разрешение только для модераторов и администраторов."""
+
+    def has_permission(self, request, view):
+        return (
+            request.user.is_authenticated
+            and (request.user.is_moderator or request.user.is_admin)
+        )
+
+
 class IsAdminUserOrReadOnly(permissions.BasePermission):
     """
     Разрешение на полный доступ для администраторов
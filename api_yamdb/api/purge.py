@@ -0,0 +1,106 @@
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api import constants
+from api.sharding import get_title_shard
+from reviews.models import Comments, GenreTitle, PurgeJob, Review, Title
+
+User = get_user_model()
+
+
+def soft_delete(instance):
+    """
+    Мягкое удаление: объект сразу скрывается из API,
+    зависимые удаляются позже командой purgedeleted.
+    """
+    instance.deleted_at = timezone.now()
+    update_fields = ['deleted_at']
+    if isinstance(instance, User):
+        instance.is_active = False
+        update_fields.append('is_active')
+    with transaction.atomic():
+        instance.save(update_fields=update_fields)
+        PurgeJob.objects.get_or_create(
+            model=instance._meta.label_lower, object_id=instance.pk
+        )
+
+
+def get_title_steps(pk):
+    using = get_title_shard(pk) or DEFAULT_DB_ALIAS
+    return (
+        (Comments.objects.using(using).filter(review__title_id=pk), None),
+        (Review.objects.using(using).filter(title_id=pk), None),
+        (GenreTitle.objects.filter(title_id=pk), None),
+    )
+
+
+def get_category_steps(pk):
+    return (
+        (Title.all_objects.filter(category_id=pk), {'category': None}),
+    )
+
+
+def get_user_steps(pk):
+    steps = []
+    for using in settings.REVIEW_SHARDS or (DEFAULT_DB_ALIAS,):
+        comments = Comments.objects.using(using)
+        steps.extend((
+            (comments.filter(author_id=pk), None),
+            (comments.filter(review__author_id=pk), None),
+            (Review.objects.using(using).filter(author_id=pk), None),
+        ))
+    return steps
+
+
+PURGE_STEPS = {
+    'reviews.title': get_title_steps,
+    'reviews.category': get_category_steps,
+    User._meta.label_lower: get_user_steps,
+}
+
+
+def run_step(job, queryset, values, batch_size, sleep):
+    """
+    Удаление строк queryset или запись в них values пачками
+    по batch_size, каждая пачка в своей короткой транзакции.
+    """
+    pks = queryset.order_by().values_list('pk', flat=True)
+    while True:
+        with transaction.atomic(using=queryset.db):
+            ids = list(pks[:batch_size])
+            if not ids:
+                return
+            batch = queryset.filter(pk__in=ids)
+            if values is None:
+                batch.delete()
+            else:
+                batch.update(**values)
+        PurgeJob.objects.filter(pk=job.pk).update(
+            processed=F('processed') + len(ids), updated_at=timezone.now()
+        )
+        job.processed += len(ids)
+        yield job
+        if sleep:
+            time.sleep(sleep)
+
+
+def purge(job, batch_size=constants.PURGE_BATCH_SIZE, sleep=0):
+    """
+    Удаление помеченного объекта задания вместе с зависимыми.
+    Генератор отдает задание после каждой пачки для вывода прогресса.
+    Прерванное задание продолжается с оставшихся строк.
+    """
+    for queryset, values in PURGE_STEPS[job.model](job.object_id):
+        yield from run_step(job, queryset, values, batch_size, sleep)
+    apps.get_model(job.model)._default_manager.filter(
+        pk=job.object_id, deleted_at__isnull=False
+    ).delete()
+    job.finished_at = timezone.now()
+    job.save(update_fields=('finished_at', 'updated_at'))
+    yield job
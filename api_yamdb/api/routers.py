@@ -0,0 +1,109 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from api.sharding import (
+    SHARDED_MODELS, get_instance_shard, is_sharded, review_shard
+)
+
+# Реплика для чтения в текущем запросе; None — читать с основной БД
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+def get_primary_pin_cache_key(user_id):
+    return f'primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Чтение с основной БД для пользователя после его записи."""
+    cache.set(
+        get_primary_pin_cache_key(user_id), True,
+        settings.REPLICA_STICKY_SECONDS
+    )
+
+
+def is_pinned_to_primary(user_id):
+    return cache.get(get_primary_pin_cache_key(user_id), False)
+
+
+def choose_replica():
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class PrimaryReplicaRouter:
+    """
+    Запись — в основную БД, чтение в безопасных запросах — с реплики,
+    выбранной ReplicaRoutingMiddleware. Вне запросов (команды, shell)
+    и после записи пользователя чтение идет с основной БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        """Объекты, прочитанные с реплики, сохраняются в основную БД."""
+        instance = hints.get('instance')
+        if (
+            instance is not None
+            and instance._state.db in settings.DATABASE_REPLICAS
+        ):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReviewShardRouter:
+    """
+    Отзывы и комментарии хранятся на шарде своего произведения
+    (REVIEW_SHARDS). Шард берется из объекта-подсказки или из
+    review_shard, который выставляют вложенные маршруты. Остальные
+    модели, запрошенные через объект шарда (автор отзыва), читаются
+    с основной БД или реплики. Должен стоять перед PrimaryReplicaRouter.
+    """
+
+    def get_shard(self, hints):
+        shard = get_instance_shard(hints.get('instance'))
+        return shard or review_shard.get()
+
+    def is_shard_instance(self, hints):
+        instance = hints.get('instance')
+        return (
+            instance is not None
+            and instance._state.db in settings.REVIEW_SHARDS
+        )
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded():
+            return None
+        if model._meta.label_lower in SHARDED_MODELS:
+            return self.get_shard(hints)
+        if self.is_shard_instance(hints):
+            return replica_alias.get() or DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not is_sharded():
+            return None
+        if model._meta.label_lower in SHARDED_MODELS:
+            return self.get_shard(hints)
+        if self.is_shard_instance(hints):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} & set(settings.REVIEW_SHARDS):
+            return True
+        return None
@@ -1,11 +1,18 @@
 import re
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 
 from api import constants
-from reviews.models import Category, Comments, Genre, Review, Title
+from api.fields import BatchSlugRelatedField
+from api.genre_index import genre_bitset_index
+from api.utils import annotate_rating, attach_ratings
+from reviews.models import (
+    Category, Comments, Genre, GenreTitle, Review, Title,
+)
 from reviews.validators import validate_title_year
 
 User = get_user_model()
@@ -52,6 +59,13 @@ class SignUpSerializer(serializers.ModelSerializer):
         email = attrs.get('email')
         if User.objects.filter(username=username, email=email).exists():
             return attrs
+        if User.all_objects.filter(
+            Q(username=username) | Q(email=email), deleted_at__isnull=False
+        ).exists():
+            raise serializers.ValidationError(
+                'Пользователь с таким именем или email удаляется, '
+                'повторите позже.'
+            )
         if User.objects.filter(username=username).exists():
             raise serializers.ValidationError(
                 {'username': ['Имя уже занято!']}
@@ -114,19 +128,26 @@ class TitleReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         fields = (
-            'id', 'name', 'year', 'rating', 'description', 'genre', 'category',
+            'id', 'name', 'year', 'rating', 'reviews_count', 'description',
+            'genre', 'category',
         )
         model = Title
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.category and instance.category.deleted_at:
+            data['category'] = None
+        return data
+
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для записи произведений."""
 
-    category = serializers.SlugRelatedField(
+    category = BatchSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = BatchSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True,
@@ -142,8 +163,41 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         )
         model = Title
 
+    def set_genres(self, title, genres):
+        """Запись связей с жанрами одним INSERT."""
+        genre_ids = list(dict.fromkeys(genre.pk for genre in genres))
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre_id=genre_id)
+            for genre_id in genre_ids
+        )
+        transaction.on_commit(
+            lambda: genre_bitset_index.update_title(
+                title.pk, title.category_id, genre_ids
+            )
+        )
+
+    @transaction.atomic
+    def create(self, validated_data):
+        genres = validated_data.pop('genre')
+        title = super().create(validated_data)
+        self.set_genres(title, genres)
+        return title
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        instance = super().update(instance, validated_data)
+        if genres is not None:
+            GenreTitle.objects.filter(title=instance).delete()
+            self.set_genres(instance, genres)
+        return instance
+
     def to_representation(self, instance):
         """Метод для вывода информации как при гет-запросе."""
+        instance = annotate_rating(
+            Title.objects.select_related('category').prefetch_related('genre')
+        ).get(pk=instance.pk)
+        attach_ratings([instance])
         return TitleReadSerializer(instance).data
 
 
@@ -160,7 +214,9 @@ class ReviewSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = ('id', 'text', 'author', 'score', 'pub_date',)
+        fields = (
+            'id', 'text', 'author', 'score', 'comments_count', 'pub_date',
+        )
         model = Review
 
     def validate(self, data):
@@ -169,7 +225,7 @@ class ReviewSerializer(serializers.ModelSerializer):
             request.method == 'POST'
             and Review.objects.filter(
                 title=get_object_or_404(
-                    Title,
+                    Title.objects,
                     pk=self.context.get('view').kwargs.get('title_id')
                 ),
                 author=request.user
@@ -195,6 +251,23 @@ class CommentsSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date',)
 
 
+class ModerationReviewSerializer(ReviewSerializer):
+    """Сериализатор отзывов для поиска модераторами."""
+
+    class Meta(ReviewSerializer.Meta):
+        fields = (
+            'id', 'title', 'text', 'author', 'score', 'comments_count',
+            'pub_date',
+        )
+
+
+class ModerationCommentSerializer(CommentsSerializer):
+    """Сериализатор комментариев для поиска модераторами."""
+
+    class Meta(CommentsSerializer.Meta):
+        fields = ('id', 'review', 'text', 'author', 'pub_date',)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для пользователей."""
 
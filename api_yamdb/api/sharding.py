@@ -0,0 +1,196 @@
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import cmp_to_key
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import QuerySet
+
+SHARDED_MODELS = ('reviews.review', 'reviews.comments')
+
+# Шард отзывов для запросов вложенных маршрутов titles/{title_id}/...
+review_shard = ContextVar('review_shard', default=None)
+
+executor = None
+
+
+def is_sharded():
+    return bool(settings.REVIEW_SHARDS)
+
+
+def get_title_shard(title_id):
+    """Шард отзывов произведения по хэшу его id, None без шардирования."""
+    shards = settings.REVIEW_SHARDS
+    if not shards or title_id is None:
+        return None
+    return shards[zlib.crc32(str(int(title_id)).encode()) % len(shards)]
+
+
+def get_instance_shard(instance):
+    """Шард объекта-подсказки роутера, если его можно определить."""
+    if instance is None:
+        return None
+    if instance._state.db in settings.REVIEW_SHARDS:
+        return instance._state.db
+    label = instance._meta.label_lower
+    if label == 'reviews.title':
+        return get_title_shard(instance.pk)
+    if label == 'reviews.review':
+        return get_title_shard(instance.title_id)
+    if label == 'reviews.comments' and instance._meta.get_field(
+        'review'
+    ).is_cached(instance):
+        return get_instance_shard(instance.review)
+    return None
+
+
+def run_on_shard(func, queryset):
+    """Выполнение в потоке пула со своим соединением к шарду."""
+    close_old_connections()
+    return func(queryset)
+
+
+def gather(func, querysets):
+    """Вызов func для запросов ко всем шардам параллельно."""
+    global executor
+    if len(querysets) == 1:
+        return [func(querysets[0])]
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=len(settings.REVIEW_SHARDS),
+            thread_name_prefix='review-shard',
+        )
+    return list(
+        executor.map(run_on_shard, [func] * len(querysets), querysets)
+    )
+
+
+def get_value(obj, field):
+    for name in field.split('__'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def compare(first, second, ordering):
+    for field in ordering:
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+        left, right = get_value(first, field), get_value(second, field)
+        if left == right:
+            continue
+        if left is None or right is None:
+            result = -1 if left is None else 1
+        else:
+            result = -1 if left < right else 1
+        return -result if descending else result
+    return 0
+
+
+class ShardedQuerySet:
+    """
+    Чтение отзывов или комментариев со всех шардов как из одного QuerySet.
+    Методы, возвращающие QuerySet (filter, order_by, annotate...),
+    применяются к запросу каждого шарда. Итерация, срезы и count()
+    выполняются на шардах параллельно, строки объединяются по order_by:
+    для среза [a:b] с каждого шарда читается не больше b строк.
+    """
+
+    def __init__(self, querysets):
+        self.querysets = list(querysets)
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        # JOIN с таблицами основной БД на шарде вернул бы пустой результат
+        if queryset.query.select_related:
+            queryset = queryset.select_related(None)
+        return cls(
+            queryset.using(alias) for alias in settings.REVIEW_SHARDS
+        )
+
+    @property
+    def model(self):
+        return self.querysets[0].model
+
+    @property
+    def ordering(self):
+        query = self.querysets[0].query
+        return (
+            query.order_by
+            or (query.default_ordering and query.get_meta().ordering)
+            or ()
+        )
+
+    def map(self, func):
+        return type(self)(func(queryset) for queryset in self.querysets)
+
+    def __getattr__(self, name):
+        method = getattr(QuerySet, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        def apply(*args, **kwargs):
+            results = [
+                getattr(queryset, name)(*args, **kwargs)
+                for queryset in self.querysets
+            ]
+            if all(isinstance(result, QuerySet) for result in results):
+                return type(self)(results)
+            raise TypeError(f'{name}() не поддерживается для шардов.')
+        return apply
+
+    def gather(self, func):
+        return gather(func, self.querysets)
+
+    def merge(self, parts):
+        rows = [row for part in parts for row in part]
+        ordering = self.ordering
+        if ordering:
+            rows.sort(key=cmp_to_key(
+                lambda first, second: compare(first, second, ordering)
+            ))
+        return rows
+
+    def count(self):
+        return sum(self.gather(QuerySet.count))
+
+    def exists(self):
+        return any(self.gather(QuerySet.exists))
+
+    def get(self, *args, **kwargs):
+        rows = self.merge(
+            self.gather(lambda queryset: list(
+                queryset.filter(*args, **kwargs)[:2]
+            ))
+        )
+        if not rows:
+            raise self.model.DoesNotExist(
+                f'{self.model._meta.object_name} не найден ни на одном шарде.'
+            )
+        if len(rows) > 1:
+            raise self.model.MultipleObjectsReturned
+        return rows[0]
+
+    def delete(self):
+        total, per_model = 0, Counter()
+        for deleted, counts in self.gather(QuerySet.delete):
+            total += deleted
+            per_model.update(counts)
+        return total, dict(per_model)
+
+    def __iter__(self):
+        return iter(self.merge(self.gather(list)))
+
+    def __len__(self):
+        return len(self.merge(self.gather(list)))
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        if key.stop is None:
+            return list(self)[key]
+        stop = key.stop
+        return self.merge(
+            self.gather(lambda queryset: list(queryset[:stop]))
+        )[key]
@@ -0,0 +1,179 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from api.autocomplete import title_prefix_index
+from api.genre_index import genre_bitset_index
+from api.sharding import ShardedQuerySet, get_title_shard, is_sharded
+from reviews.models import Category, Comments, Genre, Review, Title
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Title)
+def update_title_indexes(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Обновление подсказок и индекса жанров после фиксации транзакции
+    с сохранением произведения: откаченные изменения в них не попадут.
+    """
+    if raw:
+        return
+    if instance.deleted_at is not None:
+        remove_title_indexes(sender, instance, using=using)
+        return
+    transaction.on_commit(
+        lambda: title_prefix_index.update(instance), using=using
+    )
+    transaction.on_commit(
+        lambda: genre_bitset_index.update_title(
+            instance.pk, instance.category_id
+        ),
+        using=using
+    )
+
+
+@receiver(post_delete, sender=Title)
+def remove_title_indexes(sender, instance, using=None, **kwargs):
+    """
+    Удаление произведения из подсказок и индекса жанров
+    после фиксации транзакции.
+    """
+    title_id = instance.pk
+
+    def remove():
+        title_prefix_index.remove(title_id)
+        genre_bitset_index.remove_title(title_id)
+
+    transaction.on_commit(remove, using=using)
+
+
+@receiver(post_delete, sender=Genre)
+def remove_genre_bitset_index_genre(sender, instance, **kwargs):
+    """Удаление жанра из индекса жанров."""
+    genre_bitset_index.remove_genre(instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def remove_genre_bitset_index_category(sender, instance, **kwargs):
+    """Удаление категории из индекса жанров."""
+    genre_bitset_index.remove_category(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_title_prefix_index_rating(sender, instance, using=None,
+                                     raw=False, **kwargs):
+    """Пересчет рейтинга в подсказках после изменения отзывов."""
+    if not raw:
+        title_prefix_index.schedule_rating_update(
+            instance.title_id, using=using
+        )
+
+
+def increment_counter(queryset, field, delta=1):
+    """Атомарное изменение счетчика одним UPDATE без чтения строки."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Review)
+def increment_title_reviews_count(sender, instance, created, raw=False,
+                                  **kwargs):
+    """Увеличение счетчика отзывов произведения."""
+    if created and not raw:
+        increment_counter(
+            Title.all_objects.filter(pk=instance.title_id), 'reviews_count'
+        )
+
+
+@receiver(post_delete, sender=Review)
+def decrement_title_reviews_count(sender, instance, **kwargs):
+    """Уменьшение счетчика отзывов произведения."""
+    increment_counter(
+        Title.all_objects.filter(pk=instance.title_id), 'reviews_count', -1
+    )
+
+
+@receiver(post_save, sender=Comments)
+def increment_review_comments_count(sender, instance, created, using=None,
+                                    raw=False, **kwargs):
+    """Увеличение счетчика комментариев отзыва в БД комментария."""
+    if created and not raw:
+        increment_counter(
+            Review.objects.using(using).filter(pk=instance.review_id),
+            'comments_count'
+        )
+
+
+@receiver(post_delete, sender=Comments)
+def decrement_review_comments_count(sender, instance, using=None, **kwargs):
+    """Уменьшение счетчика комментариев отзыва в БД комментария."""
+    increment_counter(
+        Review.objects.using(using).filter(pk=instance.review_id),
+        'comments_count', -1
+    )
+
+
+@receiver(pre_delete, sender=Title)
+def delete_title_reviews_on_shard(sender, instance, **kwargs):
+    """
+    Каскадное удаление отзывов произведения на его шарде.
+    Каскад Django ищет их в БД произведения, а не на шарде.
+    """
+    shard = get_title_shard(instance.pk)
+    if shard is not None:
+        Review.objects.using(shard).filter(title_id=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_reviews_on_shards(sender, instance, **kwargs):
+    """Каскадное удаление отзывов и комментариев автора на всех шардах."""
+    if not is_sharded():
+        return
+    for model in (Comments, Review):
+        ShardedQuerySet.from_queryset(
+            model.objects.filter(author_id=instance.pk)
+        ).delete()
+
+
+@receiver(post_migrate)
+def clear_caches_on_flush(sender, **kwargs):
+    """Сброс кэшей в памяти после миграций и очистки БД."""
+    title_prefix_index.reset()
+    genre_bitset_index.reset()
+
+
+@receiver(request_started)
+def check_database_connections(**kwargs):
+    """
+    Закрытие оборвавшихся постоянных соединений перед запросом.
+    Django 3.2 проверяет их только после ошибок, поэтому разорванное
+    пулером или сервером соединение иначе сломало бы первый запрос.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Настройка нового соединения SQLite по SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
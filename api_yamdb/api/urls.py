@@ -2,8 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
-    CategoryViewSet, CommentsViewSet, GenreViewSet, ReviewViewSet,
-    TitleViewSet, UsersViewSet, get_token, signup,
+    CategoryViewSet, CommentsViewSet, GenreViewSet, ModerationCommentViewSet,
+    ModerationReviewViewSet, ReviewViewSet, TitleViewSet, UsersViewSet,
+    get_token, signup,
 )
 
 router_v1 = DefaultRouter()
@@ -21,6 +22,16 @@ router_v1.register(
     basename='comments'
 )
 router_v1.register('users', UsersViewSet, basename='users')
+router_v1.register(
+    'moderation/reviews',
+    ModerationReviewViewSet,
+    basename='moderation-reviews'
+)
+router_v1.register(
+    'moderation/comments',
+    ModerationCommentViewSet,
+    basename='moderation-comments'
+)
 
 auth_patterns = [
     path('signup/', signup, name='user-registration'),
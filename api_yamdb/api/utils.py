@@ -2,8 +2,12 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
+from django.db.models import Avg, FloatField, Value
 from rest_framework.generics import get_object_or_404
 
+from api.sharding import ShardedQuerySet, is_sharded
+from reviews.models import Review
+
 User = get_user_model()
 
 
@@ -12,7 +16,7 @@ def send_confirmation_code_to_email(username):
     Отправка пользователю кода подтверждения
     для получения токена доступа.
     """
-    user = get_object_or_404(User, username=username)
+    user = get_object_or_404(User.objects, username=username)
     confirmation_code = default_token_generator.make_token(user)
     send_mail(
         'Код подтвержения для завершения регистрации',
@@ -22,3 +26,64 @@ def send_confirmation_code_to_email(username):
         fail_silently=False,
     )
     user.save()
+
+
+def get_slug_ids(model, slugs):
+    """
+    Сопоставление slug -> id для объектов модели одним запросом
+    slug IN (...). Возвращает словарь только для найденных slug.
+    Значения не кэшируются: кэш процесса не узнает об удалении
+    или переименовании объекта в другом процессе.
+    """
+    slugs = set(slugs)
+    if not slugs:
+        return {}
+    return dict(
+        model.objects.filter(
+            slug__in=slugs
+        ).order_by().values_list('slug', 'id')
+    )
+
+
+def scatter(queryset):
+    """Запрос отзывов или комментариев ко всем шардам, если они есть."""
+    if is_sharded():
+        return ShardedQuerySet.from_queryset(queryset)
+    return queryset
+
+
+def get_title_ratings(title_ids=None):
+    """
+    Средние оценки произведений {id: рейтинг}. Все отзывы произведения
+    лежат на одном шарде, поэтому средние с шардов просто объединяются.
+    Без title_ids считаются все произведения с отзывами.
+    """
+    reviews = Review.objects.order_by()
+    if title_ids is not None:
+        reviews = reviews.filter(title_id__in=title_ids)
+    return dict(scatter(
+        reviews.values('title_id').annotate(
+            rating=Avg('score')
+        ).values_list('title_id', 'rating')
+    ))
+
+
+def annotate_rating(queryset):
+    """
+    Рейтинг произведений как средняя оценка отзывов. При шардировании
+    отзывы в других БД, и рейтинг заполняет attach_ratings.
+    """
+    if is_sharded():
+        return queryset.annotate(
+            rating=Value(None, output_field=FloatField())
+        )
+    return queryset.annotate(rating=Avg('reviews__score'))
+
+
+def attach_ratings(titles):
+    """Рейтинг произведений страницы со всех шардов."""
+    if is_sharded():
+        ratings = get_title_ratings([title.pk for title in titles])
+        for title in titles:
+            title.rating = ratings.get(title.pk)
+    return titles
@@ -1,27 +1,43 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (
     AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly, SAFE_METHODS
 )
 from rest_framework.response import Response
 
-from api.filters import FilterTitle
-from api.mixins import ModelMixinSet
+from api import constants
+from api.autocomplete import title_prefix_index
+from api.facets import FACETS, get_title_facets
+from api.filters import (
+    FilterModerationComment, FilterModerationReview, FilterTitle,
+    FullTextSearchFilter, StableOrderingFilter, UserPrefixFilter,
+)
+from api.mixins import (
+    AuthorWriteMixin, ModelMixinSet, ScatterGatherMixin, TitleShardMixin,
+)
+from api.pagination import PrefixCursorPagination, PubDateCursorPagination
 from api.permissions import (
-    IsAdminModeratorAuthorOrReadOnly, IsAdminOrStaff, IsAdminUserOrReadOnly,
+    IsAdminModeratorAuthorOrReadOnly, IsAdminOrModerator, IsAdminOrStaff,
+    IsAdminUserOrReadOnly,
 )
+from api.purge import soft_delete
 from api.serializers import (
     AuthTokenSerializer, CategorySerializer, CommentsSerializer,
-    GenreSerializer, ReviewSerializer, SignUpSerializer, TitleReadSerializer,
+    GenreSerializer, ModerationCommentSerializer, ModerationReviewSerializer,
+    ReviewSerializer, SignUpSerializer, TitleReadSerializer,
     TitleWriteSerializer, UserSerializer,
 )
-from api.utils import send_confirmation_code_to_email
-from reviews.models import Category, Genre, Review, Title
+from api.sharding import is_sharded
+from api.utils import (
+    annotate_rating, attach_ratings, scatter, send_confirmation_code_to_email,
+)
+from reviews.models import Category, Comments, Genre, Review, Title
+from reviews.search import comment_search, review_search, title_search
 from users.token import get_tokens_for_user
 
 User = get_user_model()
@@ -56,7 +72,9 @@ def get_token(request):
     """
     serializer = AuthTokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    user = get_object_or_404(User, username=request.data['username'])
+    user = get_object_or_404(
+        User.objects, username=request.data['username']
+    )
     confirmation_code = serializer.data.get('confirmation_code')
     if default_token_generator.check_token(user, confirmation_code):
         return Response(get_tokens_for_user(user), status=status.HTTP_200_OK)
@@ -73,6 +91,9 @@ class CategoryViewSet(ModelMixinSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    def perform_destroy(self, instance):
+        soft_delete(instance)
+
 
 class GenreViewSet(ModelMixinSet):
     """
@@ -92,14 +113,14 @@ class TitleViewSet(viewsets.ModelViewSet):
     Создание, изменение, удаление доступно только администраторам.
     """
 
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).all().order_by('rating')
+    queryset = Title.objects.all()
     permission_classes = (IsAdminUserOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
-    ordering_fields = ['name', 'category', 'genre', 'year', 'rating']
-    ordering = ['rating']
+    filter_backends = (
+        DjangoFilterBackend, StableOrderingFilter, FullTextSearchFilter,
+    )
     filterset_class = FilterTitle
+    search_index = title_search
+    order_by_search_rank = True
     http_method_names = ('get', 'post', 'patch', 'delete',)
 
     def get_serializer_class(self):
@@ -107,8 +128,80 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    @property
+    def ordering_fields(self):
+        """
+        При шардировании отзывы в других БД, и рейтинг в запросе
+        не посчитать: сортировка по нему не принимается.
+        """
+        fields = ['name', 'category', 'genre', 'year']
+        return fields if is_sharded() else [*fields, 'rating']
+
+    @property
+    def ordering(self):
+        return ['name'] if is_sharded() else ['rating']
+
+    def get_queryset(self):
+        return annotate_rating(super().get_queryset()).order_by(
+            *self.ordering, 'pk'
+        )
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        return page if page is None else attach_ratings(page)
+
+    def get_object(self):
+        return attach_ratings([super().get_object()])[0]
+
+    def perform_destroy(self, instance):
+        soft_delete(instance)
+
+    def get_facet_names(self):
+        names = [
+            name.strip()
+            for name in self.request.query_params.get('facets', '').split(',')
+            if name.strip()
+        ]
+        unknown = set(names) - FACETS.keys()
+        if unknown:
+            raise ValidationError(
+                {'facets': f'Неизвестные фасеты: {", ".join(unknown)}.'}
+            )
+        return list(dict.fromkeys(names))
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список произведений.
+        С параметром facets=genre,category,year рядом с результатами
+        возвращаются количества произведений для текущих фильтров.
+        """
+        facet_names = self.get_facet_names()
+        response = super().list(request, *args, **kwargs)
+        if facet_names:
+            response.data['facets'] = get_title_facets(
+                self.filter_queryset(self.get_queryset()), facet_names
+            )
+        return response
+
+    @action(methods=('get',), detail=False)
+    def autocomplete(self, request):
+        """
+        Подсказки по началу слов названия без обращения к БД.
+        Принимает q и необязательный limit.
+        """
+        try:
+            limit = int(
+                request.query_params.get('limit', constants.AUTOCOMPLETE_LIMIT)
+            )
+        except ValueError:
+            limit = constants.AUTOCOMPLETE_LIMIT
+        limit = max(1, min(limit, constants.AUTOCOMPLETE_MAX_LIMIT))
+        return Response(
+            title_prefix_index.search(request.query_params.get('q', ''), limit)
+        )
+
+
+class ReviewViewSet(TitleShardMixin, AuthorWriteMixin, viewsets.ModelViewSet):
     """
     Представление для отзывов на произведения.
     На чтение доступно всем пользователям.
@@ -120,9 +213,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminModeratorAuthorOrReadOnly, )
     http_method_names = ('get', 'post', 'patch', 'delete',)
+    title_lookup = 'title'
 
     def get_title(self):
-        return get_object_or_404(Title, id=self.kwargs.get('title_id'))
+        return get_object_or_404(
+            Title.objects, id=self.kwargs.get('title_id')
+        )
 
     def get_queryset(self):
         return self.get_title().reviews.all()
@@ -131,7 +227,8 @@ class ReviewViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentsViewSet(viewsets.ModelViewSet):
+class CommentsViewSet(TitleShardMixin, AuthorWriteMixin,
+                      viewsets.ModelViewSet):
     """
     Представление для комментариев на отзывы.
     На чтение доступно всем пользователям.
@@ -143,12 +240,13 @@ class CommentsViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminModeratorAuthorOrReadOnly, )
     http_method_names = ('get', 'post', 'patch', 'delete',)
+    title_lookup = 'review__title'
 
     def get_review(self):
         return get_object_or_404(
             Review,
             id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id')
+            title_id=self.kwargs.get('title_id')
         )
 
     def perform_create(self, serializer):
@@ -157,20 +255,81 @@ class CommentsViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return self.get_review().comments.all()
 
+    def get_write_queryset(self):
+        return super().get_write_queryset().filter(
+            review__title_id=self.kwargs.get('title_id')
+        )
+
+
+class ModerationReviewViewSet(ScatterGatherMixin,
+                              viewsets.ReadOnlyModelViewSet):
+    """
+    Поиск по текстам отзывов для модераторов и администраторов.
+    Параметр search ищет по полнотекстовому индексу,
+    фильтры author, title, date_from, date_to.
+    """
+
+    queryset = Review.objects.select_related('author')
+    serializer_class = ModerationReviewSerializer
+    permission_classes = (IsAdminOrModerator,)
+    filter_backends = (DjangoFilterBackend, FullTextSearchFilter)
+    filterset_class = FilterModerationReview
+    pagination_class = PubDateCursorPagination
+    search_index = review_search
+
+
+class ModerationCommentViewSet(ScatterGatherMixin,
+                               viewsets.ReadOnlyModelViewSet):
+    """
+    Поиск по текстам комментариев для модераторов и администраторов.
+    Параметр search ищет по полнотекстовому индексу,
+    фильтры author, title, review, date_from, date_to.
+    """
+
+    queryset = Comments.objects.select_related('author')
+    serializer_class = ModerationCommentSerializer
+    permission_classes = (IsAdminOrModerator,)
+    filter_backends = (DjangoFilterBackend, FullTextSearchFilter)
+    filterset_class = FilterModerationComment
+    pagination_class = PubDateCursorPagination
+    search_index = comment_search
+
 
 class UsersViewSet(viewsets.ModelViewSet):
     """
     Представление для работы с пользователями.
+    Параметры username и email ищут по началу значения
+    с keyset-пагинацией.
     """
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAdminOrStaff,)
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (filters.SearchFilter, UserPrefixFilter)
     search_fields = ('username',)
     lookup_field = 'username'
     http_method_names = ('get', 'post', 'patch', 'delete',)
 
+    def perform_destroy(self, instance):
+        soft_delete(instance)
+
+    def get_prefix_ordering(self):
+        prefixes = UserPrefixFilter.get_prefixes(self.request)
+        return next(iter(prefixes), None)
+
+    @property
+    def paginator(self):
+        """
+        Keyset-пагинация по префиксу только для списка пользователей:
+        остальные действия выдают не пользователей.
+        """
+        if (
+            not hasattr(self, '_paginator') and self.action == 'list'
+            and self.get_prefix_ordering()
+        ):
+            self._paginator = PrefixCursorPagination()
+        return super().paginator
+
     @action(
         methods=('get', 'patch',),
         detail=False,
@@ -186,3 +345,20 @@ class UsersViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
         serializer = UserSerializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=('get',),
+        detail=False,
+        url_path='me/reviews',
+        permission_classes=(IsAuthenticated,),
+    )
+    def my_reviews(self, request):
+        """Отзывы текущего пользователя со всех шардов, от новых к старым."""
+        queryset = scatter(
+            Review.objects.filter(author=request.user).order_by(
+                '-pub_date', '-id'
+            )
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = ModerationReviewSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -41,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -65,13 +66,93 @@ TEMPLATES = [
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 # Database
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# По умолчанию SQLite. Для PostgreSQL задайте
+# DB_ENGINE=django.db.backends.postgresql и параметры подключения.
+# DB_TRANSACTION_POOLING=True — если соединения идут через пулер
+# в режиме transaction (PgBouncer): серверные курсоры отключаются.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', 'api_yamdb'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_TRANSACTION_POOLING', 'False') == 'True'
+            ),
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Реплики для чтения: DB_REPLICAS — хосты PostgreSQL или файлы SQLite
+# через запятую. Реплики наполняет репликация, миграции к ним
+# не применяются, в тестах они указывают на основную БД.
+DATABASE_REPLICAS = []
+
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DB_ENGINE == 'django.db.backends.postgresql':
+        DATABASES[alias]['HOST'] = replica
+    else:
+        DATABASES[alias]['NAME'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+# Шарды отзывов и комментариев: DB_REVIEW_SHARDS — хосты PostgreSQL или
+# файлы SQLite через запятую. Шард выбирается по хэшу id произведения,
+# поэтому менять число шардов без переноса данных нельзя.
+REVIEW_SHARDS = []
+
+for number, shard in enumerate(
+    filter(None, os.getenv('DB_REVIEW_SHARDS', '').split(',')), start=1
+):
+    alias = f'shard_{number}'
+    DATABASES[alias] = dict(DATABASES['default'])
+    if DB_ENGINE == 'django.db.backends.postgresql':
+        DATABASES[alias]['HOST'] = shard
+    else:
+        DATABASES[alias]['NAME'] = shard
+    REVIEW_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    'api.routers.ReviewShardRouter',
+    'api.routers.PrimaryReplicaRouter',
+]
+
+# Сколько секунд после записи пользователь читает с основной БД
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+
+# Проверка постоянных соединений перед каждым запросом
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# PRAGMA для каждого нового соединения SQLite. WAL позволяет читать
+# во время записи, busy_timeout — ждать блокировку, а не падать
+# с `database is locked`. SQLITE_TUNING=False оставляет умолчания SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+    'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'temp_store': 'memory',
+} if os.getenv('SQLITE_TUNING', 'True') == 'True' else {}
 
 # Password validation
 
@@ -133,3 +214,6 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 ADMIN_EMAIL = 'admin@yamdb.com'
+
+# Индекс жанров произведений в памяти процесса для фильтров каталога
+GENRE_BITSET_INDEX = os.getenv('GENRE_BITSET_INDEX', 'False') == 'True'
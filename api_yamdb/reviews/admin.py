@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from reviews.models import Category, Comments, Genre, Review, Title
+from reviews.models import (
+    Category, Comments, Genre, ImportedFile, PurgeJob, Review, Title,
+)
 
 admin.site.empty_value_display = '-пусто-'
 
@@ -28,12 +30,27 @@ class TitleAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('pk', 'author', 'text', 'pub_date')
-    search_fields = ('author_username', 'text')
+    search_fields = ('author__username', 'text')
     list_filter = ('author', 'pub_date')
 
 
 @admin.register(Comments)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('pk', 'author', 'review', 'text', 'pub_date')
-    search_fields = ('author_username', 'review_name')
+    search_fields = ('author__username', 'text')
     list_filter = ('author', 'review', 'pub_date')
+
+
+@admin.register(PurgeJob)
+class PurgeJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'model', 'object_id', 'processed', 'created_at', 'finished_at'
+    )
+    list_filter = ('model', 'finished_at')
+    readonly_fields = ('processed', 'created_at', 'updated_at', 'finished_at')
+
+
+@admin.register(ImportedFile)
+class ImportedFileAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'model', 'checksum', 'imported_at')
+    readonly_fields = ('imported_at',)
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE reviews_title_fts USING fts5('
+    "name, description, tokenize='unicode61 remove_diacritics 2')",
+    'INSERT INTO reviews_title_fts (rowid, name, description) '
+    "SELECT id, name, coalesce(description, '') FROM reviews_title",
+)
+# Без внешнего ключа на reviews_title: он мешает TRUNCATE при flush.
+# Записи удаленных объектов безвредны: поиск соединяется с живыми
+# строками, а rebuildsearch их убирает
+POSTGRESQL_CREATE = (
+    'CREATE TABLE reviews_title_fts ('
+    'object_id bigint PRIMARY KEY, document tsvector NOT NULL)',
+    'CREATE INDEX reviews_title_fts_document '
+    'ON reviews_title_fts USING GIN (document)',
+    'INSERT INTO reviews_title_fts (object_id, document) '
+    "SELECT id, setweight(to_tsvector('russian', name), 'A') "
+    "|| setweight(to_tsvector('russian', coalesce(description, '')), 'B') "
+    'FROM reviews_title',
+)
+CREATE = {
+    'sqlite': SQLITE_CREATE,
+    'postgresql': POSTGRESQL_CREATE,
+}
+
+
+def create_title_search(apps, schema_editor):
+    for sql in CREATE.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def drop_title_search(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute('DROP TABLE reviews_title_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_search, drop_title_search),
+    ]
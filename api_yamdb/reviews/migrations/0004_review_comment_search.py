@@ -0,0 +1,59 @@
+from django.db import migrations
+
+TABLES = (
+    ('reviews_review_fts', 'reviews_review'),
+    ('reviews_comments_fts', 'reviews_comments'),
+)
+
+
+def get_sqlite_create(fts_table, table):
+    return (
+        f'CREATE VIRTUAL TABLE {fts_table} USING fts5('
+        "text, tokenize='unicode61 remove_diacritics 2')",
+        f'INSERT INTO {fts_table} (rowid, text) SELECT id, text FROM {table}',
+    )
+
+
+def get_postgresql_create(fts_table, table):
+    return (
+        # Без внешнего ключа, как reviews_title_fts
+        f'CREATE TABLE {fts_table} ('
+        'object_id bigint PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {fts_table}_document '
+        f'ON {fts_table} USING GIN (document)',
+        f'INSERT INTO {fts_table} (object_id, document) '
+        "SELECT id, setweight(to_tsvector('russian', text), 'A') "
+        f'FROM {table}',
+    )
+
+
+CREATE = {
+    'sqlite': get_sqlite_create,
+    'postgresql': get_postgresql_create,
+}
+
+
+def create_search(apps, schema_editor):
+    get_create = CREATE.get(schema_editor.connection.vendor)
+    if get_create is None:
+        return
+    for fts_table, table in TABLES:
+        for sql in get_create(fts_table, table):
+            schema_editor.execute(sql)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        for fts_table, _ in TABLES:
+            schema_editor.execute(f'DROP TABLE {fts_table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_genre_titles(apps, schema_editor):
+    """Из повторяющихся пар произведение-жанр остается первая."""
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    genre_titles = GenreTitle.objects.using(schema_editor.connection.alias)
+    first_ids = genre_titles.order_by().values(
+        'title_id', 'genre_id'
+    ).annotate(
+        first_id=Min('id')
+    ).values('first_id')
+    genre_titles.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_year_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_genre_titles, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='genretitle',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='unique_genre_title'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', 'pub_date', 'id'], name='review_title_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'pub_date'], name='review_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['review', 'pub_date', 'id'], name='comment_review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['author', 'pub_date'], name='comment_author_pub_date_idx'),
+        ),
+    ]
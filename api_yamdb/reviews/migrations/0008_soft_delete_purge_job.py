@@ -0,0 +1,63 @@
+from django.db import migrations, models
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_comment_without_db_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'default_manager_name': 'all_objects', 'ordering': ('name',), 'verbose_name': 'Категория', 'verbose_name_plural': 'Категории'},
+        ),
+        migrations.AlterModelOptions(
+            name='title',
+            options={'default_manager_name': 'all_objects', 'ordering': ('name',), 'verbose_name': 'Произведение', 'verbose_name_plural': 'Произведения'},
+        ),
+        migrations.AlterModelManagers(
+            name='category',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='title',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Объект скрыт и ждет удаления командой purgedeleted', null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Объект скрыт и ждет удаления командой purgedeleted', null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.CreateModel(
+            name='PurgeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Метка модели, например reviews.title', max_length=100, verbose_name='Модель')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Id объекта')),
+                ('processed', models.PositiveIntegerField(default=0, help_text='Удаленные и измененные зависимые строки', verbose_name='Обработано строк')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+            ],
+            options={
+                'verbose_name': 'Задание на удаление',
+                'verbose_name_plural': 'Задания на удаление',
+                'ordering': ('created_at',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='purgejob',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='unique_purge_job'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(model, field):
+    return Coalesce(
+        Subquery(
+            model._default_manager.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Подсчет по строкам этой БД. При шардировании количество отзывов
+    произведений пересчитывает команда recountcounters.
+    """
+    using = schema_editor.connection.alias
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    Comments = apps.get_model('reviews', 'Comments')
+    Title._default_manager.using(using).update(
+        reviews_count=count_rows(Review, 'title')
+    )
+    Review._default_manager.using(using).update(
+        comments_count=count_rows(Comments, 'review')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_soft_delete_purge_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Обновляется автоматически, пересчитывается recountcounters', verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Обновляется автоматически, пересчитывается recountcounters', verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
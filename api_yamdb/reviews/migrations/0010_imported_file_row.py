@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_review_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Имя модели файла импорта, например Title', max_length=100, unique=True, verbose_name='Модель')),
+                ('checksum', models.CharField(help_text='SHA-256 содержимого файла', max_length=64, verbose_name='Контрольная сумма')),
+                ('imported_at', models.DateTimeField(auto_now=True, verbose_name='Дата импорта')),
+            ],
+            options={
+                'verbose_name': 'Импортированный файл',
+                'verbose_name_plural': 'Импортированные файлы',
+                'ordering': ('model',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Имя модели файла импорта, например Title', max_length=100, verbose_name='Модель')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Id объекта')),
+                ('checksum', models.BigIntegerField(help_text='Первые 8 байт BLAKE2b значений строки', verbose_name='Контрольная сумма')),
+            ],
+            options={
+                'verbose_name': 'Импортированная строка',
+                'verbose_name_plural': 'Импортированные строки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedrow',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='unique_imported_row'),
+        ),
+    ]
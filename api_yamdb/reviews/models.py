@@ -3,6 +3,7 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from api import constants
+from api.managers import AliveManager
 from reviews.validators import validate_title_year
 
 User = get_user_model()
@@ -28,10 +29,32 @@ class NameSlugModel(models.Model):
         return self.name[:constants.TEXT_LENGTH]
 
 
-class Category(NameSlugModel):
+class SoftDeleteModel(models.Model):
+    """
+    Базовая модель с мягким удалением.
+    objects не видит помеченные объекты, all_objects возвращает все.
+    """
+
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Дата удаления',
+        help_text='Объект скрыт и ждет удаления командой purgedeleted',
+    )
+
+    all_objects = models.Manager()
+    objects = AliveManager()
+
+    class Meta:
+        abstract = True
+        default_manager_name = 'all_objects'
+
+
+class Category(SoftDeleteModel, NameSlugModel):
     """Модель категорий произведений."""
 
-    class Meta(NameSlugModel.Meta):
+    class Meta(NameSlugModel.Meta, SoftDeleteModel.Meta):
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
 
@@ -44,7 +67,7 @@ class Genre(NameSlugModel):
         verbose_name_plural = 'Жанры'
 
 
-class Title(models.Model):
+class Title(SoftDeleteModel):
     """Модель произведений."""
 
     name = models.CharField(
@@ -82,10 +105,23 @@ class Title(models.Model):
         help_text='Укажите жанр',
     )
 
-    class Meta:
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов',
+        help_text='Обновляется автоматически, пересчитывается recountcounters',
+    )
+
+    class Meta(SoftDeleteModel.Meta):
         ordering = ('name',)
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = (
+            models.Index(fields=('year',), name='title_year_idx'),
+            models.Index(
+                fields=('category', 'year'), name='title_category_year_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name[:constants.TEXT_LENGTH]
@@ -108,6 +144,14 @@ class GenreTitle(models.Model):
         help_text='Необходим жанр',
     )
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('title', 'genre'),
+                name='unique_genre_title',
+            ),
+        )
+
     def __str__(self):
         return f'{self.title} {self.genre}'
 
@@ -118,12 +162,14 @@ class Review(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         verbose_name='Автор отзыва',
         help_text='Пользователь, который оставил отзыв',
     )
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
+        db_constraint=False,
         verbose_name='Произведение',
         help_text='Выберите произведение, к которому хотите оставить отзыв',
     )
@@ -149,6 +195,12 @@ class Review(models.Model):
         verbose_name='Дата публикации',
         help_text='Дата публикации отзыва, проставляется автоматически.',
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев',
+        help_text='Обновляется автоматически, пересчитывается recountcounters',
+    )
 
     class Meta:
         ordering = ('pub_date',)
@@ -161,6 +213,16 @@ class Review(models.Model):
                 name='unique reviews',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='review_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:constants.TEXT_LENGTH]
@@ -172,6 +234,7 @@ class Comments(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         verbose_name='Автор комментария',
         help_text='Пользователь, который оставил комментарий'
     )
@@ -196,6 +259,119 @@ class Comments(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = (
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='comment_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text[:constants.TEXT_LENGTH]
+
+
+class PurgeJob(models.Model):
+    """Задание на удаление помеченного объекта вместе с зависимыми."""
+
+    model = models.CharField(
+        max_length=100,
+        verbose_name='Модель',
+        help_text='Метка модели, например reviews.title',
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='Id объекта',
+    )
+    processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано строк',
+        help_text='Удаленные и измененные зависимые строки',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата завершения',
+    )
+
+    class Meta:
+        ordering = ('created_at',)
+        verbose_name = 'Задание на удаление'
+        verbose_name_plural = 'Задания на удаление'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('model', 'object_id'),
+                name='unique_purge_job',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+
+class ImportedFile(models.Model):
+    """Контрольная сумма файла, загруженного importcsv --upsert."""
+
+    model = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Модель',
+        help_text='Имя модели файла импорта, например Title',
+    )
+    checksum = models.CharField(
+        max_length=64,
+        verbose_name='Контрольная сумма',
+        help_text='SHA-256 содержимого файла',
+    )
+    imported_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата импорта',
+    )
+
+    class Meta:
+        ordering = ('model',)
+        verbose_name = 'Импортированный файл'
+        verbose_name_plural = 'Импортированные файлы'
+
+    def __str__(self):
+        return self.model
+
+
+class ImportedRow(models.Model):
+    """Контрольная сумма строки файла, загруженной importcsv --upsert."""
+
+    model = models.CharField(
+        max_length=100,
+        verbose_name='Модель',
+        help_text='Имя модели файла импорта, например Title',
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='Id объекта',
+    )
+    checksum = models.BigIntegerField(
+        verbose_name='Контрольная сумма',
+        help_text='Первые 8 байт BLAKE2b значений строки',
+    )
+
+    class Meta:
+        verbose_name = 'Импортированная строка'
+        verbose_name_plural = 'Импортированные строки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('model', 'object_id'),
+                name='unique_imported_row',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
@@ -0,0 +1,214 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from api import constants
+from reviews.models import Comments, Review, Title
+
+WORD_PATTERN = re.compile(r'\w+')
+PG_WEIGHTS = 'ABCD'
+
+
+class FallbackSearchBackend:
+    """Поиск через icontains для СУБД без полнотекстового индекса."""
+
+    def __init__(self, index, connection):
+        self.index = index
+        self.connection = connection
+
+    def update(self, obj):
+        pass
+
+    def delete(self, pk):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, queryset, query):
+        condition = Q()
+        for field in self.index.fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0, output_field=IntegerField())
+        )
+
+
+class SQLiteSearchBackend(FallbackSearchBackend):
+    """Индекс FTS5, rowid строки индекса совпадает с id объекта."""
+
+    def get_values(self, obj):
+        return [getattr(obj, field) or '' for field in self.index.fields]
+
+    def update(self, obj):
+        table = self.index.table
+        columns = ', '.join(self.index.fields)
+        placeholders = ', '.join(['%s'] * len(self.index.fields))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {table} (rowid, {columns}) '
+                f'VALUES (%s, {placeholders})',
+                [obj.pk, *self.get_values(obj)]
+            )
+
+    def delete(self, pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.index.table} WHERE rowid = %s', (pk,)
+            )
+
+    def rebuild(self):
+        table = self.index.table
+        opts = self.index.model._meta
+        columns = ', '.join(self.index.fields)
+        values = ', '.join(
+            f"coalesce({opts.get_field(field).column}, '')"
+            for field in self.index.fields
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, {columns}) '
+                f'SELECT {opts.pk.column}, {values} FROM {opts.db_table}'
+            )
+            return cursor.rowcount
+
+    def get_match(self, query):
+        """Слова запроса в кавычках: спецсимволы FTS5 не интерпретируются."""
+        return ' '.join(
+            f'"{word}"' for word in WORD_PATTERN.findall(query)
+        )
+
+    def search(self, queryset, query):
+        match = self.get_match(query)
+        if not match:
+            return queryset.none()
+        table = self.index.table
+        opts = self.index.model._meta
+        weights = ', '.join(str(weight) for weight in self.index.weights)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (match,)
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT bm25({table}, {weights}) FROM {table} '
+                f'WHERE {table} MATCH %s '
+                f'AND rowid = "{opts.db_table}"."{opts.pk.column}"',
+                (match,)
+            )
+        )
+
+
+class PostgreSQLSearchBackend(FallbackSearchBackend):
+    """Таблица с колонкой tsvector и GIN-индексом по ней."""
+
+    def get_document(self, columns):
+        return ' || '.join(
+            f"setweight(to_tsvector(%s, coalesce({column}, '')), "
+            f"'{PG_WEIGHTS[position]}')"
+            for position, column in enumerate(columns)
+        )
+
+    def update(self, obj):
+        document = self.get_document(['%s'] * len(self.index.fields))
+        params = [obj.pk]
+        for field in self.index.fields:
+            params.extend((constants.SEARCH_CONFIG, getattr(obj, field)))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.index.table} (object_id, document) '
+                f'VALUES (%s, {document}) '
+                'ON CONFLICT (object_id) '
+                'DO UPDATE SET document = EXCLUDED.document',
+                params
+            )
+
+    def delete(self, pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.index.table} WHERE object_id = %s', (pk,)
+            )
+
+    def rebuild(self):
+        opts = self.index.model._meta
+        document = self.get_document(
+            [opts.get_field(field).column for field in self.index.fields]
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.index.table}')
+            cursor.execute(
+                f'INSERT INTO {self.index.table} (object_id, document) '
+                f'SELECT {opts.pk.column}, {document} FROM {opts.db_table}',
+                [constants.SEARCH_CONFIG] * len(self.index.fields)
+            )
+            return cursor.rowcount
+
+    def search(self, queryset, query):
+        table = self.index.table
+        opts = self.index.model._meta
+        tsquery = 'plainto_tsquery(%s, %s)'
+        params = (constants.SEARCH_CONFIG, query)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT object_id FROM {table} '
+                f'WHERE document @@ {tsquery}',
+                params
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -ts_rank(document, {tsquery}) FROM {table} '
+                f'WHERE object_id = "{opts.db_table}"."{opts.pk.column}"',
+                params
+            )
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+class SearchIndex:
+    """
+    Полнотекстовый индекс по текстовым полям модели.
+    Реализация выбирается по СУБД соединения: FTS5 для SQLite,
+    tsvector с GIN-индексом для PostgreSQL, icontains для остальных.
+    Чем меньше search_rank у найденного объекта, тем он релевантнее.
+    """
+
+    def __init__(self, model, table, fields, weights):
+        self.model = model
+        self.table = table
+        self.fields = fields
+        self.weights = weights
+
+    def get_backend(self, using=DEFAULT_DB_ALIAS):
+        connection = connections[using]
+        backend = BACKENDS.get(connection.vendor, FallbackSearchBackend)
+        return backend(self, connection)
+
+    def update(self, obj, using=DEFAULT_DB_ALIAS):
+        self.get_backend(using).update(obj)
+
+    def delete(self, pk, using=DEFAULT_DB_ALIAS):
+        self.get_backend(using).delete(pk)
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        return self.get_backend(using).rebuild()
+
+    def search(self, queryset, query):
+        return self.get_backend(queryset.db).search(queryset, query)
+
+
+title_search = SearchIndex(
+    Title, 'reviews_title_fts', ('name', 'description'), (10.0, 1.0)
+)
+
+review_search = SearchIndex(Review, 'reviews_review_fts', ('text',), (1.0,))
+comment_search = SearchIndex(
+    Comments, 'reviews_comments_fts', ('text',), (1.0,)
+)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Comments, Review, Title
+from reviews.search import comment_search, review_search, title_search
+
+
+@receiver(post_save, sender=Title)
+def update_title_search(sender, instance, raw=False, using=None, **kwargs):
+    """Обновление полнотекстового индекса после сохранения произведения."""
+    if not raw:
+        title_search.update(instance, using=using)
+
+
+@receiver(post_delete, sender=Title)
+def delete_title_search(sender, instance, using=None, **kwargs):
+    """Удаление произведения из полнотекстового индекса."""
+    title_search.delete(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comments)
+def update_text_search(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Обновление индекса текстов отзывов и комментариев.
+    Удаление не отслеживается: поиск всегда соединяется с живыми
+    строками, а записи удаленных объектов убирает rebuildsearch.
+    """
+    if raw:
+        return
+    search = review_search if sender is Review else comment_search
+    search.update(instance, using=using)
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_lower_fields(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    users = User.objects.using(schema_editor.connection.alias)
+    fields = ('username_lower', 'email_lower')
+    batch = []
+    for user in users.only('username', 'email').order_by('pk').iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        user.username_lower = user.username.lower()
+        user.email_lower = user.email.lower()
+        batch.append(user)
+        if len(batch) == BATCH_SIZE:
+            users.bulk_update(batch, fields)
+            batch = []
+    users.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='username_lower',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Заполняется автоматически, для поиска по префиксу', max_length=150, verbose_name='Имя пользователя в нижнем регистре'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='email_lower',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Заполняется автоматически, для поиска по префиксу', max_length=254, verbose_name='Электронная почта в нижнем регистре'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_lower_fields, migrations.RunPython.noop),
+    ]
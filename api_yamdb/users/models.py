@@ -1,7 +1,8 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 from django.core.validators import RegexValidator
 from api import constants
+from api.managers import AliveUserManager
 from users.validators import validate_username
 
 
@@ -61,7 +62,35 @@ class User(AbstractUser):
         verbose_name='Имя пользователя',
     )
 
+    username_lower = models.CharField(
+        max_length=constants.USERNAME_MAX_LENGTH,
+        db_index=True,
+        editable=False,
+        verbose_name='Имя пользователя в нижнем регистре',
+        help_text='Заполняется автоматически, для поиска по префиксу',
+    )
+
+    email_lower = models.CharField(
+        max_length=constants.EMAIL_MAX_LENGTH,
+        db_index=True,
+        editable=False,
+        verbose_name='Электронная почта в нижнем регистре',
+        help_text='Заполняется автоматически, для поиска по префиксу',
+    )
+
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Дата удаления',
+        help_text='Пользователь скрыт и ждет удаления командой purgedeleted',
+    )
+
+    all_objects = UserManager()
+    objects = AliveUserManager()
+
     class Meta:
+        default_manager_name = 'all_objects'
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ('username',)
@@ -75,6 +104,23 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def fill_lower_fields(self):
+        """Имя и почта в нижнем регистре для поиска по префиксу."""
+        self.username_lower = self.username.lower()
+        self.email_lower = self.email.lower()
+
+    def save(self, *args, **kwargs):
+        self.fill_lower_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'username' in update_fields:
+                update_fields.add('username_lower')
+            if 'email' in update_fields:
+                update_fields.add('email_lower')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     @property
     def is_moderator(self):
         return self.role == self.MODERATOR
@@ -0,0 +1,118 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08AuthorWrite:
+
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+    COMMENT_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/{comment_id}/'
+    )
+
+    def test_01_review_author_write_queries(self, admin_client, user,
+                                            user_client,
+                                            django_assert_max_num_queries):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        # Аутентификация, UPDATE, чтение обновлённого отзыва
+        # и обновление поискового индекса.
+        with django_assert_max_num_queries(4):
+            response = user_client.patch(url, data={'text': 'new text'})
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что автор может изменить свой отзыв.'
+        )
+        assert response.json().get('text') == 'new text'
+        assert response.json().get('author') == user.username
+
+    def test_02_review_author_write_not_found(self, admin_client, user,
+                                              user_client):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[1]['id'], review_id=reviews[0]['id']
+        )
+        response = user_client.patch(url, data={'text': 'new text'})
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что отзыв ищется только среди отзывов '
+            'произведения из URL.'
+        )
+        response = user_client.delete(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_03_comment_invalid_data_not_author(self, admin_client, admin,
+                                                user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = self.COMMENT_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id'],
+            comment_id=comments[0]['id']
+        )
+        response = user_client.patch(url, data={'text': ''})
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что PATCH-запрос к чужому комментарию возвращает '
+            '403 даже при некорректных данных.'
+        )
+        url = self.COMMENT_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id'],
+            comment_id=comments[1]['id']
+        )
+        response = user_client.patch(url, data={'text': ''})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = user_client.delete(url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+    def test_04_comment_author_write_not_found(self, admin_client, admin,
+                                               user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        for title, review in (
+            (titles[1], reviews[0]), (titles[0], reviews[1])
+        ):
+            url = self.COMMENT_DETAIL_URL_TEMPLATE.format(
+                title_id=title['id'], review_id=review['id'],
+                comment_id=comments[1]['id']
+            )
+            response = user_client.patch(url, data={'text': 'new text'})
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что комментарий ищется только среди '
+                'комментариев отзыва и произведения из URL.'
+            )
+
+    def test_05_author_write_deleted_title(self, admin_client, admin,
+                                           user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        response = admin_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        urls = (
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[1]['id']
+            ),
+            self.COMMENT_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id'],
+                comment_id=comments[1]['id']
+            ),
+        )
+        for url in urls:
+            response = user_client.patch(url, data={'text': 'new text'})
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что автор не может изменить отзыв или '
+                'комментарий помеченного на удаление произведения.'
+            )
+            response = user_client.delete(url)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что автор не может удалить отзыв или '
+                'комментарий помеченного на удаление произведения.'
+            )
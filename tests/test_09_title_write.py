@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Genre
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09TitleWrite:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_title_post_queries(self, admin_client,
+                                   django_assert_max_num_queries):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = {
+            'name': 'Терминатор',
+            'year': 1984,
+            'genre': [genre['slug'] for genre in genres],
+            'category': categories[0]['slug'],
+        }
+        # Аутентификация, slug жанров, slug категории, BEGIN, INSERT
+        # произведения и строки поискового индекса, INSERT связей
+        # с жанрами, чтение ответа с жанрами.
+        with django_assert_max_num_queries(9):
+            response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Если POST-запрос администратора к `{self.TITLES_URL}` '
+            'содержит корректные данные - должен вернуться ответ со статусом '
+            '201.'
+        )
+        assert sorted(
+            genre['slug'] for genre in response.json()['genre']
+        ) == sorted(genre['slug'] for genre in genres)
+        assert response.json()['category'] == categories[0]
+
+    def test_02_title_unknown_genre(self, admin_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = {
+            'name': 'Терминатор',
+            'year': 1984,
+            'genre': [genres[0]['slug'], 'unknown'],
+            'category': categories[0]['slug'],
+        }
+        response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Если POST-запрос администратора к `{self.TITLES_URL}` '
+            'содержит несуществующий жанр - должен вернуться ответ со '
+            'статусом 400.'
+        )
+
+    def test_03_title_patch_genres(self, admin_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = {
+            'name': 'Терминатор',
+            'year': 1984,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }
+        title_id = admin_client.post(self.TITLES_URL, data=data).json()['id']
+        response = admin_client.patch(
+            f'{self.TITLES_URL}{title_id}/',
+            data={'genre': [genres[1]['slug'], genres[2]['slug']]}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert sorted(
+            genre['slug'] for genre in response.json()['genre']
+        ) == sorted(genre['slug'] for genre in genres[1:]), (
+            'Проверьте, что PATCH-запрос заменяет жанры произведения.'
+        )
+
+    def test_04_title_genre_changed_elsewhere(self, admin_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = {
+            'name': 'Терминатор',
+            'year': 1984,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }
+        assert admin_client.post(
+            self.TITLES_URL, data=data
+        ).status_code == HTTPStatus.CREATED
+        # Изменение без сигналов, как из другого процесса
+        Genre.objects.filter(slug=genres[0]['slug']).update(slug='renamed')
+        response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что жанр, переименованный в другом процессе, '
+            'не находится по старому slug.'
+        )
@@ -0,0 +1,51 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10TitleSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_search_name_and_description(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(f'{self.TITLES_URL}?search=орешек')
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[1]['id']], (
+            f'Проверьте, что параметр `search` эндпоинта `{self.TITLES_URL}` '
+            'ищет по названию произведения.'
+        )
+        response = client.get(f'{self.TITLES_URL}?search=back')
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[0]['id']], (
+            f'Проверьте, что параметр `search` эндпоинта `{self.TITLES_URL}` '
+            'ищет по описанию произведения.'
+        )
+
+    def test_02_search_index_sync(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        admin_client.patch(url, data={'name': 'Чужой'})
+        response = client.get(f'{self.TITLES_URL}?search=Терминатор')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что поисковый индекс обновляется при изменении '
+            'произведения.'
+        )
+        response = client.get(f'{self.TITLES_URL}?search=чужой')
+        assert response.json()['count'] == 1
+        admin_client.delete(url)
+        response = client.get(f'{self.TITLES_URL}?search=чужой')
+        assert response.json()['count'] == 0
+
+    def test_03_rebuild_search(self, admin_client, client):
+        create_titles(admin_client)
+        call_command('rebuildsearch', stdout=StringIO())
+        response = client.get(f'{self.TITLES_URL}?search=(орешек*')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 1
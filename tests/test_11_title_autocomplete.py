@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+
+from api import constants
+from api.autocomplete import TitlePrefixIndex, title_prefix_index
+from reviews.models import Review, Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleAutocomplete:
+
+    AUTOCOMPLETE_URL = '/api/v1/titles/autocomplete/'
+
+    def test_01_autocomplete(self, admin_client, client,
+                             django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(f'{self.AUTOCOMPLETE_URL}?q=терм')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что эндпоинт `{self.AUTOCOMPLETE_URL}` доступен '
+            'неавторизованному пользователю.'
+        )
+        assert response.json() == [
+            {'id': titles[0]['id'], 'name': titles[0]['name'], 'rating': None}
+        ]
+        with django_assert_num_queries(0):
+            response = client.get(f'{self.AUTOCOMPLETE_URL}?q=ОРЕ')
+        assert [title['id'] for title in response.json()] == [
+            titles[1]['id']
+        ], (
+            'Проверьте, что подсказки ищутся по началу любого слова '
+            'названия без учета регистра.'
+        )
+        response = client.get(self.AUTOCOMPLETE_URL)
+        assert response.json() == []
+
+    def test_02_autocomplete_sync(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        client.get(f'{self.AUTOCOMPLETE_URL}?q=к')
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Кобра'}
+        )
+        create_single_review(admin_client, titles[0]['id'], 'текст', 8)
+        response = client.get(f'{self.AUTOCOMPLETE_URL}?q=к')
+        assert response.json() == [
+            {'id': titles[0]['id'], 'name': 'Кобра', 'rating': 8},
+            {'id': titles[1]['id'], 'name': titles[1]['name'], 'rating': None},
+        ], (
+            'Проверьте, что подсказки обновляются при изменении произведений '
+            'и отзывов и отсортированы по рейтингу.'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        response = client.get(f'{self.AUTOCOMPLETE_URL}?q=кобра')
+        assert response.json() == []
+
+    def test_03_autocomplete_rating_after_rollback(self, admin_client,
+                                                   client, admin):
+        titles, _, _ = create_titles(admin_client)
+        client.get(f'{self.AUTOCOMPLETE_URL}?q=к')
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Review.objects.create(
+                    title_id=titles[0]['id'], author=admin, text='текст',
+                    score=3
+                )
+                raise RuntimeError
+        create_single_review(admin_client, titles[1]['id'], 'текст', 8)
+        ratings = {
+            title['id']: title['rating']
+            for title in client.get(f'{self.AUTOCOMPLETE_URL}?q=к').json()
+        }
+        assert ratings == {titles[1]['id']: 8}, (
+            'Проверьте, что рейтинг в подсказках обновляется и после '
+            'отката транзакции с изменением отзывов.'
+        )
+
+    def test_04_autocomplete_after_title_rollback(self, admin_client,
+                                                  client):
+        titles, _, _ = create_titles(admin_client)
+        client.get(f'{self.AUTOCOMPLETE_URL}?q=к')
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Title.objects.filter(pk=titles[0]['id']).get().delete()
+                title = Title.objects.get(pk=titles[1]['id'])
+                title.name = 'Кобра'
+                title.save()
+                raise RuntimeError
+        response = client.get(f'{self.AUTOCOMPLETE_URL}?q=к')
+        assert [title['name'] for title in response.json()] == [
+            titles[1]['name']
+        ], (
+            'Проверьте, что подсказки не меняются после отката '
+            'транзакции с изменением произведений.'
+        )
+        response = client.get(f'{self.AUTOCOMPLETE_URL}?q=терм')
+        assert [title['id'] for title in response.json()] == [
+            titles[0]['id']
+        ]
+
+    def test_05_autocomplete_refresh_affected_prefixes(self, admin_client,
+                                                       client, monkeypatch):
+        monkeypatch.setattr(constants, 'AUTOCOMPLETE_MAX_LIMIT', 2)
+        titles, _, _ = create_titles(admin_client)
+        for name in ('Кобра', 'Корабль', 'Кот в сапогах'):
+            Title.objects.create(name=name, year=2000)
+        prefixes = ('к', 'ко', 'коб', 'кор', 'в с', 'терм', 'сапоги')
+        for prefix in prefixes:
+            client.get(f'{self.AUTOCOMPLETE_URL}?q={prefix}')
+        cached = title_prefix_index.results['терм']
+        kobra, ship, cat = Title.objects.filter(
+            name__in=('Кобра', 'Корабль', 'Кот в сапогах')
+        ).order_by('name')
+        create_single_review(admin_client, ship.pk, 'текст', 9)
+        create_single_review(admin_client, cat.pk, 'текст', 4)
+        ship.name = 'Кобра и корабль'
+        ship.save()
+        create_single_review(admin_client, kobra.pk, 'текст', 10)
+        admin_client.delete(f'/api/v1/titles/{cat.pk}/')
+        for prefix in prefixes:
+            expected = TitlePrefixIndex().search(prefix)
+            assert title_prefix_index.search(prefix) == expected, (
+                'Проверьте, что подсказки после изменения произведений '
+                'и отзывов совпадают с построенными заново.'
+            )
+        assert title_prefix_index.results.get('терм') is cached, (
+            'Проверьте, что изменение произведения не сбрасывает '
+            'подсказки префиксов, под которые оно не подходит.'
+        )
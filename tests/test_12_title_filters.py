@@ -0,0 +1,125 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleFilters:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_ids(self, client, query):
+        response = client.get(f'{self.TITLES_URL}?{query}')
+        assert response.status_code == HTTPStatus.OK
+        return sorted(title['id'] for title in response.json()['results'])
+
+    def test_01_genre_any_and_all(self, admin_client, client):
+        titles, _, genres = create_titles(admin_client)
+        assert self.get_ids(
+            client, f'genre={genres[0]["slug"]},{genres[2]["slug"]}'
+        ) == sorted(title['id'] for title in titles), (
+            'Проверьте, что фильтр `genre` со списком жанров возвращает '
+            'произведения с любым из них.'
+        )
+        assert self.get_ids(
+            client,
+            f'genre={genres[0]["slug"]},{genres[1]["slug"]}&genre_mode=all'
+        ) == [titles[0]['id']]
+        assert self.get_ids(
+            client,
+            f'genre={genres[0]["slug"]},{genres[2]["slug"]}&genre_mode=all'
+        ) == []
+
+    def test_02_exact_slugs(self, admin_client, client):
+        titles, categories, genres = create_titles(admin_client)
+        assert self.get_ids(client, f'genre={genres[0]["slug"][:3]}') == [], (
+            'Проверьте, что фильтр `genre` сравнивает slug целиком.'
+        )
+        assert self.get_ids(
+            client, f'category={categories[0]["slug"]},{categories[1]["slug"]}'
+        ) == sorted(title['id'] for title in titles)
+        assert self.get_ids(client, 'category=unknown') == []
+
+    def test_03_genre_filter_without_join(self, admin_client, client):
+        _, _, genres = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            client.get(
+                f'{self.TITLES_URL}?genre={genres[0]["slug"]}'
+                '&genre_mode=all'
+            )
+        count_sql = next(
+            query['sql'] for query in context.captured_queries
+            if 'COUNT' in query['sql']
+        )
+        assert 'EXISTS' in count_sql
+        assert 'JOIN "reviews_genretitle"' not in count_sql, (
+            'Проверьте, что фильтр по жанрам не соединяет произведения '
+            'с жанрами в основном запросе.'
+        )
+
+    def test_04_genre_bitset_index(self, admin_client, client, settings):
+        settings.GENRE_BITSET_INDEX = True
+        titles, categories, genres = create_titles(admin_client)
+        for query, expected in (
+            (f'genre={genres[0]["slug"]},{genres[2]["slug"]}', titles),
+            (
+                f'genre={genres[0]["slug"]},{genres[1]["slug"]}'
+                '&genre_mode=all',
+                titles[:1]
+            ),
+            (
+                f'genre={genres[0]["slug"]},{genres[2]["slug"]}'
+                f'&category={categories[1]["slug"]}',
+                titles[1:]
+            ),
+            (f'genre=unknown&year={titles[0]["year"]}', []),
+        ):
+            assert self.get_ids(client, query) == sorted(
+                title['id'] for title in expected
+            ), (
+                'Проверьте, что фильтры по жанрам и категориям через индекс '
+                f'в памяти работают так же, как в БД: {query}.'
+            )
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[1]["id"]}/',
+            data={'genre': [genres[0]['slug']]}
+        )
+        assert self.get_ids(
+            client, f'genre={genres[0]["slug"]}'
+        ) == sorted(title['id'] for title in titles), (
+            'Проверьте, что индекс жанров обновляется при изменении '
+            'произведения.'
+        )
+        admin_client.delete(f'{self.TITLES_URL}{titles[0]["id"]}/')
+        assert self.get_ids(
+            client, f'genre={genres[0]["slug"]}'
+        ) == [titles[1]['id']]
+
+    def test_05_year_range(self, admin_client, client):
+        titles, categories, _ = create_titles(admin_client)
+        assert self.get_ids(client, 'year_min=1985') == [titles[1]['id']], (
+            'Проверьте, что фильтр `year_min` оставляет произведения '
+            'не раньше указанного года.'
+        )
+        assert self.get_ids(client, 'year_max=1985') == [titles[0]['id']]
+        assert self.get_ids(
+            client,
+            f'year_min=1980&year_max=1989&category={categories[1]["slug"]}'
+        ) == [titles[1]['id']]
+
+    def test_06_year_range_benchmark(self):
+        output = StringIO()
+        call_command(
+            'benchmark', 'title-years', '--size', '100', stdout=output
+        )
+        if connection.vendor != 'sqlite':
+            # На малом объеме PostgreSQL предпочитает Seq Scan
+            assert 'Без индексов' in output.getvalue()
+            return
+        assert 'title_category_year_idx' in output.getvalue()
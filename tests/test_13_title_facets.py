@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13TitleFacets:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_facets(self, admin_client, client):
+        titles, categories, genres = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as without_facets:
+            client.get(self.TITLES_URL)
+        with CaptureQueriesContext(connection) as with_facets:
+            response = client.get(
+                f'{self.TITLES_URL}?facets=genre,category,year'
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert len(with_facets) - len(without_facets) == 3, (
+            'Проверьте, что каждый фасет считается одним запросом.'
+        )
+        facets = response.json().get('facets')
+        assert facets, (
+            f'Проверьте, что ответ на GET-запрос к `{self.TITLES_URL}` '
+            'с параметром `facets` содержит ключ `facets`.'
+        )
+        assert sorted(
+            (genre['slug'], genre['count']) for genre in facets['genre']
+        ) == sorted((genre['slug'], 1) for genre in genres)
+        assert sorted(
+            (category['slug'], category['count'])
+            for category in facets['category']
+        ) == sorted((category['slug'], 1) for category in categories)
+        assert facets['year'] == [{'decade': 1980, 'count': 2}]
+
+    def test_02_facets_with_filters(self, admin_client, client):
+        titles, categories, genres = create_titles(admin_client)
+        response = client.get(
+            f'{self.TITLES_URL}?category={categories[0]["slug"]}'
+            '&facets=genre'
+        )
+        data = response.json()
+        assert list(data['facets']) == ['genre']
+        assert sorted(genre['slug'] for genre in data['facets']['genre']) == (
+            sorted(titles[0]['genre'])
+        ), (
+            'Проверьте, что фасеты считаются для отфильтрованного списка.'
+        )
+        response = client.get(f'{self.TITLES_URL}?facets=author')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(self.TITLES_URL)
+        assert 'facets' not in response.json()
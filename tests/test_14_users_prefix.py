@@ -0,0 +1,104 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from api.filters import UserPrefixFilter
+from reviews.models import Category, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14UsersPrefixSearch:
+
+    USERS_URL = '/api/v1/users/'
+
+    def test_01_username_prefix(self, admin_client, django_user_model):
+        for username in ('Alice', 'alina', 'Bob', 'ali.baba'):
+            django_user_model.objects.create_user(
+                username=username, email=f'{username}@Yamdb.fake'
+            )
+        response = admin_client.get(f'{self.USERS_URL}?username=ALI')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert [user['username'] for user in data['results']] == [
+            'ali.baba', 'Alice', 'alina'
+        ], (
+            'Проверьте, что параметр `username` ищет пользователей по началу '
+            'имени без учета регистра.'
+        )
+        assert 'next' in data and 'previous' in data
+        response = admin_client.get(f'{self.USERS_URL}?email=bob@yamdb')
+        assert [user['username'] for user in response.json()['results']] == [
+            'Bob'
+        ]
+
+    def test_02_keyset_pagination(self, admin_client, django_user_model):
+        for number in range(7):
+            django_user_model.objects.create_user(
+                username=f'user{number}', email=f'user{number}@yamdb.fake'
+            )
+        response = admin_client.get(f'{self.USERS_URL}?username=user')
+        data = response.json()
+        usernames = [user['username'] for user in data['results']]
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(data['next'])
+        usernames += [user['username'] for user in response.json()['results']]
+        assert usernames == [f'user{number}' for number in range(7)], (
+            'Проверьте, что поиск по префиксу разбит на страницы курсором.'
+        )
+        assert not any(
+            'OFFSET' in query['sql'] for query in context.captured_queries
+        )
+
+    def test_03_prefix_uses_index(self, admin):
+        if connection.vendor != 'sqlite':
+            pytest.skip('План запроса проверяется только для SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN QUERY PLAN SELECT id FROM users_user '
+                'WHERE username_lower >= %s AND username_lower < %s '
+                'ORDER BY username_lower',
+                ('ali', 'ali' + chr(0x10ffff))
+            )
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        assert 'username_lower' in plan and 'SCAN users_user' not in plan
+
+    @pytest.mark.parametrize('vendor', ('sqlite', 'postgresql'))
+    def test_04_prefix_filter_by_vendor(self, rf, monkeypatch,
+                                        django_user_model, vendor):
+        for username in ('a_b', 'axb', 'A_Bc', 'b_a'):
+            django_user_model.objects.create_user(
+                username=username, email=f'{username}@yamdb.fake'
+            )
+        monkeypatch.setattr(connection, 'vendor', vendor)
+        request = Request(rf.get(self.USERS_URL, {'username': 'a_B'}))
+        queryset = UserPrefixFilter().filter_queryset(
+            request, django_user_model.objects.all(), None
+        )
+        lookups = str(queryset.query)
+        monkeypatch.undo()
+        assert sorted(queryset.values_list('username', flat=True)) == [
+            'A_Bc', 'a_b'
+        ], (
+            'Проверьте, что поиск по префиксу не считает `_` шаблоном '
+            'и одинаков на всех СУБД.'
+        )
+        assert ('LIKE' in lookups) == (vendor != 'sqlite'), (
+            'Проверьте, что вне SQLite префикс ищется через LIKE '
+            'по индексу varchar_pattern_ops.'
+        )
+
+    def test_05_my_reviews_ignore_prefix(self, user_client, user):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        title = Title.objects.create(
+            name='Фильм', year=2000, category=category
+        )
+        Review.objects.create(title=title, author=user, text='Отзыв', score=5)
+        response = user_client.get(f'{self.USERS_URL}me/reviews/?username=a')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что параметр `username` не меняет пагинацию '
+            'отзывов пользователя.'
+        )
+        assert response.json()['count'] == 1
@@ -0,0 +1,68 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15ModerationSearch:
+
+    REVIEWS_URL = '/api/v1/moderation/reviews/'
+    COMMENTS_URL = '/api/v1/moderation/comments/'
+
+    def test_01_moderation_permissions(self, client, user_client,
+                                       moderator_client, admin_client):
+        for url in (self.REVIEWS_URL, self.COMMENTS_URL):
+            assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+            assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+                f'Проверьте, что эндпоинт `{url}` недоступен пользователю '
+                'с ролью `user`.'
+            )
+            assert moderator_client.get(url).status_code == HTTPStatus.OK
+            assert admin_client.get(url).status_code == HTTPStatus.OK
+
+    def test_02_moderation_search(self, admin_client, admin, user,
+                                  user_client, moderator_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        response = moderator_client.get(f'{self.REVIEWS_URL}?search=number 2')
+        results = response.json()['results']
+        assert [review['id'] for review in results] == [reviews[1]['id']], (
+            f'Проверьте, что параметр `search` эндпоинта `{self.REVIEWS_URL}` '
+            'ищет по тексту отзывов.'
+        )
+        assert results[0]['title'] == titles[0]['id']
+        response = moderator_client.get(
+            f'{self.COMMENTS_URL}?search=comment&author={user.username}'
+        )
+        results = response.json()['results']
+        assert [comment['id'] for comment in results] == [comments[1]['id']]
+        response = moderator_client.get(
+            f'{self.COMMENTS_URL}?search=comment&title={titles[1]["id"]}'
+        )
+        assert response.json()['results'] == []
+
+    def test_03_moderation_search_after_edit(self, admin_client, user,
+                                             user_client, moderator_client):
+        _, reviews, titles = create_comments(admin_client, {user: user_client})
+        user_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/',
+            data={'text': 'исправленный текст'}
+        )
+        response = moderator_client.get(
+            f'{self.REVIEWS_URL}?search=исправленный'
+        )
+        assert [
+            review['id'] for review in response.json()['results']
+        ] == [reviews[0]['id']], (
+            'Проверьте, что индекс отзывов обновляется при их изменении.'
+        )
+        user_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        )
+        response = moderator_client.get(
+            f'{self.REVIEWS_URL}?search=исправленный'
+        )
+        assert response.json()['results'] == []
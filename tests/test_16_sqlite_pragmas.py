@@ -0,0 +1,45 @@
+import pytest
+from django.db import connection
+from django.test import override_settings
+
+from api.signals import apply_sqlite_pragmas
+
+
+def get_pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16SQLitePragmas:
+
+    @pytest.fixture(autouse=True)
+    def sqlite_only(self):
+        if connection.vendor != 'sqlite':
+            pytest.skip('PRAGMA применяются только к SQLite.')
+
+    def test_01_pragmas_applied(self, settings):
+        if not settings.SQLITE_PRAGMAS:
+            pytest.skip('Настройка SQLite отключена через SQLITE_TUNING.')
+        assert get_pragma('busy_timeout') == (
+            settings.SQLITE_PRAGMAS['busy_timeout']
+        ), (
+            'Проверьте, что при открытии соединения SQLite применяются '
+            'настройки из `SQLITE_PRAGMAS`.'
+        )
+        assert get_pragma('cache_size') == (
+            settings.SQLITE_PRAGMAS['cache_size']
+        )
+        # 1 — NORMAL, 2 — MEMORY
+        assert get_pragma('synchronous') == 1
+        assert get_pragma('temp_store') == 2
+
+    def test_02_pragmas_configurable(self):
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234}):
+            apply_sqlite_pragmas(
+                sender=connection.__class__, connection=connection
+            )
+        assert get_pragma('busy_timeout') == 1234, (
+            'Проверьте, что значения PRAGMA берутся из настроек.'
+        )
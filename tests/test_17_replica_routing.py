@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, router
+
+from reviews.models import Category, Title
+
+REPLICA = 'replica'
+TITLES_URL = '/api/v1/titles/'
+REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+
+@pytest.fixture(scope='class')
+def replica_database(django_db_setup, django_db_blocker, tmp_path_factory):
+    """Отдельный файл SQLite в роли реплики без репликации."""
+    connections.databases[REPLICA] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path_factory.mktemp(REPLICA) / 'replica.sqlite3'),
+    }
+    connections.ensure_defaults(REPLICA)
+    connections.prepare_test_settings(REPLICA)
+    with django_db_blocker.unblock():
+        call_command('migrate', database=REPLICA, verbosity=0)
+    yield REPLICA
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.databases[REPLICA]
+
+
+def create_title():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return Title.objects.create(
+        name='Терминатор', year=1984, category=category
+    )
+
+
+def replicate(*objects):
+    """Ручная «репликация» объектов основной БД на реплику."""
+    for obj in objects:
+        type(obj).objects.using(REPLICA).bulk_create([obj])
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', REPLICA])
+class Test17ReplicaRouting:
+
+    @pytest.fixture(autouse=True)
+    def use_replica(self, replica_database, settings):
+        settings.DATABASE_REPLICAS = [REPLICA]
+        cache.clear()
+
+    def test_01_safe_requests_read_replica(self, client):
+        title = create_title()
+        response = client.get(TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 0, (
+            'Проверьте, что GET-запросы читают данные с реплики.'
+        )
+        replicate(title.category, title)
+        assert client.get(TITLES_URL).json()['count'] == 1
+
+    def test_02_read_your_writes(self, admin_client, client, admin):
+        title = create_title()
+        replicate(admin, title.category, title)
+        url = REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        response = admin_client.post(url, data={'text': 'Отзыв', 'score': 9})
+        assert response.status_code == HTTPStatus.CREATED
+        assert admin_client.get(url).json()['count'] == 1, (
+            'Проверьте, что после записи пользователь читает '
+            'с основной БД и видит свой отзыв.'
+        )
+        assert client.get(url).json()['count'] == 0, (
+            'Проверьте, что остальные пользователи читают с реплики.'
+        )
+
+    def test_03_sticky_window(self, admin_client, admin, settings):
+        settings.REPLICA_STICKY_SECONDS = 0
+        title = create_title()
+        replicate(admin, title.category, title)
+        url = REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        response = admin_client.post(url, data={'text': 'Отзыв', 'score': 9})
+        assert response.status_code == HTTPStatus.CREATED
+        assert admin_client.get(url).json()['count'] == 0, (
+            'Проверьте, что окно чтения с основной БД задается '
+            'настройкой `REPLICA_STICKY_SECONDS`.'
+        )
+
+    def test_04_primary_outside_requests(self):
+        assert router.db_for_read(Title) == 'default'
+        assert router.db_for_write(Title) == 'default'
+        assert not router.allow_migrate(REPLICA, 'reviews')
+
+    @pytest.mark.parametrize('header', ['Bearer', 'Bearer a b', 'Bearer a'])
+    def test_05_malformed_authorization(self, client, header):
+        response = client.get(TITLES_URL, HTTP_AUTHORIZATION=header)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что неверный заголовок Authorization с репликами '
+            'возвращает 401, а не ошибку сервера.'
+        )
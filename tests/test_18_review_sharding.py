@@ -0,0 +1,200 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+
+from api.sharding import get_title_shard
+from reviews.models import Category, Comments, Review, Title
+
+SHARDS = ['shard_a', 'shard_b']
+REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+COMMENTS_URL_TEMPLATE = (
+    '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+)
+
+
+@pytest.fixture(scope='class')
+def shard_databases(django_db_setup, django_db_blocker, tmp_path_factory):
+    """Шарды отзывов в отдельных файлах SQLite."""
+    directory = tmp_path_factory.mktemp('shards')
+    for alias in SHARDS:
+        connections.databases[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(directory / f'{alias}.sqlite3'),
+        }
+        connections.ensure_defaults(alias)
+        connections.prepare_test_settings(alias)
+        with django_db_blocker.unblock():
+            call_command('migrate', database=alias, verbosity=0)
+    yield SHARDS
+    for alias in SHARDS:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', *SHARDS])
+class Test18ReviewSharding:
+
+    @pytest.fixture(autouse=True)
+    def use_shards(self, shard_databases, settings):
+        settings.REVIEW_SHARDS = SHARDS
+
+    @pytest.fixture
+    def titles(self):
+        """Два произведения на разных шардах."""
+        category = Category.objects.create(name='Фильм', slug='movie')
+        titles = {}
+        number = 0
+        while len(titles) < len(SHARDS):
+            number += 1
+            title = Title.objects.create(
+                name=f'Фильм {number}', year=2000, category=category
+            )
+            titles.setdefault(get_title_shard(title.pk), title)
+        return [titles[alias] for alias in SHARDS]
+
+    def post_review(self, client, title, text, score):
+        response = client.post(
+            REVIEWS_URL_TEMPLATE.format(title_id=title.id),
+            data={'text': text, 'score': score}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        return response.json()
+
+    def test_01_reviews_on_title_shard(self, user_client, admin_client,
+                                       titles):
+        first, second = titles
+        review = self.post_review(user_client, first, 'Отзыв', 7)
+        assert Review.objects.using('shard_a').filter(
+            title_id=first.id
+        ).exists(), (
+            'Проверьте, что отзыв сохраняется на шарде своего произведения.'
+        )
+        assert not Review.objects.using('shard_b').exists()
+        assert not Review.objects.exists()
+        url = REVIEWS_URL_TEMPLATE.format(title_id=first.id)
+        assert user_client.get(url).json()['count'] == 1
+        response = user_client.patch(
+            f'{url}{review["id"]}/', data={'text': 'Новый текст'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['text'] == 'Новый текст'
+        assert user_client.post(
+            url, data={'text': 'Еще отзыв', 'score': 5}
+        ).status_code == HTTPStatus.BAD_REQUEST
+        comments_url = COMMENTS_URL_TEMPLATE.format(
+            title_id=first.id, review_id=review['id']
+        )
+        response = admin_client.post(comments_url, data={'text': 'Коммент'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert Comments.objects.using('shard_a').count() == 1, (
+            'Проверьте, что комментарии хранятся на шарде отзыва.'
+        )
+        assert admin_client.get(comments_url).json()['count'] == 1
+        assert admin_client.get(
+            COMMENTS_URL_TEMPLATE.format(
+                title_id=second.id, review_id=review['id']
+            )
+        ).status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_ratings_across_shards(self, user_client, admin_client,
+                                      client, titles):
+        first, second = titles
+        self.post_review(user_client, first, 'Отзыв', 4)
+        self.post_review(admin_client, first, 'Отзыв', 8)
+        self.post_review(user_client, second, 'Отзыв', 10)
+        ratings = {
+            title['id']: title['rating']
+            for title in client.get(
+                '/api/v1/titles/?limit=100'
+            ).json()['results']
+        }
+        assert (ratings[first.id], ratings[second.id]) == (6, 10), (
+            'Проверьте, что рейтинг произведений считается по отзывам '
+            'на шардах.'
+        )
+        response = client.get(f'/api/v1/titles/{second.id}/')
+        assert response.json()['rating'] == 10
+        assert response.json()['reviews_count'] == 1, (
+            'Проверьте, что счетчик отзывов обновляется для отзывов '
+            'на шардах.'
+        )
+
+    def test_03_scatter_gather(self, user_client, moderator_client, titles):
+        first, second = titles
+        older = self.post_review(user_client, first, 'Первый отзыв', 4)
+        newer = self.post_review(user_client, second, 'Второй отзыв', 9)
+        response = user_client.get('/api/v1/users/me/reviews/?limit=1')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data['count'] == 2
+        assert [review['id'] for review in data['results']] == [
+            newer['id']
+        ], (
+            'Проверьте, что отзывы пользователя собираются со всех шардов '
+            'от новых к старым.'
+        )
+        assert data['results'][0]['title'] == second.id
+        response = user_client.get(data['next'])
+        assert [
+            review['id'] for review in response.json()['results']
+        ] == [older['id']]
+        response = moderator_client.get(
+            '/api/v1/moderation/reviews/?search=отзыв&author=TestUser'
+        )
+        assert sorted(
+            (review['title'], review['id'])
+            for review in response.json()['results']
+        ) == sorted([
+            (first.id, older['id']), (second.id, newer['id'])
+        ]), 'Проверьте, что поиск модераторов идет по всем шардам.'
+
+    def test_04_cross_shard_cascades(self, user_client, admin_client, user,
+                                     titles):
+        first, second = titles
+        review = self.post_review(user_client, first, 'Отзыв', 4)
+        self.post_review(user_client, second, 'Отзыв', 9)
+        self.post_review(admin_client, second, 'Отзыв', 6)
+        admin_client.post(
+            COMMENTS_URL_TEMPLATE.format(
+                title_id=first.id, review_id=review['id']
+            ),
+            data={'text': 'Коммент'}
+        )
+        user.delete()
+        assert not Review.objects.using('shard_a').exists(), (
+            'Проверьте, что удаление пользователя удаляет его отзывы '
+            'на всех шардах.'
+        )
+        assert not Comments.objects.using('shard_a').exists()
+        assert Review.objects.using('shard_b').count() == 1
+        response = admin_client.delete(f'/api/v1/titles/{second.id}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        call_command('purgedeleted', stdout=StringIO())
+        assert not Review.objects.using('shard_b').exists(), (
+            'Проверьте, что удаление произведения удаляет отзывы '
+            'на его шарде.'
+        )
+
+    def test_05_title_ordering_without_rating(self, client, titles):
+        for _ in range(3):
+            Title.objects.create(
+                name='Фильм', year=2000, category=titles[0].category
+            )
+        expected = list(
+            Title.objects.order_by('name', 'pk').values_list('pk', flat=True)
+        )
+        for query in ('', '&ordering=rating'):
+            pages = [
+                client.get(
+                    f'/api/v1/titles/?limit=1&offset={offset}{query}'
+                ).json()['results']
+                for offset in range(len(expected))
+            ]
+            assert [page[0]['id'] for page in pages] == expected, (
+                'Проверьте, что при шардировании произведения сортируются '
+                'по названию и id, а сортировка по рейтингу не принимается.'
+            )
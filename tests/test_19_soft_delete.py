@@ -0,0 +1,116 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import (
+    Category, Comments, Genre, GenreTitle, PurgeJob, Review, Title,
+)
+
+TITLES_URL = '/api/v1/titles/'
+TITLE_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+
+def purge_deleted(*args):
+    out = StringIO()
+    call_command('purgedeleted', *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19SoftDelete:
+
+    @pytest.fixture
+    def title(self, user, admin):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(
+            name='Фильм', year=2000, category=category
+        )
+        GenreTitle.objects.create(title=title, genre=genre)
+        for author in (user, admin):
+            review = Review.objects.create(
+                author=author, title=title, text='Отзыв', score=5
+            )
+            Comments.objects.create(
+                author=admin, review=review, text='Комментарий'
+            )
+        return title
+
+    def test_01_title_hidden_then_purged(self, admin_client, client, title):
+        response = admin_client.delete(
+            TITLE_URL_TEMPLATE.format(title_id=title.id)
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert Title.all_objects.filter(pk=title.id).exists(), (
+            'Проверьте, что DELETE-запрос к произведению только помечает '
+            'его удаленным, не удаляя отзывы внутри запроса.'
+        )
+        assert Review.objects.count() == 2
+        assert client.get(TITLES_URL).json()['count'] == 0, (
+            'Проверьте, что помеченное произведение скрыто из списка.'
+        )
+        assert client.get(
+            REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        ).status_code == HTTPStatus.NOT_FOUND
+        output = purge_deleted('--batch-size', '1')
+        assert 'обработано строк 5' in output, (
+            'Проверьте, что purgedeleted выводит прогресс удаления.'
+        )
+        assert not Title.all_objects.exists()
+        assert not Review.objects.exists()
+        assert not Comments.objects.exists()
+        assert not GenreTitle.objects.exists()
+        job = PurgeJob.objects.get()
+        assert (job.processed, job.finished_at is not None) == (5, True), (
+            'Проверьте, что задание на удаление хранит прогресс '
+            'и отмечается завершенным.'
+        )
+
+    def test_02_category_detached_in_batches(self, admin_client, client,
+                                             title):
+        response = admin_client.delete('/api/v1/categories/movie/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert client.get('/api/v1/categories/').json()['count'] == 0
+        data = client.get(TITLE_URL_TEMPLATE.format(title_id=title.id)).json()
+        assert data['category'] is None, (
+            'Проверьте, что помеченная категория не выводится '
+            'у произведений.'
+        )
+        assert admin_client.post(
+            '/api/v1/categories/', data={'name': 'Фильм', 'slug': 'movie'}
+        ).status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что slug помеченной категории занят до ее удаления.'
+        )
+        purge_deleted()
+        assert not Category.all_objects.exists()
+        assert Title.objects.get(pk=title.id).category is None
+
+    def test_03_user_hidden_then_purged(self, admin_client, user_client,
+                                        user, admin, title):
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert admin_client.get(
+            f'/api/v1/users/{user.username}/'
+        ).status_code == HTTPStatus.NOT_FOUND
+        assert user_client.get(
+            '/api/v1/users/me/'
+        ).status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что помеченный на удаление пользователь '
+            'не может пользоваться своим токеном.'
+        )
+        assert admin_client.post('/api/v1/auth/signup/', data={
+            'username': user.username, 'email': 'other@yamdb.fake'
+        }).status_code == HTTPStatus.BAD_REQUEST
+        purge_deleted()
+        assert not type(user).all_objects.filter(pk=user.pk).exists()
+        assert list(Review.objects.values_list('author', flat=True)) == [
+            admin.pk
+        ], 'Проверьте, что удаляются только отзывы пользователя.'
+        assert list(Comments.objects.values_list('author', flat=True)) == [
+            admin.pk
+        ], (
+            'Проверьте, что удаляются комментарии к отзывам пользователя.'
+        )
@@ -0,0 +1,72 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Category, Review, Title
+
+TITLE_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+COMMENTS_URL_TEMPLATE = (
+    '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20Counters:
+
+    @pytest.fixture
+    def title(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        return Title.objects.create(name='Фильм', year=2000, category=category)
+
+    def test_01_counters_follow_writes(self, user_client, admin_client,
+                                       client, title):
+        reviews_url = REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        review = user_client.post(
+            reviews_url, data={'text': 'Отзыв', 'score': 5}
+        ).json()
+        admin_client.post(reviews_url, data={'text': 'Отзыв', 'score': 7})
+        comments_url = COMMENTS_URL_TEMPLATE.format(
+            title_id=title.id, review_id=review['id']
+        )
+        comments = [
+            admin_client.post(comments_url, data={'text': text}).json()
+            for text in ('Первый', 'Второй')
+        ]
+        data = client.get(TITLE_URL_TEMPLATE.format(title_id=title.id)).json()
+        assert data['reviews_count'] == 2, (
+            'Проверьте, что ответ на GET-запрос к произведению содержит '
+            'поле `reviews_count` с количеством отзывов.'
+        )
+        data = client.get(f'{reviews_url}{review["id"]}/').json()
+        assert data['comments_count'] == 2, (
+            'Проверьте, что ответ на GET-запрос к отзыву содержит '
+            'поле `comments_count` с количеством комментариев.'
+        )
+        response = admin_client.delete(f'{comments_url}{comments[0]["id"]}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert Review.objects.get(pk=review['id']).comments_count == 1, (
+            'Проверьте, что удаление комментария уменьшает счетчик.'
+        )
+        user_client.delete(f'{reviews_url}{review["id"]}/')
+        assert Title.objects.get(pk=title.id).reviews_count == 1, (
+            'Проверьте, что удаление отзыва уменьшает счетчик.'
+        )
+
+    def test_02_recountcounters(self, user, admin, title):
+        review = Review.objects.create(
+            author=user, title=title, text='Отзыв', score=5
+        )
+        Title.objects.update(reviews_count=10)
+        Review.objects.update(comments_count=3)
+        out = StringIO()
+        call_command('recountcounters', '--batch-size', '1', stdout=out)
+        assert Title.objects.get(pk=title.pk).reviews_count == 1, (
+            'Проверьте, что команда `recountcounters` пересчитывает '
+            'количество отзывов.'
+        )
+        review.refresh_from_db()
+        assert review.comments_count == 0
+        assert 'Исправлено счетчиков отзывов: 1.' in out.getvalue()
@@ -0,0 +1,416 @@
+import csv
+import os
+import threading
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from api.importer import (
+    COPY_NULL, PROCEDURE, StagingTable, get_copy_buffer, get_dependencies,
+    run_stages,
+)
+from reviews.models import (
+    Category, Comments, Genre, GenreTitle, ImportedRow, Review, Title,
+)
+from tests.conftest import MANAGE_PATH
+
+DATA_DIR = os.path.join(MANAGE_PATH, 'static', 'data')
+
+
+def count_rows(name):
+    with open(os.path.join(DATA_DIR, name), newline='',
+              encoding='utf-8') as csvfile:
+        return sum(1 for _ in csv.DictReader(csvfile))
+
+
+def import_bulk(directory, *args):
+    out = StringIO()
+    call_command('importcsv', directory, '--bulk', *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21BulkImport:
+
+    def test_01_bulk_import_static_data(self):
+        output = import_bulk(DATA_DIR, '--batch-size', '7')
+        expected = {
+            get_user_model(): 'User.csv',
+            Category: 'category.csv',
+            Genre: 'genre.csv',
+            Title: 'Title.csv',
+            GenreTitle: 'GenreTitle.csv',
+            Review: 'review.csv',
+            Comments: 'comments.csv',
+        }
+        for model, name in expected.items():
+            assert model._base_manager.count() == count_rows(name), (
+                f'Проверьте, что `importcsv --bulk` загружает все строки '
+                f'файла `{name}`.'
+            )
+        assert 'строк/с' in output, (
+            'Проверьте, что `importcsv --bulk` выводит скорость импорта.'
+        )
+        review = Review.objects.get(pk=1)
+        assert (review.title_id, review.author_id) == (1, 100)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что даты публикации берутся из файла.'
+        )
+        assert not get_user_model().objects.get(pk=100).has_usable_password()
+        output = import_bulk(DATA_DIR)
+        assert Review.objects.count() == count_rows('review.csv')
+        assert 'пропущено существующих' in output
+
+    def test_02_bulk_import_rejects_rows(self, tmp_path):
+        Category.objects.create(pk=1, name='Фильм', slug='movie')
+        (tmp_path / 'Title.csv').write_text(
+            'id,name,year,category\n'
+            '1,Фильм,1994,1\n'
+            '2,Без категории,1994,\n'
+            '3,Неизвестная категория,1994,5\n'
+            '4,Из будущего,3000,1\n'
+            '1,Повтор,1994,1\n',
+            encoding='utf-8'
+        )
+        output = import_bulk(str(tmp_path))
+        assert sorted(Title.objects.values_list('pk', flat=True)) == [1, 2]
+        assert 'отклонено 3' in output
+        rejected_path = tmp_path / 'Title.rejected.csv'
+        assert f'причины в {rejected_path}' in output, (
+            'Проверьте, что `importcsv` сообщает, где лежат отклоненные '
+            'строки.'
+        )
+        with open(rejected_path, newline='', encoding='utf-8') as csvfile:
+            rejected = {
+                row['row']: row for row in csv.DictReader(csvfile)
+            }
+        assert sorted(rejected) == ['3', '4', '5'], (
+            'Проверьте, что отклоненные строки записываются в файл '
+            '`<файл>.rejected.csv`.'
+        )
+        assert rejected['3']['reason'].startswith('category'), (
+            'Проверьте, что для строки с несуществующим внешним ключом '
+            'указывается причина.'
+        )
+        assert rejected['4']['reason'].startswith('year')
+        assert rejected['5']['name'] == 'Повтор', (
+            'Проверьте, что при ошибке БД отклоняется только ошибочная '
+            'строка пачки.'
+        )
+        (tmp_path / 'Title.csv').write_text(
+            'id,name,year,category\n1,Фильм,1994,1\n', encoding='utf-8'
+        )
+        import_bulk(str(tmp_path))
+        assert not rejected_path.exists(), (
+            'Проверьте, что устаревший файл отклоненных строк удаляется.'
+        )
+
+    @pytest.mark.parametrize('mode', ([], ['--bulk']))
+    def test_03_quiet_import(self, tmp_path, mode):
+        Category.objects.create(pk=1, name='Фильм', slug='movie')
+        (tmp_path / 'Title.csv').write_text(
+            'id,name,year,category\n1,Фильм,1994,1\n2,Ошибка,1994,5\n',
+            encoding='utf-8'
+        )
+        out = StringIO()
+        call_command('importcsv', str(tmp_path), '--quiet', *mode, stdout=out)
+        assert list(Title.objects.values_list('pk', flat=True)) == [1]
+        assert out.getvalue().splitlines() == [
+            f'{tmp_path / "Title.csv"}: отклонено строк 1, '
+            f'причины в {tmp_path / "Title.rejected.csv"}.'
+        ], (
+            'Проверьте, что с `--quiet` выводятся только сведения '
+            'об отклоненных строках.'
+        )
+
+    def test_04_stages_follow_dependencies(self):
+        assert get_dependencies(PROCEDURE) == {
+            'User': set(),
+            'Category': set(),
+            'Genre': set(),
+            'Title': {'Category'},
+            'GenreTitle': {'Title', 'Genre'},
+            'Review': {'Title', 'User'},
+            'Comments': {'Review', 'User'},
+        }, (
+            'Проверьте, что зависимости этапов импорта строятся '
+            'по внешним ключам моделей.'
+        )
+        independent = threading.Barrier(3, timeout=5)
+        finished = []
+
+        def stage(name):
+            if name in ('User', 'Category', 'Genre'):
+                independent.wait()
+            finished.append(name)
+            return name.lower()
+
+        results = dict(run_stages(PROCEDURE, stage, workers=3))
+        assert results['Title'] == 'title'
+        for name, dependencies in get_dependencies(PROCEDURE).items():
+            assert all(
+                finished.index(dependency) < finished.index(name)
+                for dependency in dependencies
+            ), f'Этап {name} запущен до завершения своих зависимостей.'
+
+    def test_05_sqlite_imports_sequentially(self, tmp_path):
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n1,Драма,drama\n', encoding='utf-8'
+        )
+        output = import_bulk(str(tmp_path), '--workers', '4')
+        assert 'импорт выполняется последовательно' in output
+        assert Genre.objects.count() == 1
+
+    def test_06_native_import(self, tmp_path):
+        output = import_bulk(DATA_DIR, '--native')
+        for model, name in ((Title, 'Title.csv'), (Review, 'review.csv')):
+            assert model._base_manager.count() == count_rows(name), (
+                f'Проверьте, что `importcsv --native` загружает все строки '
+                f'файла `{name}`.'
+            )
+        assert 'отклонено 0' in output
+        user = get_user_model().objects.get(pk=100)
+        assert (user.username_lower, user.has_usable_password()) == (
+            'bingobongo', False
+        ), 'Проверьте, что `--native` заполняет поля, вычисляемые в save().'
+        assert Review.objects.get(pk=1).pub_date.year == 2019
+        title = Title.objects.create(name='Новое', year=2000)
+        assert title.pk > count_rows('Title.csv'), (
+            'Проверьте, что после `--native` счетчик id продолжает '
+            'максимальный загруженный id.'
+        )
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n'
+            '1,Драма,drama\n'
+            '100,Новый,new\n'
+            '101,Повтор slug,new\n'
+            '100,Повтор id,other\n'
+            '102,Занятый slug,comedy\n'
+            '103,Неверный slug,не slug\n',
+            encoding='utf-8'
+        )
+        (tmp_path / 'GenreTitle.csv').write_text(
+            'id,title_id,genre_id\n'
+            '1000,1,100\n'
+            '1001,1,999\n',
+            encoding='utf-8'
+        )
+        output = import_bulk(str(tmp_path), '--native')
+        assert Genre.objects.filter(pk__gte=100).count() == 1
+        assert 'пропущено существующих 1, отклонено 4' in output
+        with open(tmp_path / 'genre.rejected.csv', newline='',
+                  encoding='utf-8') as csvfile:
+            rejected = {
+                row['row']: row['reason'] for row in csv.DictReader(csvfile)
+            }
+        assert sorted(rejected) == ['3', '4', '5', '6'], (
+            'Проверьте, что `--native` отклоняет повторы id и slug '
+            'в файле и в БД.'
+        )
+        assert rejected['3'].startswith('slug')
+        assert GenreTitle.objects.filter(pk=1000, genre_id=100).exists()
+        assert 'genre' in (tmp_path / 'GenreTitle.rejected.csv').read_text(
+            encoding='utf-8'
+        ), 'Проверьте, что `--native` проверяет внешние ключи.'
+
+    def test_07_upsert_import(self, tmp_path):
+        Genre.objects.create(pk=50, name='Из API', slug='api')
+        genres = tmp_path / 'genre.csv'
+        users = tmp_path / 'User.csv'
+        genres.write_text(
+            'id,name,slug\n'
+            '1,Драма,drama\n2,Комедия,comedy\n3,Ужасы,horror\n',
+            encoding='utf-8'
+        )
+        users.write_text(
+            'id,username,email,role\n1,Reader,reader@yamdb.fake,user\n',
+            encoding='utf-8'
+        )
+        output = import_bulk(str(tmp_path), '--upsert')
+        assert 'создано 3' in output
+        assert ImportedRow.objects.filter(model='Genre').count() == 3, (
+            'Проверьте, что `--upsert` сохраняет контрольные суммы строк.'
+        )
+        output = import_bulk(str(tmp_path), '--upsert')
+        assert 'Genre: файл не изменился' in output, (
+            'Проверьте, что `--upsert` пропускает неизмененный файл.'
+        )
+        genres.write_text(
+            'id,name,slug\n'
+            '1,Драма,drama\n2,Комедии,comedy\n4,Мюзикл,musical\n',
+            encoding='utf-8'
+        )
+        users.write_text(
+            'id,username,email,role\n1,Writer,Writer@yamdb.fake,moderator\n',
+            encoding='utf-8'
+        )
+        output = import_bulk(str(tmp_path), '--upsert', '--delete-missing')
+        assert (
+            'создано 1, пропущено существующих 1, отклонено 0. '
+            'Обновлено 1, удалено 1.'
+        ) in output, (
+            'Проверьте, что `--upsert` создает новые, обновляет измененные '
+            'и пропускает неизмененные строки.'
+        )
+        assert dict(Genre.objects.values_list('pk', 'name')) == {
+            1: 'Драма', 2: 'Комедии', 4: 'Мюзикл', 50: 'Из API'
+        }, (
+            'Проверьте, что `--delete-missing` удаляет только объекты '
+            'прошлых импортов, которых нет в файле.'
+        )
+        user = get_user_model().objects.get(pk=1)
+        assert (user.role, user.username_lower, user.email_lower) == (
+            'moderator', 'writer', 'writer@yamdb.fake'
+        )
+
+    def test_08_validate_only(self, tmp_path):
+        out = StringIO()
+        call_command('importcsv', DATA_DIR, '--validate-only', stdout=out)
+        assert 'Ошибок не найдено.' in out.getvalue()
+        Category.objects.create(pk=1, name='Фильм', slug='movie')
+        (tmp_path / 'User.csv').write_text(
+            'id,username,email\n'
+            '1,reader,reader@yamdb.fake\n'
+            '2,me,me@yamdb.fake\n',
+            encoding='utf-8'
+        )
+        (tmp_path / 'Title.csv').write_text(
+            'id,name,year,category\n'
+            '1,Фильм,1994,1\n'
+            '2,Без категории,1994,7\n'
+            '3,Из будущего,3000,1\n'
+            '1,Повтор,1994,1\n',
+            encoding='utf-8'
+        )
+        (tmp_path / 'review.csv').write_text(
+            'id,title_id,text,author,score,pub_date\n'
+            '1,1,Отзыв,1,11,2020-01-01T00:00:00Z\n'
+            '2,2,Отзыв,1,5,2020-01-01T00:00:00Z\n'
+            '3,1,Отзыв,2,5,вчера\n'
+            '4,1,Отзыв,1,5,2020-01-01T00:00:00Z\n',
+            encoding='utf-8'
+        )
+        out = StringIO()
+        with pytest.raises(CommandError, match='Строк с ошибками: 8'):
+            call_command(
+                'importcsv', str(tmp_path), '--validate-only', stdout=out
+            )
+        output = out.getvalue()
+        for line in (
+            'username: Имя пользователя "me" недопустимо. — 1 (строки 2)',
+            'category: объект не найден. — 1 (строки 2)',
+            'year: Некоректный год. — 1 (строки 3)',
+            'id: повтор в файле. — 1 (строки 4)',
+            'title: объект не найден. — 1 (строки 2)',
+            'author: объект не найден. — 1 (строки 3)',
+            'author, title_id: повтор в файле. — 1 (строки 4)',
+        ):
+            assert line in output, (
+                'Проверьте, что `--validate-only` выводит отчет '
+                f'с причиной и строками: {line}'
+            )
+        assert 'score: ' in output, (
+            'Проверьте, что `--validate-only` проверяет диапазон оценок.'
+        )
+        assert not Title.objects.exists() and not Review.objects.exists(), (
+            'Проверьте, что `--validate-only` ничего не записывает в БД.'
+        )
+
+    def test_09_bulk_user_import(self, tmp_path, user,
+                                 django_assert_max_num_queries):
+        rows = [
+            f'{number},User{number},user{number}@yamdb.fake,user'
+            for number in range(1000, 1200)
+        ]
+        rows += [
+            f'1200,{user.username},other@yamdb.fake,user',
+            '1201,Other,User1000@yamdb.fake,user',
+            '1202,other,user1000@yamdb.fake,user',
+            '1203,me,me@yamdb.fake,user',
+        ]
+        (tmp_path / 'User.csv').write_text(
+            'id,username,email,role\n' + '\n'.join(rows) + '\n',
+            encoding='utf-8'
+        )
+        with django_assert_max_num_queries(20):
+            output = import_bulk(str(tmp_path), '--batch-size', '100')
+        assert 'создано 201, пропущено существующих 0, отклонено 3' in output
+        users = get_user_model().objects.filter(pk__gte=1000)
+        assert users.count() == 201, (
+            'Проверьте, что `importcsv --bulk` загружает пользователей '
+            'пачками без create_user.'
+        )
+        imported = users.get(pk=1201)
+        assert (imported.username_lower, imported.email_lower) == (
+            'other', 'user1000@yamdb.fake'
+        ), 'Проверьте, что заполняются поля username_lower и email_lower.'
+        assert not imported.has_usable_password()
+        assert len(set(users.values_list('password', flat=True))) == 201, (
+            'Проверьте, что непригодные пароли у пользователей разные.'
+        )
+        with open(tmp_path / 'User.rejected.csv', newline='',
+                  encoding='utf-8') as csvfile:
+            rejected = {
+                row['row']: row['reason'] for row in csv.DictReader(csvfile)
+            }
+        assert rejected == {
+            '201': 'username: значение занято.',
+            '203': 'email: значение занято.',
+            '204': rejected['204'],
+        }, (
+            'Проверьте, что занятые имена и почты пользователей '
+            'отклоняются до записи в БД.'
+        )
+        assert rejected['204'].startswith('username')
+
+    @pytest.mark.parametrize('mode', ([], ['--bulk'], ['--upsert']))
+    def test_10_import_resets_sequences(self, tmp_path, monkeypatch, mode):
+        ops = connection.ops
+        reset = []
+        monkeypatch.setattr(
+            ops, 'sequence_reset_sql',
+            lambda style, models: reset.extend(models) or []
+        )
+        Category.objects.create(pk=1, name='Фильм', slug='movie')
+        (tmp_path / 'Title.csv').write_text(
+            'id,name,year,category\n500,Фильм,1994,1\n', encoding='utf-8'
+        )
+        call_command('importcsv', str(tmp_path), *mode, stdout=StringIO())
+        assert reset == [Title], (
+            'Проверьте, что после импорта строк с id из файла счетчик id '
+            'таблицы сдвигается, как после `--native`.'
+        )
+        reset.clear()
+        call_command('importcsv', str(tmp_path), *mode, stdout=StringIO())
+        assert reset == []
+
+    def test_11_native_copy_nulls(self, tmp_path, monkeypatch):
+        loaded = []
+        load = StagingTable.load
+        monkeypatch.setattr(
+            StagingTable, 'load',
+            lambda staging, rows: loaded.extend(rows) or load(staging, rows)
+        )
+        (tmp_path / 'Title.csv').write_text(
+            'id,name,year,category,description\n1,Фильм "Х",1994,,\n',
+            encoding='utf-8'
+        )
+        import_bulk(str(tmp_path), '--native')
+        assert Title.objects.get(pk=1).category_id is None
+        (row,) = loaded
+        values = get_copy_buffer(loaded).getvalue().rstrip('\n').split(',')
+        assert len(values) == len(row)
+        for value, text in zip(row, values):
+            if value is None:
+                assert text == COPY_NULL, (
+                    'Проверьте, что NULL передается в COPY без кавычек '
+                    'и отличается от пустой строки.'
+                )
+            elif isinstance(value, str):
+                assert text == '"{}"'.format(value.replace('"', '""'))
+        assert get_copy_buffer([('', COPY_NULL)]).getvalue() == (
+            f'"","{COPY_NULL}"\n'
+        )
@@ -0,0 +1,109 @@
+import csv
+import os
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from api.purge import soft_delete
+from reviews.models import (
+    Category, Comments, Genre, GenreTitle, Review, Title,
+)
+from tests.conftest import MANAGE_PATH
+
+DATA_DIR = os.path.join(MANAGE_PATH, 'static', 'data')
+MODEL_FIELDS = (
+    (get_user_model(), ('id', 'username', 'email', 'role', 'bio')),
+    (Category, ('id', 'name', 'slug')),
+    (Genre, ('id', 'name', 'slug')),
+    (Title, ('id', 'name', 'year', 'category_id', 'description')),
+    (GenreTitle, ('id', 'title_id', 'genre_id')),
+    (Review, ('id', 'title_id', 'author_id', 'text', 'score', 'pub_date')),
+    (Comments, ('id', 'review_id', 'author_id', 'text', 'pub_date')),
+)
+
+
+def read_file(path):
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        return list(csv.reader(csvfile))
+
+
+def export(directory, *args):
+    out = StringIO()
+    call_command('exportcsv', str(directory), *args, stdout=out)
+    return out.getvalue()
+
+
+def dump_models():
+    return {
+        model: list(
+            model._base_manager.order_by('pk').values_list(*fields)
+        )
+        for model, fields in MODEL_FIELDS
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ExportCsv:
+
+    @pytest.fixture
+    def imported(self):
+        call_command('importcsv', DATA_DIR, '--bulk', stdout=StringIO())
+
+    def test_01_export_round_trip(self, imported, tmp_path):
+        before = dump_models()
+        output = export(tmp_path, '--batch-size', '7')
+        for name in os.listdir(DATA_DIR):
+            if not name.endswith('.csv'):
+                continue
+            header = read_file(os.path.join(DATA_DIR, name))[0]
+            exported = read_file(tmp_path / name)
+            assert exported[0][:len(header)] == header, (
+                f'Проверьте, что `exportcsv` пишет файл `{name}` '
+                f'с заголовком, который читает `importcsv`.'
+            )
+            assert f'{tmp_path / name}: выгружено строк' in output
+        assert not [
+            name for name in os.listdir(tmp_path) if name.endswith('.tmp')
+        ]
+        for model, _ in reversed(MODEL_FIELDS):
+            model._base_manager.all().delete()
+        call_command('importcsv', str(tmp_path), '--bulk', stdout=StringIO())
+        assert dump_models() == before, (
+            'Проверьте, что данные, выгруженные `exportcsv`, '
+            'загружаются `importcsv` без изменений.'
+        )
+
+    def test_02_export_skips_deleted(self, imported, tmp_path):
+        title = Title.objects.get(pk=1)
+        soft_delete(title)
+        soft_delete(Category.objects.get(pk=2))
+        output = export(tmp_path, '--workers', '3')
+        assert 'экспорт выполняется последовательно' in output
+        rows = read_file(tmp_path / 'review.csv')[1:]
+        assert rows and all(row[1] != '1' for row in rows), (
+            'Проверьте, что отзывы помеченных на удаление произведений '
+            'не выгружаются.'
+        )
+        reviews = set(
+            map(str, Review.objects.filter(title_id=1).values_list(
+                'pk', flat=True
+            ))
+        )
+        assert all(
+            row[1] not in reviews
+            for row in read_file(tmp_path / 'comments.csv')[1:]
+        )
+        titles = {
+            row[0]: row for row in read_file(tmp_path / 'Title.csv')[1:]
+        }
+        assert '1' not in titles
+        orphans = Title.objects.filter(category_id=2).values_list(
+            'pk', flat=True
+        )
+        assert orphans and all(titles[str(pk)][3] == '' for pk in orphans), (
+            'Проверьте, что у произведений удаленной категории '
+            'выгружается пустая категория.'
+        )
+        assert 'пропущено помеченных на удаление' in output